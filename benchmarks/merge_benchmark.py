@@ -0,0 +1,125 @@
+"""
+merge_data_with_history 的比较部分基准测试
+
+生成 N 条历史笔记和同样规模的 Excel 导出（部分修改、部分新增），
+对比向量化的 find_changed_notes 与原来逐行 iterrows 比较的耗时，并校验两者结果一致。
+逐行实现在大数据量下非常慢，默认只在不超过 --legacy-max 行时运行。
+
+用法:
+    python benchmarks/merge_benchmark.py
+    python benchmarks/merge_benchmark.py --sizes 10000 100000 --legacy-max 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from redbook import find_changed_notes  # noqa: E402
+
+NUMBER_COLUMNS = ['曝光', '观看量', '封面点击率', '点赞', '评论', '收藏', '涨粉', '分享', '人均观看时长']
+
+
+def make_frames(size, seed=0):
+    """生成历史数据和 Excel 导出：约 10% 的行有修改，5% 为新增，部分数值为空"""
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp('2020-01-01')
+    publish = base + pd.to_timedelta(rng.permutation(size * 2)[:size] * 60, unit='s')
+    existing = pd.DataFrame({
+        '笔记标题': [f'笔记{i}' for i in range(size)],
+        '首次发布时间': publish.strftime('%Y年%m月%d日%H时%M分%S秒'),
+        '体裁': rng.choice(['图文', '视频'], size),
+    })
+    for col in NUMBER_COLUMNS:
+        existing[col] = rng.integers(0, 100000, size).astype(float)
+    existing.loc[rng.random(size) < 0.02, '分享'] = np.nan
+
+    excel = existing.copy()
+    changed = rng.random(size) < 0.1
+    excel.loc[changed, '观看量'] = excel.loc[changed, '观看量'] + 1
+    retitled = rng.random(size) < 0.01
+    excel.loc[retitled, '笔记标题'] = excel.loc[retitled, '笔记标题'] + '（修改）'
+
+    new_count = size // 20
+    new_rows = excel.sample(new_count, random_state=seed).copy()
+    new_rows['首次发布时间'] = (base - pd.to_timedelta(np.arange(1, new_count + 1), unit='s')).strftime(
+        '%Y年%m月%d日%H时%M分%S秒')
+    excel = pd.concat([excel, new_rows], ignore_index=True)
+    return excel, existing
+
+
+def legacy_find_changed_notes(excel_df, existing_df, unique_key='首次发布时间'):
+    """原来的逐行比较实现（仅用于对照）"""
+    excel_keys = set(excel_df[unique_key].astype(str))
+    existing_keys = set(existing_df[unique_key].astype(str))
+    new_records = len(excel_keys - existing_keys)
+
+    existing_dict = {}
+    for _, row in existing_df.iterrows():
+        existing_dict[str(row[unique_key])] = row.to_dict()
+
+    changed = []
+    for _, excel_row in excel_df.iterrows():
+        excel_key = str(excel_row[unique_key])
+        has_changes = False
+        if excel_key in existing_dict:
+            existing_row = existing_dict[excel_key]
+            for col in excel_df.columns:
+                if col == unique_key:
+                    continue
+                excel_value = excel_row[col]
+                existing_value = existing_row.get(col, '')
+                if pd.isna(excel_value):
+                    excel_value = ''
+                if pd.isna(existing_value):
+                    existing_value = ''
+                if col not in ['笔记标题', '体裁', '首次发布时间']:
+                    try:
+                        excel_num = float(excel_value) if excel_value != '' else 0
+                        existing_num = float(existing_value) if existing_value != '' else 0
+                        if excel_num != existing_num:
+                            has_changes = True
+                            break
+                    except (TypeError, ValueError):
+                        if str(excel_value) != str(existing_value):
+                            has_changes = True
+                            break
+                elif str(excel_value) != str(existing_value):
+                    has_changes = True
+                    break
+        changed.append(has_changes)
+    return new_records, pd.Series(changed, index=excel_df.index)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='merge_data_with_history 比较部分基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max', type=int, default=10000, help='运行逐行实现的最大行数')
+    args = parser.parse_args()
+
+    print(f"{'行数':>10} {'向量化(秒)':>12} {'逐行(秒)':>12} {'新增':>8} {'更新':>8}")
+    for size in args.sizes:
+        excel_df, existing_df = make_frames(size)
+        (new_records, changed), vector_time = timed(find_changed_notes, excel_df, existing_df)
+        legacy_text = '-'
+        if size <= args.legacy_max:
+            (legacy_new, legacy_changed), legacy_time = timed(legacy_find_changed_notes, excel_df, existing_df)
+            assert legacy_new == new_records, (legacy_new, new_records)
+            assert legacy_changed.equals(changed), '逐行实现与向量化实现的结果不一致'
+            legacy_text = f'{legacy_time:.3f}'
+        print(f'{size:>10} {vector_time:>12.3f} {legacy_text:>12} {new_records:>8} {int(changed.sum()):>8}')
+
+
+if __name__ == '__main__':
+    main()
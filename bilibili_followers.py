@@ -3,7 +3,7 @@ import datetime
 from bilibili_api import Credential, user
 import time
 import json
-import random
+from rate_limiter import get_throttle
 
 # 从 cookie 文件读取凭据信息
 def load_credential_from_cookie():
@@ -23,12 +23,15 @@ def load_credential_from_cookie():
     
     return credential
 
-async def get_bilibili_user_info(uid: str, credential, max_retries=3):
+async def get_bilibili_user_info(uid: str, credential, max_retries=3, throttle=None):
     """
     通过UID获取Bilibili用户的名称和粉丝数，带重试机制。
+    每次尝试前从自适应限流器取令牌；成功/412 等结果会反馈给限流器调节速率。
     """
+    throttle = throttle or get_throttle('bilibili')
     for attempt in range(max_retries):
         try:
+            await throttle.acquire()
             u = user.User(uid=int(uid), credential=credential)
             user_info = await u.get_user_info()
             username = user_info['name']
@@ -36,21 +39,25 @@ async def get_bilibili_user_info(uid: str, credential, max_retries=3):
             relation_info = await u.get_relation_info()
             follower_count = relation_info['follower']
             
+            throttle.record_success()
             return username, follower_count
             
         except Exception as e:
             error_msg = str(e)
             print(f"  -> 错误: 获取UID {uid} 信息失败: {e}")
             
+            # 412/429 是风控限流信号，乘性降低整个平台的速率和并发
+            if "412" in error_msg or "429" in error_msg:
+                throttle.record_throttled(error_msg[:50])
+            
             # 检查是否是网络错误（412状态码或其他网络相关错误）
             if ("412" in error_msg or "网络错误" in error_msg or 
                 "状态码" in error_msg or "timeout" in error_msg.lower() or
                 "connection" in error_msg.lower()):
                 
                 if attempt < max_retries - 1:  # 还有重试机会
-                    retry_delay = random.uniform(3, 8)  # 随机等待3-8秒
-                    print(f"  🔄 第{attempt + 1}次重试失败，{retry_delay:.1f}秒后进行第{attempt + 2}次尝试...")
-                    await asyncio.sleep(retry_delay)
+                    # 等待时间由限流器决定（下一次尝试前的 acquire）
+                    print(f"  🔄 第{attempt + 1}次尝试失败，准备进行第{attempt + 2}次尝试...")
                     continue
                 else:
                     print(f"  ❌ 重试{max_retries}次后仍然失败")
@@ -61,10 +68,11 @@ async def get_bilibili_user_info(uid: str, credential, max_retries=3):
     return None, None
 
 # 导出函数：获取B站数据
-async def get_bilibili_data(uids_list):
+async def get_bilibili_data(uids_list, on_result=None):
     """
     获取B站用户数据
     :param uids_list: UID列表
+    :param on_result: 可选回调 on_result(uid, 数据或None)，每个UID处理完立即调用
     :return: (成功数据列表, 失败UID列表)
     """
     print("🎬 开始获取Bilibili数据...")
@@ -78,25 +86,37 @@ async def get_bilibili_data(uids_list):
     data_list = []
     failed_uids = []
     current_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    throttle = get_throttle('bilibili')
     
-    for uid in uids_list:
-        print(f"  处理UID: {uid}")
-        username, followers = await get_bilibili_user_info(uid, credential)
+    async def fetch(uid):
+        # 并发数由自适应限流器的并发窗口控制，请求速率由令牌桶控制
+        async with throttle.slot():
+            print(f"  处理UID: {uid}")
+            username, followers = await get_bilibili_user_info(uid, credential, throttle=throttle)
         
+        record = None
         if username and followers is not None:
-            data_list.append({
+            record = {
                 '日期': current_date,
                 '账号名': username,
                 '平台': 'bilibili',
                 '粉丝数': followers
-            })
+            }
             print(f"  ✅ {username}: {followers:,} 粉丝")
         else:
             print(f"  ❌ 获取UID {uid} 失败")
+        
+        if on_result:
+            on_result(uid, record)
+        return record
+    
+    results = await asyncio.gather(*(fetch(uid) for uid in uids_list))
+    
+    for uid, record in zip(uids_list, results):
+        if record:
+            data_list.append(record)
+        else:
             failed_uids.append(uid)
-            
-        # 每个UID之间随机等待，避免请求过快
-        await asyncio.sleep(random.uniform(2, 4))
     
     return data_list, failed_uids
 
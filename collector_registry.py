@@ -0,0 +1,163 @@
+"""
+平台采集器注册表
+
+每个平台注册一个统一接口的异步采集函数：
+    async def collect(accounts, ctx) -> (数据列表, 失败账号列表, 错误代码列表)
+并声明并发上限、限速和所需凭据，由 followers_feishu 统一调度。
+新增平台或调整吞吐量只需注册/修改声明，不需要改动主流程。
+"""
+
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional
+
+
+class CollectorSpec:
+    """平台采集器声明"""
+    def __init__(self, name: str, collect: Callable, error_prefix: str,
+                 accounts: Callable[[], Optional[List[str]]],
+                 max_concurrency: int = 1,
+                 requests_per_second: Optional[float] = None,
+                 burst: int = 1,
+                 max_in_flight: int = 4,
+                 time_budget: Optional[float] = None,
+                 credentials: Optional[List[str]] = None,
+                 run_without_accounts: bool = False):
+        """
+        :param name: 平台键名（用于 failed_accounts / error_summary）
+        :param collect: 异步采集函数 collect(accounts, ctx)
+        :param error_prefix: 错误代码前缀，如 'BILIBILI'
+        :param accounts: 返回待采集账号列表的函数（运行时读取配置）
+        :param max_concurrency: 同时运行的分片数，账号列表会被均分为最多这么多份并发采集
+        :param requests_per_second: 平台允许的请求速率（次/秒），None 表示不限速
+        :param burst: 限速允许的突发请求数
+        :param max_in_flight: 自适应限流（AIMD）允许的最大在途请求数
+        :param time_budget: 该平台的时间预算（秒），超时后取消并保留已获取的数据；None 表示只受全局截止时间限制
+        :param credentials: 运行前必须存在的凭据文件
+        :param run_without_accounts: 账号列表为空时是否仍然运行（如微信公众号登录后自动识别账号）
+        """
+        self.name = name
+        self.collect = collect
+        self.error_prefix = error_prefix
+        self.accounts = accounts
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, int(burst))
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.time_budget = time_budget
+        self.credentials = list(credentials or [])
+        self.run_without_accounts = run_without_accounts
+
+    def get_accounts(self) -> Optional[List[str]]:
+        """读取当前配置的账号列表"""
+        return self.accounts()
+
+    def is_enabled(self) -> bool:
+        """判断该平台本次是否需要运行"""
+        accounts = self.get_accounts()
+        if self.run_without_accounts:
+            return accounts is not None
+        return bool(accounts)
+
+    def missing_credentials(self) -> List[str]:
+        """返回缺失的凭据文件列表"""
+        return [path for path in self.credentials if not os.path.exists(path)]
+
+    def shard_accounts(self) -> List[List[str]]:
+        """按并发上限把账号列表切分为若干分片（保持原有顺序的轮询切分）"""
+        accounts = list(self.get_accounts() or [])
+        if not accounts:
+            return [[]]
+        shard_count = min(self.max_concurrency, len(accounts))
+        return [accounts[i::shard_count] for i in range(shard_count)]
+
+
+class CollectorContext:
+    """
+    传给采集函数的运行上下文
+    采集函数通过 report 逐账号上报结果，平台超时被取消时已上报的数据不会丢失；
+    配置了 sink 时每条数据上报后立即推送给 sink 持久化
+    """
+    def __init__(self, spec: CollectorSpec, resources, executor, sink=None):
+        self.spec = spec
+        self.resources = resources
+        self.executor = executor
+        self.sink = sink
+        self.records = []       # 已上报的数据
+        self.failed = []        # 已处理但获取失败的账号
+        self.finished = set()   # 已处理完成（无论成功与否）的账号
+        self.cancelled = False
+
+    def report(self, account, record):
+        """
+        上报单个账号的结果（可在线程池中调用）
+        平台已被取消时抛出 CancelledError，让仍在线程中运行的同步采集循环尽快退出
+        """
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        self.finished.add(account)
+        if record:
+            self.records.append(record)
+            if self.sink is not None:
+                self.sink.emit(record)
+        else:
+            self.failed.append(account)
+
+    def cancel(self):
+        """标记平台已取消"""
+        self.cancelled = True
+
+    def unfinished_accounts(self) -> List[str]:
+        """返回尚未处理完成的账号"""
+        accounts = list(self.spec.get_accounts() or [])
+        if not accounts:
+            # 无账号列表的平台（如微信公众号）以平台名作为账号标识
+            accounts = [self.spec.name]
+        return [account for account in accounts if account not in self.finished]
+
+    async def run_sync(self, func, *args):
+        """在线程池中运行同步采集函数，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+
+# 注册表，按注册顺序保存
+_REGISTRY: Dict[str, CollectorSpec] = {}
+
+
+def register_collector(name: str, **options):
+    """
+    装饰器：注册平台采集函数
+    用法:
+        @register_collector('bilibili', error_prefix='BILIBILI', accounts=lambda: UIDS)
+        async def collect_bilibili(accounts, ctx): ...
+    """
+    def decorator(collect):
+        _REGISTRY[name] = CollectorSpec(name, collect, **options)
+        return collect
+    return decorator
+
+
+def configure_collector(name: str, **options):
+    """调整已注册平台的声明（并发上限、限速等）"""
+    spec = _REGISTRY.get(name)
+    if spec is None:
+        raise KeyError(f"未注册的平台采集器: {name}")
+    for key, value in options.items():
+        if not hasattr(spec, key):
+            raise AttributeError(f"采集器声明不支持的参数: {key}")
+        setattr(spec, key, value)
+    spec.max_concurrency = max(1, int(spec.max_concurrency))
+    spec.burst = max(1, int(spec.burst))
+    spec.max_in_flight = max(1, int(spec.max_in_flight))
+    return spec
+
+
+def get_collector(name: str) -> Optional[CollectorSpec]:
+    """按名称获取平台采集器声明"""
+    return _REGISTRY.get(name)
+
+
+def get_registered_collectors() -> List[CollectorSpec]:
+    """按注册顺序返回所有平台采集器声明"""
+    return list(_REGISTRY.values())
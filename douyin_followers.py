@@ -7,13 +7,23 @@ import re
 import sys
 import os
 import time
-import random
 from urllib.parse import quote, unquote
+from rate_limiter import get_throttle
+from follower_history import FOLLOWER_COLUMNS, append_follower_rows
+
+# 风控中间页的识别特征：页面标题，或被重定向到的验证中心地址
+# 正常主页的脚本和资源地址中也可能出现 captcha 等字样，不能在整个页面中查找子串
+ANTI_BOT_PAGE_TITLES = ('验证码中间页',)
+ANTI_BOT_URL_MARKERS = ('/verifycenter/', 'verify.snssdk.com', 'verify.zijieapi.com')
+HTML_TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
 
 class DouyinFansCollectorEnhanced:
-    def __init__(self, cookie):
+    def __init__(self, cookie, client=None):
         self.cookie = cookie
         self.session_id = self.extract_session_id(cookie)
+        # 可选的共享 httpx.AsyncClient，由调用方管理生命周期；为空时每次请求临时创建
+        self.client = client
+        self.throttle = get_throttle('douyin')
         
     def extract_session_id(self, cookie):
         """从cookie中提取sessionid"""
@@ -38,6 +48,35 @@ class DouyinFansCollectorEnhanced:
             'sec-ch-ua-platform': '"macOS"'
         }
     
+    async def _get(self, url, **kwargs):
+        """发送GET请求（按平台限速），优先复用共享的HTTP客户端（保持连接池）"""
+        await self.throttle.acquire()
+        if self.client is not None:
+            response = await self.client.get(url, headers=self.get_headers(), timeout=30, **kwargs)
+        else:
+            async with httpx.AsyncClient(headers=self.get_headers(), timeout=30) as client:
+                response = await client.get(url, **kwargs)
+        
+        # 非200视为风控信号，乘性降速；200 则加性提速
+        if response.status_code != 200:
+            self.throttle.record_throttled(f"HTTP {response.status_code}")
+        elif self.is_anti_bot_page(response):
+            self.throttle.record_throttled("验证页面")
+        else:
+            self.throttle.record_success()
+        return response
+    
+    def is_anti_bot_page(self, response):
+        """判断是否返回了验证码/风控中间页（按最终地址和页面标题判断）"""
+        if 'text/html' not in response.headers.get('content-type', ''):
+            return False
+        url = str(response.url)
+        if any(marker in url for marker in ANTI_BOT_URL_MARKERS):
+            return True
+        match = HTML_TITLE_PATTERN.search(response.text)
+        title = match.group(1).strip() if match else ''
+        return any(marker in title for marker in ANTI_BOT_PAGE_TITLES)
+    
     async def get_user_by_search(self, unique_id):
         """通过搜索API获取用户信息"""
         try:
@@ -59,24 +98,23 @@ class DouyinFansCollectorEnhanced:
                 'count': '10'
             }
             
-            async with httpx.AsyncClient(headers=self.get_headers(), timeout=30) as client:
-                response = await client.get(search_url, params=params)
+            response = await self._get(search_url, params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # 解析搜索结果
-                    if 'user_list' in data and data['user_list']:
-                        for user in data['user_list']:
-                            user_info = user.get('user_info', {})
-                            if user_info.get('unique_id') == unique_id or user_info.get('short_id') == unique_id:
-                                return self.format_user_data(user_info, unique_id)
-                    
-                    print(f"⚠️ 在搜索结果中未找到用户 {unique_id}")
-                    return None
-                else:
-                    print(f"❌ 搜索请求失败，状态码: {response.status_code}")
-                    return None
+                # 解析搜索结果
+                if 'user_list' in data and data['user_list']:
+                    for user in data['user_list']:
+                        user_info = user.get('user_info', {})
+                        if user_info.get('unique_id') == unique_id or user_info.get('short_id') == unique_id:
+                            return self.format_user_data(user_info, unique_id)
+                
+                print(f"⚠️ 在搜索结果中未找到用户 {unique_id}")
+                return None
+            else:
+                print(f"❌ 搜索请求失败，状态码: {response.status_code}")
+                return None
                     
         except Exception as e:
             print(f"❌ 搜索用户信息时出错: {str(e)}")
@@ -89,27 +127,26 @@ class DouyinFansCollectorEnhanced:
             
             profile_url = f"https://www.douyin.com/user/{unique_id}"
             
-            async with httpx.AsyncClient(headers=self.get_headers(), timeout=30, follow_redirects=True) as client:
-                response = await client.get(profile_url)
+            response = await self._get(profile_url, follow_redirects=True)
+            
+            if response.status_code == 200:
+                html_content = response.text
                 
-                if response.status_code == 200:
-                    html_content = response.text
-                    
-                    # 尝试从页面中提取数据
-                    user_data = self.extract_from_html(html_content, unique_id)
-                    if user_data:
-                        return user_data
-                    
-                    # 尝试从INITIAL_STATE中提取
-                    user_data = self.extract_from_initial_state(html_content, unique_id)
-                    if user_data:
-                        return user_data
-                    
-                    print(f"⚠️ 无法从主页提取用户 {unique_id} 的数据")
-                    return None
-                else:
-                    print(f"❌ 访问主页失败，状态码: {response.status_code}")
-                    return None
+                # 尝试从页面中提取数据
+                user_data = self.extract_from_html(html_content, unique_id)
+                if user_data:
+                    return user_data
+                
+                # 尝试从INITIAL_STATE中提取
+                user_data = self.extract_from_initial_state(html_content, unique_id)
+                if user_data:
+                    return user_data
+                
+                print(f"⚠️ 无法从主页提取用户 {unique_id} 的数据")
+                return None
+            else:
+                print(f"❌ 访问主页失败，状态码: {response.status_code}")
+                return None
                     
         except Exception as e:
             print(f"❌ 访问用户主页时出错: {str(e)}")
@@ -241,9 +278,6 @@ class DouyinFansCollectorEnhanced:
         if user_data:
             return user_data
         
-        # 等待一段时间
-        await asyncio.sleep(2)
-        
         # 方法2: 通过用户主页
         user_data = await self.get_user_by_profile_page(unique_id)
         if user_data:
@@ -251,18 +285,20 @@ class DouyinFansCollectorEnhanced:
         
         return None
     
-    async def collect_fans_data(self, user_list):
-        """批量收集粉丝数据"""
+    async def collect_fans_data(self, user_list, on_result=None):
+        """
+        批量收集粉丝数据
+        :param on_result: 可选回调 on_result(抖音号, 数据)，每个抖音号处理完立即调用
+        """
         all_data = []
+        valid_ids = [unique_id for unique_id in user_list if unique_id and unique_id.strip() != ""]
         
-        for unique_id in user_list:
-            if not unique_id or unique_id.strip() == "":
-                continue
-            
-            user_data = await self.get_user_info(unique_id)
+        async def fetch(unique_id):
+            # 并发数由自适应限流器的并发窗口控制
+            async with self.throttle.slot():
+                user_data = await self.get_user_info(unique_id)
             
             if user_data:
-                all_data.append(user_data)
                 print(f"✅ 成功获取 {user_data['账号名']} 的数据")
                 print(f"   粉丝数: {user_data['粉丝数']:,}")
                 if '关注数' in user_data and user_data['关注数'] > 0:
@@ -271,19 +307,20 @@ class DouyinFansCollectorEnhanced:
                     print(f"   作品数: {user_data['作品数']:,}")
             else:
                 print(f"❌ 获取抖音号 {unique_id} 的数据失败")
-                all_data.append({
+                user_data = {
                     '日期': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                     '账号名': f"获取失败_{unique_id}",
                     '平台': '抖音',
                     '粉丝数': 0,
                     '抖音号': unique_id,
                     '备注': '数据获取失败'
-                })
+                }
             
-            # 随机延迟
-            delay = random.uniform(3, 6)
-            print(f"⏱️ 等待 {delay:.1f} 秒...")
-            await asyncio.sleep(delay)
+            if on_result:
+                on_result(unique_id, user_data)
+            return user_data
+        
+        all_data.extend(await asyncio.gather(*(fetch(unique_id) for unique_id in valid_ids)))
         
         return all_data
     
@@ -292,28 +329,13 @@ class DouyinFansCollectorEnhanced:
         if not data:
             print("❌ 没有数据可保存")
             return
-        # 检查文件是否存在,如果存在则读取已有数据
+        # 只追加本次的新行，不读取和重写历史数据
+        df_output = pd.DataFrame(data)[FOLLOWER_COLUMNS]
         try:
-            if os.path.exists(filename):
-                existing_df = pd.read_csv(filename, encoding='utf-8-sig')
-                print(f"\n📖 从 {filename} 读取已有数据...")
-            else:
-                existing_df = pd.DataFrame(columns=['日期', '账号名', '平台', '粉丝数'])
-                print(f"\n📝 创建新的数据文件 {filename}")
+            append_follower_rows(data, filename)
         except Exception as e:
-            print(f"⚠️ 读取已有数据时出错: {str(e)}")
-            existing_df = pd.DataFrame(columns=['日期', '账号名', '平台', '粉丝数'])
-
-        # 将新数据转换为DataFrame
-        df = pd.DataFrame(data)
-        output_columns = ['日期', '账号名', '平台', '粉丝数']
-        df_output = df[output_columns]
-        
-        # 合并新旧数据
-        combined_df = pd.concat([existing_df, df_output], ignore_index=True)
-        
-        # 保存合并后的数据
-        combined_df.to_csv(filename, index=False, encoding='utf-8-sig')
+            print(f"❌ 保存到CSV文件时出错: {e}")
+            return
         print(f"\n✅ 数据已追加保存到 {filename}")
         
         # 统计信息
@@ -0,0 +1,179 @@
+"""
+小红书导出目录（downloads/redbook）的索引与保留策略
+
+data/redbook_exports.json 记录每个导出文件的 文件名/修改时间/大小/内容哈希/数据哈希/数据行数，
+查找"最近的有效导出"只读索引，不必列出并 stat 整个目录；
+索引同时记录目录的修改时间，目录中有索引外的增删（如手动放入文件）时才重新扫描。
+
+保留策略（每次加入新导出时执行）:
+- 去重: 数据内容相同（解析后的数据哈希相同）的旧导出直接删除，只保留最新的一个。
+  重新导出的 xlsx 即使数据相同字节也不同，所以按解析后的数据而不是文件哈希去重
+- 清理: 超过 KEEP_DAYS 天的导出删除，但始终保留最新的 KEEP_LATEST 个。
+  xlsx 本身是 zip 压缩格式，再压缩几乎没有收益，因此旧导出直接删除而不是压缩保存；
+  历史数据已合并在 data/redbook_data.csv 中
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from redbook_ingest import DEFAULT_CACHE_DIR, load_export
+from stage_cache import frame_fingerprint
+
+DEFAULT_EXPORT_DIR = os.path.join('downloads', 'redbook')
+DEFAULT_INDEX_PATH = os.path.join('data', 'redbook_exports.json')
+EXPORT_EXTENSIONS = ('.xlsx', '.xls')
+KEEP_DAYS = 30
+KEEP_LATEST = 5
+
+
+class ExportCatalog:
+    """导出目录的索引"""
+    def __init__(self, export_dir: str = DEFAULT_EXPORT_DIR, index_path: str = DEFAULT_INDEX_PATH,
+                 cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        """
+        :param export_dir: 导出文件目录
+        :param index_path: 索引文件（放在导出目录之外，写索引不会改变目录的修改时间）
+        :param cache_dir: Excel 解析缓存目录（计算行数和数据哈希时复用，见 redbook_ingest）
+        """
+        self.export_dir = export_dir
+        self.index_path = index_path
+        self.cache_dir = cache_dir
+        self.entries: Dict[str, Dict] = {}   # 文件名 -> 记录
+        self.dir_mtime = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"⚠️ 读取导出索引失败，将重新扫描目录: {e}")
+            return
+        if os.path.abspath(index.get('export_dir', '')) == os.path.abspath(self.export_dir):
+            self.entries = index.get('exports', {})
+            self.dir_mtime = index.get('dir_mtime')
+
+    def save(self):
+        self.dir_mtime = self._current_dir_mtime()
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'export_dir': self.export_dir, 'dir_mtime': self.dir_mtime, 'exports': self.entries},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.index_path)
+
+    def _current_dir_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.export_dir).st_mtime
+        except OSError:
+            return None
+
+    def is_stale(self) -> bool:
+        """目录在上次保存索引之后有过增删（索引之外的变化）"""
+        return self.dir_mtime is None or self._current_dir_mtime() != self.dir_mtime
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.export_dir, name)
+
+    def _describe(self, path: str) -> Dict:
+        """解析导出文件，生成索引记录；无法解析的文件记为无效"""
+        stat = os.stat(path)
+        entry = {'mtime': stat.st_mtime, 'size': stat.st_size,
+                 'sha256': None, 'data_hash': None, 'rows': 0, 'valid': False}
+        try:
+            df, digest = load_export(path, self.cache_dir)
+            entry.update(sha256=digest, data_hash=frame_fingerprint(df), rows=len(df), valid=len(df) > 0)
+        except Exception as e:
+            print(f"⚠️ 无法解析导出文件 {os.path.basename(path)}: {e}")
+        return entry
+
+    def refresh(self):
+        """扫描目录校准索引：加入索引外的文件，移除已不存在的文件，重新解析被修改过的文件"""
+        if not os.path.exists(self.export_dir):
+            self.entries = {}
+            self.dir_mtime = None
+            return
+        names = {name for name in os.listdir(self.export_dir) if name.endswith(EXPORT_EXTENSIONS)}
+        for name in list(self.entries):
+            if name not in names:
+                del self.entries[name]
+        for name in sorted(names):
+            stat = os.stat(self._path(name))
+            entry = self.entries.get(name)
+            if entry is None or entry.get('mtime') != stat.st_mtime or entry.get('size') != stat.st_size:
+                self.entries[name] = self._describe(self._path(name))
+        self.save()
+
+    def add(self, path: str, keep_days: Optional[float] = KEEP_DAYS, keep_latest: int = KEEP_LATEST) -> Dict:
+        """
+        把新下载的导出文件加入索引，并执行去重和清理
+        :return: 新文件的索引记录
+        """
+        name = os.path.basename(path)
+        if self.is_stale():
+            # 同时收录目录中索引之外的文件（新文件也在其中）
+            self.refresh()
+        entry = self.entries.get(name) or self._describe(path)
+        self.entries[name] = entry
+        self._remove(self._duplicates_of(name))
+        self.apply_retention(keep_days, keep_latest, save=False)
+        self.save()
+        return entry
+
+    def _duplicates_of(self, name: str) -> List[str]:
+        """与 name 数据内容相同的其他导出"""
+        data_hash = self.entries[name].get('data_hash')
+        if not data_hash:
+            return []
+        return [other for other, entry in self.entries.items()
+                if other != name and entry.get('data_hash') == data_hash]
+
+    def _remove(self, names: List[str]):
+        for name in names:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"⚠️ 删除导出文件 {name} 失败: {e}")
+                continue
+            self.entries.pop(name, None)
+            print(f"🧹 已删除导出文件: {name}")
+
+    def apply_retention(self, keep_days: Optional[float] = KEEP_DAYS, keep_latest: int = KEEP_LATEST,
+                        save: bool = True) -> List[str]:
+        """删除超过 keep_days 天的导出（始终保留最新的 keep_latest 个），返回删除的文件名"""
+        if keep_days is None:
+            return []
+        cutoff = time.time() - keep_days * 86400
+        ordered = sorted(self.entries, key=lambda name: self.entries[name]['mtime'], reverse=True)
+        expired = [name for name in ordered[keep_latest:] if self.entries[name]['mtime'] < cutoff]
+        self._remove(expired)
+        if save:
+            self.save()
+        return expired
+
+    def latest(self, max_age_hours: Optional[float] = None) -> Optional[Dict]:
+        """
+        最近的有效导出（能解析且有数据）
+        :param max_age_hours: 只考虑该时间内的导出
+        :return: 索引记录（含 'name'、'path'），没有时返回 None
+        """
+        if self.is_stale():
+            # 目录中有索引之外的增删（如手动放入的文件），扫描一次校准索引
+            self.refresh()
+        return self._latest_indexed(max_age_hours)
+
+    def _latest_indexed(self, max_age_hours: Optional[float]) -> Optional[Dict]:
+        cutoff = time.time() - max_age_hours * 3600 if max_age_hours is not None else None
+        ordered = sorted(self.entries.items(), key=lambda item: item[1]['mtime'], reverse=True)
+        for name, entry in ordered:
+            if cutoff is not None and entry['mtime'] < cutoff:
+                break
+            if entry.get('valid') and os.path.exists(self._path(name)):
+                return {**entry, 'name': name, 'path': self._path(name)}
+        return None
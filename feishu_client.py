@@ -0,0 +1,454 @@
+"""
+飞书多维表格 API 客户端
+
+followers_feishu 和 redbook 共用一个带连接池的 requests.Session（keep-alive），
+同步几千行数据时不再为每个请求重新建立 TCP/TLS 连接。
+统一处理超时、重试退避和飞书返回的错误码，提供按用途划分的方法：
+获取令牌、列出数据表、分页读取记录、批量新增、批量更新。
+upload_batches 把大量记录分成 500 条一批，在 QPS 限制下逐批发送，失败的批次单独重试
+（写冲突按带抖动的指数退避重试更多次），结果按批次顺序汇总。
+同一数据表的并发写入会触发写冲突（1254291），concurrency > 1 只作为可选项保留，默认不启用。
+
+tenant_access_token 有效期约两小时，TokenCache 在进程内存和本机缓存文件中保存令牌，
+文件读写加锁，monitor_bot 连续启动的多个脚本进程共用同一个令牌；
+令牌在到期前 TOKEN_REFRESH_MARGIN 秒内会提前刷新。
+"""
+
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import TokenBucket
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只保留进程内缓存和无锁的文件缓存
+    fcntl = None
+
+FEISHU_API_BASE = "https://open.feishu.cn/open-apis"
+
+DEFAULT_TIMEOUT = (5, 30)     # (连接超时, 读取超时) 秒
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5         # 第 n 次重试前等待 backoff * 2^(n-1) 秒
+DEFAULT_POOL_SIZE = 10
+
+# 需要重试的 HTTP 状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# 飞书频率限制错误码（请求未被处理，可以安全重试）
+RATE_LIMIT_CODES = {99991400}
+# 令牌无效/过期的错误码（收到后丢弃缓存的令牌）
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991668}
+# 单次批量写入的记录上限
+MAX_BATCH_SIZE = 500
+
+# 批量写入同一数据表时同时在途的批次数和每秒请求数（飞书写接口限频约 10 次/秒）
+# 同一数据表的并发写入会触发写冲突（1254291），默认逐批写入；大于 1 为可选项，
+# 冲突的批次只会退避重试，通常不会更快
+UPLOAD_CONCURRENCY = 1
+UPLOAD_QPS = 5
+UPLOAD_BATCH_RETRIES = 2
+# 批次失败后可以整批重试的错误码：写冲突（同一数据表并发写入）、频率限制
+WRITE_CONFLICT_CODE = 1254291
+BATCH_RETRY_CODES = {WRITE_CONFLICT_CODE, 99991400}
+# 写冲突的重试次数（带随机抖动的指数退避，等其他写入完成）
+WRITE_CONFLICT_RETRIES = 6
+
+# 令牌缓存文件放在系统临时目录，不会被 monitor_bot 的自动 Git 备份提交
+TOKEN_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'feishu_token_cache.json')
+TOKEN_REFRESH_MARGIN = 10 * 60   # 距离过期不足该秒数时提前刷新
+
+
+class FeishuAPIError(Exception):
+    """飞书接口返回非 0 错误码或请求失败"""
+    def __init__(self, msg: str, code: Optional[int] = None):
+        super().__init__(msg)
+        self.code = code
+        self.msg = msg
+
+
+class BatchResult:
+    """upload_batches 中单个批次的结果"""
+    def __init__(self, index: int, records: List[Dict]):
+        self.index = index              # 批次序号（从 0 开始）
+        self.records = records          # 发送的记录
+        self.response_records = []      # 接口返回的记录（新增时包含 record_id）
+        self.error: Optional[FeishuAPIError] = None
+        self.attempts = 0
+        self.client_token: Optional[str] = None   # 批次的幂等标识，最终失败时用于排查
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class TokenCache:
+    """
+    tenant_access_token 缓存（进程内 + 文件，线程和进程安全）
+    缓存文件按 app_id 保存 {令牌, 过期时间}，权限为 600
+    """
+    def __init__(self, path: Optional[str] = TOKEN_CACHE_PATH, refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        """
+        :param path: 缓存文件路径，None 表示只在进程内缓存
+        :param refresh_margin: 提前刷新的秒数
+        """
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self._memory: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(app_id: str, app_secret: str) -> str:
+        # 密钥变化后旧令牌不再使用；缓存文件中不保存密钥本身
+        return app_id + ':' + hashlib.sha256(app_secret.encode('utf-8')).hexdigest()[:16]
+
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and entry.get('expires_at', 0) - time.time() > self.refresh_margin
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的排他锁（持锁期间只有一个进程去获取新令牌）"""
+        if self.path is None or fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_file(self) -> Dict:
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def _write_file(self, entries: Dict):
+        if self.path is None:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.path)
+
+    def get(self, app_id: str, app_secret: str, fetch, force_refresh: bool = False) -> str:
+        """
+        返回有效令牌，缓存中没有或即将过期时调用 fetch() 获取
+        :param fetch: 返回 (令牌, 有效秒数) 的函数
+        :param force_refresh: 忽略缓存直接获取新令牌
+        """
+        key = self._key(app_id, app_secret)
+        with self._lock:
+            entry = self._memory.get(key)
+            if not force_refresh and self._is_fresh(entry):
+                return entry['token']
+
+            with self._file_lock():
+                entries = self._read_file()
+                entry = entries.get(key)
+                if force_refresh or not self._is_fresh(entry):
+                    token, expire = fetch()
+                    entry = {'token': token, 'expires_at': time.time() + expire}
+                    entries = {k: v for k, v in entries.items() if v.get('expires_at', 0) > time.time()}
+                    entries[key] = entry
+                    try:
+                        self._write_file(entries)
+                    except OSError as e:
+                        print(f"⚠️ 写入飞书令牌缓存失败: {e}")
+                self._memory[key] = entry
+                return entry['token']
+
+    def invalidate(self, token: str):
+        """丢弃已失效的令牌"""
+        with self._lock:
+            self._memory = {k: v for k, v in self._memory.items() if v.get('token') != token}
+            with self._file_lock():
+                entries = self._read_file()
+                remaining = {k: v for k, v in entries.items() if v.get('token') != token}
+                if len(remaining) != len(entries):
+                    try:
+                        self._write_file(remaining)
+                    except OSError:
+                        pass
+
+
+_default_token_cache = TokenCache()
+
+
+class FeishuClient:
+    """飞书开放平台客户端（线程安全，可在多个线程中共用）"""
+    def __init__(self, app_id: str, app_secret: str, app_token: Optional[str] = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 token_cache: Optional[TokenCache] = None):
+        """
+        :param app_id: 飞书应用ID
+        :param app_secret: 飞书应用密钥
+        :param app_token: 默认的多维表格 app_token
+        :param timeout: 请求超时 (连接, 读取)
+        :param max_retries: 网络错误/限流/5xx 时的最大重试次数
+        :param backoff: 重试退避基数（秒）
+        :param pool_size: 连接池大小
+        :param token_cache: 令牌缓存，默认使用进程内共享并落盘到 TOKEN_CACHE_PATH 的缓存
+        """
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.app_token = app_token
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = backoff
+        self.token_cache = token_cache or _default_token_cache
+        self.write_limiter = TokenBucket(UPLOAD_QPS, 1)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json; charset=utf-8'})
+
+    def close(self):
+        self.session.close()
+
+    def _sleep_before_retry(self, attempt: int, response: Optional[requests.Response] = None,
+                            jitter: bool = False):
+        delay = self.backoff * (2 ** attempt)
+        if jitter:
+            # 并发的写入方错开重试时间，避免再次同时写入同一数据表
+            delay *= random.uniform(0.5, 1.5)
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+        time.sleep(delay)
+
+    def request(self, method: str, path: str, access_token: Optional[str] = None,
+                idempotent: bool = True, **kwargs) -> Dict:
+        """
+        发送请求并返回响应 JSON 中的 data（code 不为 0 时抛出 FeishuAPIError）
+        :param idempotent: 是否可以在响应丢失时重试。批量新增不是幂等的，
+                           只在确定请求未被处理（连接失败、限流）时重试
+        """
+        url = path if path.startswith('http') else f"{FEISHU_API_BASE}{path}"
+        headers = kwargs.pop('headers', {})
+        if access_token:
+            headers['Authorization'] = f'Bearer {access_token}'
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt >= self.max_retries
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # 连接阶段失败时请求一定没有发出；其他连接错误只有幂等请求才重试
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if last_attempt or not retryable:
+                    raise FeishuAPIError(f"网络错误: {e}")
+                self._sleep_before_retry(attempt)
+                continue
+            except requests.exceptions.Timeout as e:
+                if last_attempt or not idempotent:
+                    raise FeishuAPIError(f"请求超时: {e}")
+                self._sleep_before_retry(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                if response.status_code == 429 or idempotent:
+                    self._sleep_before_retry(attempt, response)
+                    continue
+
+            try:
+                result = response.json()
+            except ValueError:
+                raise FeishuAPIError(f"HTTP {response.status_code}: 响应不是有效的JSON")
+
+            code = result.get('code')
+            if code in RATE_LIMIT_CODES and not last_attempt:
+                self._sleep_before_retry(attempt, response)
+                continue
+            if code in TOKEN_INVALID_CODES and access_token:
+                self.token_cache.invalidate(access_token)
+            if code != 0:
+                raise FeishuAPIError(result.get('msg') or f"HTTP {response.status_code}", code)
+            # 获取令牌接口的字段在顶层，其他接口在 data 中
+            return result.get('data', result)
+
+        raise FeishuAPIError("超过最大重试次数")
+
+    # --- 鉴权 ---
+    def fetch_tenant_access_token(self) -> Tuple[str, int]:
+        """获取 tenant_access_token，返回 (令牌, 有效秒数)"""
+        result = self.request('POST', '/auth/v3/tenant_access_token/internal',
+                              json={'app_id': self.app_id, 'app_secret': self.app_secret})
+        return result['tenant_access_token'], int(result.get('expire', 7200))
+
+    def get_tenant_access_token(self, force_refresh: bool = False) -> str:
+        """获取 tenant_access_token（优先使用缓存，即将过期时提前刷新）"""
+        return self.token_cache.get(self.app_id, self.app_secret, self.fetch_tenant_access_token,
+                                    force_refresh=force_refresh)
+
+    # --- 多维表格 ---
+    def _app_token(self, app_token: Optional[str]) -> str:
+        app_token = app_token or self.app_token
+        if not app_token:
+            raise ValueError("缺少多维表格 app_token")
+        return app_token
+
+    def list_tables(self, access_token: str, app_token: Optional[str] = None) -> List[Dict]:
+        """列出多维表格中的所有数据表"""
+        path = f"/bitable/v1/apps/{self._app_token(app_token)}/tables"
+        tables = []
+        page_token = None
+        while True:
+            params = {'page_size': 100}
+            if page_token:
+                params['page_token'] = page_token
+            data = self.request('GET', path, access_token, params=params)
+            tables.extend(data.get('items') or [])
+            page_token = data.get('page_token')
+            if not data.get('has_more') or not page_token:
+                return tables
+
+    def iter_records(self, access_token: str, table_id: str, page_size: int = 500,
+                     app_token: Optional[str] = None, **params) -> Iterator[Dict]:
+        """逐页读取数据表记录（生成器）"""
+        path = f"/bitable/v1/apps/{self._app_token(app_token)}/tables/{table_id}/records"
+        page_token = None
+        while True:
+            query = dict(params, page_size=page_size)
+            if page_token:
+                query['page_token'] = page_token
+            data = self.request('GET', path, access_token, params=query)
+            for item in data.get('items') or []:
+                yield item
+            page_token = data.get('page_token')
+            if not data.get('has_more') or not page_token:
+                return
+
+    def list_records(self, access_token: str, table_id: str, page_size: int = 500,
+                     app_token: Optional[str] = None, **params) -> List[Dict]:
+        """读取数据表的全部记录"""
+        return list(self.iter_records(access_token, table_id, page_size, app_token, **params))
+
+    def batch_create(self, access_token: str, table_id: str, records: List[Dict],
+                     app_token: Optional[str] = None, client_token: Optional[str] = None) -> List[Dict]:
+        """
+        批量新增记录（单批不超过 500 条）
+        :param records: [{'fields': {...}}, ...]
+        :param client_token: 幂等标识（uuid4），重试同一批次时传入相同的值
+        :return: 新建的记录（含 record_id）
+        """
+        if len(records) > MAX_BATCH_SIZE:
+            raise ValueError(f"单批最多 {MAX_BATCH_SIZE} 条记录")
+        path = f"/bitable/v1/apps/{self._app_token(app_token)}/tables/{table_id}/records/batch_create"
+        # client_token 让飞书对同一批次的重复请求去重，因此批量新增也可以安全重试
+        data = self.request('POST', path, access_token, json={'records': records},
+                            params={'client_token': client_token or str(uuid.uuid4())})
+        return data.get('records') or []
+
+    def batch_update(self, access_token: str, table_id: str, records: List[Dict],
+                     app_token: Optional[str] = None) -> List[Dict]:
+        """
+        批量更新记录（单批不超过 500 条）
+        :param records: [{'record_id': ..., 'fields': {...}}, ...]
+        :return: 更新后的记录
+        """
+        if len(records) > MAX_BATCH_SIZE:
+            raise ValueError(f"单批最多 {MAX_BATCH_SIZE} 条记录")
+        path = f"/bitable/v1/apps/{self._app_token(app_token)}/tables/{table_id}/records/batch_update"
+        data = self.request('POST', path, access_token, json={'records': records})
+        return data.get('records') or []
+
+    def upload_batches(self, operation: str, access_token: str, table_id: str, records: List[Dict],
+                       batch_size: int = MAX_BATCH_SIZE, concurrency: int = UPLOAD_CONCURRENCY,
+                       qps: Optional[float] = UPLOAD_QPS, batch_retries: int = UPLOAD_BATCH_RETRIES,
+                       on_batch=None, app_token: Optional[str] = None) -> List[BatchResult]:
+        """
+        分批写入记录
+        :param operation: 'create' 或 'update'
+        :param batch_size: 每批记录数（不超过 500）
+        :param concurrency: 同时在途的批次数（同一数据表），默认 1 逐批顺序发送；
+                            大于 1 为可选的并发发送，同一数据表上容易触发写冲突
+        :param qps: 写请求每秒上限（所有批次共享），None 表示不限
+        :param batch_retries: 单个批次失败后整批重试的次数（限流、网络错误）；
+                              写冲突至少重试 WRITE_CONFLICT_RETRIES 次
+        :param on_batch: 每个批次完成后的回调 on_batch(result, total_batches)，在工作线程中调用
+        :return: 按批次顺序排列的 BatchResult 列表
+        """
+        if operation not in ('create', 'update'):
+            raise ValueError(f"不支持的批量操作: {operation}")
+        batch_size = max(1, min(int(batch_size), MAX_BATCH_SIZE))
+        results = [BatchResult(index, records[start:start + batch_size])
+                   for index, start in enumerate(range(0, len(records), batch_size))]
+        if not results:
+            return results
+        self.write_limiter.configure(qps)
+
+        def send(result: BatchResult):
+            # 同一批次的所有重试使用同一个 client_token，飞书不会重复新增
+            client_token = result.client_token = str(uuid.uuid4())
+            conflict_retries = max(batch_retries, WRITE_CONFLICT_RETRIES)
+            for attempt in range(conflict_retries + 1):
+                result.attempts = attempt + 1
+                self.write_limiter.acquire_sync()
+                try:
+                    if operation == 'create':
+                        result.response_records = self.batch_create(access_token, table_id, result.records,
+                                                                    app_token, client_token=client_token)
+                    else:
+                        result.response_records = self.batch_update(access_token, table_id, result.records,
+                                                                    app_token)
+                    result.error = None
+                    break
+                except FeishuAPIError as e:
+                    result.error = e
+                    if e.code is not None and e.code not in BATCH_RETRY_CODES:
+                        break
+                    retries = conflict_retries if e.code == WRITE_CONFLICT_CODE else batch_retries
+                    if attempt >= retries:
+                        break
+                    self._sleep_before_retry(attempt, jitter=e.code == WRITE_CONFLICT_CODE)
+            if on_batch:
+                on_batch(result, len(results))
+            return result
+
+        workers = max(1, min(int(concurrency), len(results)))
+        if workers == 1:
+            for result in results:
+                send(result)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(send, results))
+        return results
+
+
+_clients: Dict[Tuple[str, str, Optional[str]], FeishuClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_feishu_client(app_id: str, app_secret: str, app_token: Optional[str] = None) -> FeishuClient:
+    """获取进程内共享的客户端（同一应用复用同一个连接池）"""
+    key = (app_id, app_secret, app_token)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = FeishuClient(app_id, app_secret, app_token)
+            _clients[key] = client
+        return client
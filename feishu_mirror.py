@@ -0,0 +1,139 @@
+"""
+飞书多维表格的本地镜像
+
+保存 主键 -> {record_id, 字段哈希, 字段} 的映射，增量同步时直接用镜像比较，
+不必每次分页读取整张表：
+- 我们自己的新增/更新请求成功后，用接口返回的记录更新镜像
+- 同步前查询一次数据表的 revision，与镜像记录的 revision 相同（表格没有被修改）
+  且距上次全量读取未超过 max_age_hours 时直接使用镜像，否则全量读取一次并重建镜像
+- 写入接口不返回 revision，本次同步有写入时清除镜像的 revision，下次同步全量读取，
+  避免把写入期间其他人的修改当作已知版本
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_MIRROR_PATH = os.path.join('data', 'feishu_mirror.json')
+DEFAULT_MAX_AGE_HOURS = 24 * 7
+
+
+def fields_hash(fields: Dict) -> str:
+    """字段内容的稳定哈希（与字段顺序无关）"""
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+class TableMirror:
+    """单个飞书数据表的本地镜像"""
+    def __init__(self, table_id: str, key_func: Callable[[Dict], Optional[str]],
+                 path: str = DEFAULT_MIRROR_PATH, hash_func: Callable[[Dict], str] = fields_hash):
+        """
+        :param table_id: 数据表ID（镜像文件按数据表分别保存）
+        :param key_func: 从记录字段计算主键的函数，返回 None 表示该记录没有主键
+        :param path: 镜像文件路径
+        :param hash_func: 计算字段内容哈希的函数
+        """
+        self.table_id = table_id
+        self.key_func = key_func
+        self.hash_func = hash_func
+        self.path = path
+        self.revision = None
+        self.full_synced_at = 0.0
+        self.records: Dict[str, Dict] = {}   # 主键 -> {'record_id', 'hash', 'fields'}
+        self._keys_by_id: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                tables = json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"⚠️ 读取飞书表格镜像失败，将重新全量读取: {e}")
+            return
+        state = tables.get(self.table_id) or {}
+        self.revision = state.get('revision')
+        self.full_synced_at = state.get('full_synced_at', 0.0)
+        self.records = state.get('records') or {}
+        self._keys_by_id = {entry['record_id']: key for key, entry in self.records.items()}
+
+    def save(self):
+        tables = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    tables = json.load(f)
+            except (ValueError, OSError):
+                tables = {}
+        tables[self.table_id] = {
+            'revision': self.revision,
+            'full_synced_at': self.full_synced_at,
+            'records': self.records
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(tables, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def is_usable(self, current_revision, max_age_hours: float = DEFAULT_MAX_AGE_HOURS) -> bool:
+        """镜像是否可以代替全量读取：revision 未变化且未超过全量校准周期"""
+        if not self.full_synced_at or current_revision is None or self.revision is None:
+            return False
+        if time.time() - self.full_synced_at > max_age_hours * 3600:
+            return False
+        return current_revision == self.revision
+
+    def _put(self, record_id: str, fields: Dict) -> bool:
+        key = self.key_func(fields)
+        if not key:
+            return False
+        old_key = self._keys_by_id.get(record_id)
+        if old_key is not None and old_key != key:
+            self.records.pop(old_key, None)
+        self.records[key] = {'record_id': record_id, 'hash': self.hash_func(fields), 'fields': fields}
+        self._keys_by_id[record_id] = key
+        return True
+
+    def replace_all(self, records: List[Dict], revision=None) -> int:
+        """
+        用全量读取的记录重建镜像
+        :return: 与旧镜像相比内容发生变化（新增/修改/删除）的记录数
+        """
+        old_hashes = {entry['record_id']: entry['hash'] for entry in self.records.values()}
+        self.records = {}
+        self._keys_by_id = {}
+        for record in records:
+            self._put(record['record_id'], record.get('fields') or {})
+        new_hashes = {entry['record_id']: entry['hash'] for entry in self.records.values()}
+        changed = sum(1 for record_id, value in new_hashes.items() if old_hashes.get(record_id) != value)
+        changed += sum(1 for record_id in old_hashes if record_id not in new_hashes)
+        self.revision = revision
+        self.full_synced_at = time.time()
+        return changed
+
+    def apply_created(self, records: List[Dict]):
+        """用批量新增接口返回的记录（含 record_id 和字段）更新镜像"""
+        for record in records:
+            if record.get('record_id'):
+                self._put(record['record_id'], record.get('fields') or {})
+
+    def apply_updated(self, records: List[Dict]):
+        """用批量更新的记录更新镜像（只包含变化的字段，与镜像中的原字段合并）"""
+        for record in records:
+            record_id = record.get('record_id')
+            key = self._keys_by_id.get(record_id)
+            if key is None:
+                continue
+            fields = dict(self.records[key]['fields'])
+            fields.update(record.get('fields') or {})
+            self._put(record_id, fields)
+
+    def as_existing_records(self) -> Dict[str, Dict]:
+        """主键 -> {'record_id', 'fields', 'hash'}，比全量读取构建的映射多一个内容哈希"""
+        return {key: {'record_id': entry['record_id'], 'fields': entry['fields'], 'hash': entry['hash']}
+                for key, entry in self.records.items()}
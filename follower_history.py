@@ -0,0 +1,161 @@
+"""
+粉丝数历史记录的追加写入
+
+data/followers.csv 只追加新行，不再每次读入整个文件、拼接后重写，
+单次运行的开销与历史长度无关。新文件写入 UTF-8 BOM 和表头（兼容 Excel），
+追加时不会在文件中间写入 BOM。compact_history 可定期去重、排序并原子替换文件。
+"""
+
+import csv
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+FOLLOWER_COLUMNS = ['日期', '账号名', '平台', '粉丝数']
+UTF8_BOM = '﻿'
+
+
+class FollowerHistoryWriter:
+    """
+    追加写入粉丝数历史CSV
+    每次 append 后 flush 到操作系统（进程崩溃不丢数据），close 时只做一次 fsync
+    """
+    def __init__(self, filename, columns=None):
+        self.filename = filename
+        self.columns = list(columns or FOLLOWER_COLUMNS)
+        self.file = None
+        self.writer = None
+        self.rows_written = 0
+
+    def open(self):
+        """以追加模式打开文件；新文件/空文件先写入 BOM 和表头"""
+        if self.file is not None:
+            return self
+        os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+        is_new_file = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        needs_newline = not is_new_file and not self._ends_with_newline()
+
+        self.file = open(self.filename, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+        if is_new_file:
+            self.file.write(UTF8_BOM)
+            self.writer.writeheader()
+        elif needs_newline:
+            # 上次写入没有以换行结尾时补一个换行，避免新行接在旧行末尾
+            self.file.write('\r\n')
+        return self
+
+    def _ends_with_newline(self):
+        with open(self.filename, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+    def append(self, rows):
+        """追加若干行并 flush，返回写入行数"""
+        self.open()
+        rows = list(rows)
+        if rows:
+            self.writer.writerows(rows)
+            self.file.flush()
+            self.rows_written += len(rows)
+        return len(rows)
+
+    def close(self):
+        """fsync 并关闭文件"""
+        if self.file is None:
+            return
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        finally:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def append_follower_rows(rows, filename):
+    """把一批数据追加到历史CSV（一次打开、一次 fsync），返回写入行数"""
+    with FollowerHistoryWriter(filename) as writer:
+        return writer.append(rows)
+
+
+def compact_history(filename, columns=None):
+    """
+    压缩历史CSV：去掉完全重复的行，按日期稳定排序，写入临时文件后原子替换
+    :return: (压缩前行数, 压缩后行数)
+    """
+    columns = list(columns or FOLLOWER_COLUMNS)
+    if not os.path.exists(filename):
+        return 0, 0
+
+    with open(filename, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        rows = [tuple(row.get(col, '') for col in columns) for row in reader]
+
+    seen = set()
+    unique_rows = []
+    for row in rows:
+        if row not in seen:
+            seen.add(row)
+            unique_rows.append(row)
+    unique_rows.sort(key=lambda row: row[0])
+
+    directory = os.path.dirname(filename) or '.'
+    fd, temp_path = tempfile.mkstemp(prefix='.followers_', suffix='.csv', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(unique_rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, filename)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return len(rows), len(unique_rows)
+
+
+def _compaction_state_path(filename):
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f'.{name}.compaction.json')
+
+
+def maybe_compact_history(filename, interval_days):
+    """
+    距上次压缩超过 interval_days 天时执行一次 compact_history
+    :return: 执行了压缩时返回 (压缩前行数, 压缩后行数)，否则返回 None
+    """
+    if not interval_days or not os.path.exists(filename):
+        return None
+
+    state_path = _compaction_state_path(filename)
+    last_compacted = 0
+    if os.path.exists(state_path):
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                last_compacted = json.load(f).get('last_compacted', 0)
+        except (ValueError, OSError):
+            last_compacted = 0
+
+    if time.time() - last_compacted < interval_days * 86400:
+        return None
+
+    before, after = compact_history(filename)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'last_compacted': time.time(),
+            'last_compacted_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'rows': after
+        }, f, ensure_ascii=False)
+    return before, after
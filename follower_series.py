@@ -0,0 +1,211 @@
+"""
+按账号的内存映射时间序列存储（NumPy memmap）
+
+面向高频轮询大量账号的场景：每个账号一对 int64 数组文件（时间戳秒、粉丝数），
+以 np.memmap 映射，容量按倍数扩展，追加为均摊 O(1)；index.json 记录账号编号和长度。
+窗口涨粉/增长率用 searchsorted 在映射数组的切片上计算，不复制数据。
+
+目录结构:
+    <root>/index.json
+    <root>/<编号>.ts.i8     时间戳（秒，递增）
+    <root>/<编号>.cnt.i8    粉丝数
+同一目录只允许一个写入进程。
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SERIES_DIR = os.path.join('data', 'series')
+INITIAL_CAPACITY = 1024
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class _AccountSeries:
+    """单个账号的时间序列（两个内存映射数组）"""
+    def __init__(self, root: str, series_id: int, length: int = 0, capacity: int = 0):
+        self.root = root
+        self.series_id = series_id
+        self.length = length
+        self.capacity = 0
+        self.timestamps = None
+        self.counts = None
+        self._map(max(capacity, INITIAL_CAPACITY))
+
+    def _path(self, suffix):
+        return os.path.join(self.root, f'{self.series_id}.{suffix}.i8')
+
+    def _map(self, capacity: int):
+        """按指定容量映射数组文件（文件不足时扩展）"""
+        self.flush()
+        arrays = []
+        for suffix in ('ts', 'cnt'):
+            path = self._path(suffix)
+            size = capacity * 8
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            arrays.append(np.memmap(path, dtype=np.int64, mode='r+', shape=(capacity,)))
+        self.timestamps, self.counts = arrays
+        self.capacity = capacity
+
+    def flush(self):
+        if self.timestamps is not None:
+            self.timestamps.flush()
+            self.counts.flush()
+
+    def append(self, timestamp: int, count: int):
+        """追加一个样本；时间戳必须不早于最后一个样本"""
+        if self.length and timestamp < self.timestamps[self.length - 1]:
+            raise ValueError(f"时间戳必须递增: {timestamp} < {int(self.timestamps[self.length - 1])}")
+        if self.length >= self.capacity:
+            self._map(self.capacity * 2)
+        self.timestamps[self.length] = timestamp
+        self.counts[self.length] = count
+        self.length += 1
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 (时间戳, 粉丝数) 的只读切片（零拷贝）"""
+        timestamps = self.timestamps[:self.length].view(np.ndarray)
+        counts = self.counts[:self.length].view(np.ndarray)
+        timestamps.flags.writeable = False
+        counts.flags.writeable = False
+        return timestamps, counts
+
+
+def _to_epoch(value) -> int:
+    """日期字段 / datetime / 时间戳 -> 秒级时间戳（本地时间）"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.strptime(str(value).strip(), DATE_FORMAT).timestamp())
+
+
+class FollowerSeriesStore:
+    """内存映射的粉丝数时间序列存储"""
+    def __init__(self, root: str = DEFAULT_SERIES_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, 'index.json')
+        self.accounts: Dict[Tuple[str, str], _AccountSeries] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            for item in index.get('accounts', []):
+                key = (item['platform'], item['account'])
+                self.accounts[key] = _AccountSeries(root, item['id'], item['length'], item['capacity'])
+
+    def _get_series(self, platform: str, account: str, create: bool = False) -> Optional[_AccountSeries]:
+        key = (platform, account)
+        series = self.accounts.get(key)
+        if series is None and create:
+            series = _AccountSeries(self.root, len(self.accounts))
+            self.accounts[key] = series
+        return series
+
+    def append(self, platform: str, account: str, timestamp, count: int):
+        """追加一个样本（均摊 O(1)）"""
+        self._get_series(platform, account, create=True).append(_to_epoch(timestamp), int(count))
+
+    def append_rows(self, rows: Iterable[Dict]) -> int:
+        """
+        追加若干条 followers.csv 格式的数据，跳过获取失败（粉丝数 <= 0）和早于已有样本的数据
+        :return: 写入的样本数
+        """
+        samples = []
+        for row in rows:
+            try:
+                count = int(row['粉丝数'])
+                if count > 0:
+                    samples.append((_to_epoch(row['日期']), str(row['平台']), str(row['账号名']), count))
+            except (KeyError, TypeError, ValueError):
+                continue
+        samples.sort()
+
+        written = 0
+        for timestamp, platform, account, count in samples:
+            series = self._get_series(platform, account, create=True)
+            if series.length and timestamp < series.timestamps[series.length - 1]:
+                continue
+            series.append(timestamp, count)
+            written += 1
+        return written
+
+    def series(self, platform: str, account: str) -> Tuple[np.ndarray, np.ndarray]:
+        """返回账号的 (时间戳, 粉丝数) 数组（零拷贝只读视图）"""
+        series = self._get_series(platform, account)
+        if series is None:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return series.view()
+
+    def window_delta(self, platform: str, account: str, window_seconds: int,
+                     end=None) -> Optional[Dict]:
+        """
+        账号在 [end - window_seconds, end] 内的粉丝变化
+        :param end: 窗口结束时间，默认取账号最新样本
+        :return: {'start', 'end', 'start_count', 'end_count', 'change', 'rate_per_day'}，窗口内无样本时返回 None
+        """
+        timestamps, counts = self.series(platform, account)
+        if not len(timestamps):
+            return None
+        end_ts = int(timestamps[-1]) if end is None else _to_epoch(end)
+        left = np.searchsorted(timestamps, end_ts - window_seconds, side='left')
+        right = np.searchsorted(timestamps, end_ts, side='right')
+        if right <= left:
+            return None
+        first, last = left, right - 1
+        elapsed = int(timestamps[last] - timestamps[first])
+        change = int(counts[last] - counts[first])
+        return {
+            'start': int(timestamps[first]),
+            'end': int(timestamps[last]),
+            'start_count': int(counts[first]),
+            'end_count': int(counts[last]),
+            'change': change,
+            'rate_per_day': change * 86400 / elapsed if elapsed else 0.0
+        }
+
+    def window_deltas(self, window_seconds: int, end=None, platform: Optional[str] = None) -> pd.DataFrame:
+        """所有账号（或某平台账号）的窗口涨粉，按变化量降序"""
+        records = []
+        for (account_platform, account) in self.accounts:
+            if platform is not None and account_platform != platform:
+                continue
+            delta = self.window_delta(account_platform, account, window_seconds, end)
+            if delta:
+                records.append({'平台': account_platform, '账号名': account, **delta})
+        columns = ['平台', '账号名', 'start', 'end', 'start_count', 'end_count', 'change', 'rate_per_day']
+        df = pd.DataFrame(records, columns=columns)
+        return df.sort_values('change', ascending=False, ignore_index=True)
+
+    def list_accounts(self) -> List[Tuple[str, str]]:
+        return list(self.accounts)
+
+    def flush(self):
+        """把数组和索引写回磁盘"""
+        for series in self.accounts.values():
+            series.flush()
+        index = {'accounts': [
+            {'platform': platform, 'account': account, 'id': series.series_id,
+             'length': series.length, 'capacity': series.capacity}
+            for (platform, account), series in self.accounts.items()
+        ]}
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
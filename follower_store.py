@@ -0,0 +1,319 @@
+"""
+粉丝数时间序列的 SQLite 存储
+
+与 data/followers.csv 同步写入，按 (平台, 账号名, 日期) 建唯一索引并开启 WAL，
+"某账号近30天涨粉" 这类查询只需走索引，不必每次解析整个CSV。
+查询只统计粉丝数 > 0 的有效样本（获取失败的记录粉丝数为 0）。
+
+写入样本时同步增量更新按日/周/月的账号汇总（最新值、最小值、最大值、净变化、样本数），
+报表和机器人回复直接读取 rollups()，不必每次从原始数据重新聚合。
+
+一次性导入已有CSV:
+    python follower_store.py data/followers.csv
+"""
+
+import csv
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_DB_PATH = 'data/followers.db'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS followers (
+    date TEXT NOT NULL,
+    account TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    followers INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_followers_key ON followers (platform, account, date);
+CREATE TABLE IF NOT EXISTS follower_rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    account TEXT NOT NULL,
+    open_value INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    last_value INTEGER NOT NULL,
+    min_value INTEGER NOT NULL,
+    max_value INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    PRIMARY KEY (period, platform, account, bucket)
+);
+"""
+
+# 汇总周期 -> 由样本时间计算所属区间
+ROLLUP_PERIODS = {
+    'day': lambda dt: dt.strftime('%Y-%m-%d'),
+    'week': lambda dt: '{0}-W{1:02d}'.format(*dt.isocalendar()[:2]),
+    'month': lambda dt: dt.strftime('%Y-%m'),
+}
+
+# open_value 为区间开始前的最后一个样本值（没有更早样本时为区间内第一个样本值），
+# 净变化 = last_value - open_value；同一区间内乱序到达的样本也能正确更新首尾值
+_ROLLUP_UPSERT = """
+INSERT INTO follower_rollups (period, bucket, platform, account, open_value, first_date,
+                              last_date, last_value, min_value, max_value, samples)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT (period, platform, account, bucket) DO UPDATE SET
+    open_value = CASE WHEN excluded.first_date < first_date THEN excluded.open_value ELSE open_value END,
+    first_date = MIN(first_date, excluded.first_date),
+    last_value = CASE WHEN excluded.last_date >= last_date THEN excluded.last_value ELSE last_value END,
+    last_date = MAX(last_date, excluded.last_date),
+    min_value = MIN(min_value, excluded.min_value),
+    max_value = MAX(max_value, excluded.max_value),
+    samples = samples + 1
+"""
+
+
+def _to_record(row) -> Dict:
+    """数据库行 -> 与CSV相同字段的字典"""
+    return {'日期': row[0], '账号名': row[1], '平台': row[2], '粉丝数': row[3]}
+
+
+def _parse_date(value: str) -> datetime:
+    """解析 日期 字段，兼容只有日期部分的旧数据"""
+    value = value.strip()
+    for fmt in (DATE_FORMAT, '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析的日期: {value}")
+
+
+class FollowerStore:
+    """粉丝数时间序列存储"""
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        if self._rollups_missing():
+            # 旧版本数据库没有汇总数据，首次打开时补算一次
+            self.rebuild_rollups()
+
+    def _rollups_missing(self) -> bool:
+        return (self.conn.execute('SELECT 1 FROM follower_rollups LIMIT 1').fetchone() is None
+                and self.conn.execute('SELECT 1 FROM followers WHERE followers > 0 LIMIT 1').fetchone() is not None)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute('SELECT 1 FROM followers LIMIT 1').fetchone() is None
+
+    def insert_rows(self, rows: Iterable[Dict]) -> int:
+        """
+        写入若干条数据（字段同CSV），同一平台/账号/时间的重复数据会被忽略
+        新增的有效样本同时增量更新日/周/月汇总，开销只与新增行数有关
+        :return: 实际新增的行数
+        """
+        values = sorted((str(row['日期']), str(row['账号名']), str(row['平台']), int(row['粉丝数']))
+                        for row in rows)
+        if not values:
+            return 0
+        inserted = 0
+        with self.conn:
+            for value in values:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO followers (date, account, platform, followers) VALUES (?, ?, ?, ?)',
+                    value)
+                if cursor.rowcount == 1:
+                    inserted += 1
+                    self._update_rollups(*value)
+        return inserted
+
+    def _previous_sample(self, platform: str, account: str, date: str):
+        """date 之前最后一个有效样本 (日期, 粉丝数)"""
+        return self.conn.execute(
+            'SELECT date, followers FROM followers '
+            'WHERE platform = ? AND account = ? AND followers > 0 AND date < ? '
+            'ORDER BY date DESC LIMIT 1',
+            (platform, account, date)).fetchone()
+
+    def _has_later_sample(self, platform: str, account: str, date: str) -> bool:
+        return self.conn.execute(
+            'SELECT 1 FROM followers WHERE platform = ? AND account = ? AND followers > 0 AND date > ? LIMIT 1',
+            (platform, account, date)).fetchone() is not None
+
+    def _update_rollups(self, date: str, account: str, platform: str, followers: int):
+        """用一个新样本更新该账号所在的日/周/月汇总（调用方负责事务）"""
+        if followers <= 0:
+            return
+        dt = _parse_date(date)
+        previous = self._previous_sample(platform, account, date)
+        # 新样本在区间内最早时 open_value 才会被采用，此时更早的样本必然在之前的区间
+        open_value = previous[1] if previous else followers
+        late_arrival = self._has_later_sample(platform, account, date)
+
+        for period, bucket_of in ROLLUP_PERIODS.items():
+            bucket = bucket_of(dt)
+            self.conn.execute(_ROLLUP_UPSERT, (period, bucket, platform, account, open_value, date,
+                                               date, followers, followers, followers))
+            if late_arrival:
+                # 迟到的样本可能成为下一个区间开始前的最后一个样本，需要修正其 open_value
+                next_bucket = self.conn.execute(
+                    'SELECT bucket, first_date FROM follower_rollups '
+                    'WHERE period = ? AND platform = ? AND account = ? AND bucket > ? '
+                    'ORDER BY bucket LIMIT 1',
+                    (period, platform, account, bucket)).fetchone()
+                if next_bucket:
+                    before_next = self._previous_sample(platform, account, next_bucket[1])
+                    if before_next and before_next[0] == date:
+                        self.conn.execute(
+                            'UPDATE follower_rollups SET open_value = ? '
+                            'WHERE period = ? AND platform = ? AND account = ? AND bucket = ?',
+                            (followers, period, platform, account, next_bucket[0]))
+
+    def rebuild_rollups(self):
+        """清空并按时间顺序从原始样本重建全部汇总（用于修复或升级旧数据库）"""
+        with self.conn:
+            self.conn.execute('DELETE FROM follower_rollups')
+            rows = self.conn.execute(
+                'SELECT date, account, platform, followers FROM followers '
+                'WHERE followers > 0 ORDER BY platform, account, date').fetchall()
+            previous_key, previous_value = None, None
+            for date, account, platform, followers in rows:
+                if (platform, account) != previous_key:
+                    previous_key, previous_value = (platform, account), followers
+                dt = _parse_date(date)
+                for period, bucket_of in ROLLUP_PERIODS.items():
+                    self.conn.execute(_ROLLUP_UPSERT, (period, bucket_of(dt), platform, account, previous_value,
+                                                       date, date, followers, followers, followers))
+                previous_value = followers
+
+    def rollups(self, period: str = 'day', platform: Optional[str] = None, account: Optional[str] = None,
+                start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        读取预先计算的汇总
+        :param period: 'day' / 'week' / 'month'
+        :param start/end: 区间标识范围（包含），如 '2025-07-01'、'2025-W27'、'2025-07'
+        :return: 每个账号每个区间一条：区间、最新值、最小值、最大值、净变化、样本数
+        """
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"不支持的汇总周期: {period}")
+        sql = ('SELECT bucket, platform, account, last_value, min_value, max_value, '
+               'last_value - open_value, samples, last_date FROM follower_rollups WHERE period = ?')
+        params = [period]
+        for column, value, op in (('platform', platform, '='), ('account', account, '='),
+                                  ('bucket', start, '>='), ('bucket', end, '<=')):
+            if value is not None:
+                sql += f' AND {column} {op} ?'
+                params.append(value)
+        sql += ' ORDER BY platform, account, bucket'
+        keys = ('区间', '平台', '账号名', '最新值', '最小值', '最大值', '净变化', '样本数', '最新时间')
+        return [dict(zip(keys, row)) for row in self.conn.execute(sql, params)]
+
+    def import_csv(self, csv_path: str) -> int:
+        """一次性导入已有的 followers.csv，可重复执行（已存在的数据会被跳过）"""
+        rows = []
+        skipped = 0
+        with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                try:
+                    row['粉丝数'] = int(float(row['粉丝数']))
+                    if not row['日期'] or not row['账号名'] or not row['平台']:
+                        raise ValueError
+                except (TypeError, ValueError, KeyError):
+                    skipped += 1
+                    continue
+                rows.append(row)
+        inserted = self.insert_rows(rows)
+        if skipped:
+            print(f"⚠️ 跳过 {skipped} 行无法解析的数据")
+        return inserted
+
+    def latest(self, platform: str, account: str) -> Optional[Dict]:
+        """账号最新一次有效的粉丝数"""
+        row = self.conn.execute(
+            'SELECT date, account, platform, followers FROM followers '
+            'WHERE platform = ? AND account = ? AND followers > 0 '
+            'ORDER BY date DESC LIMIT 1',
+            (platform, account)).fetchone()
+        return _to_record(row) if row else None
+
+    def range_scan(self, platform: str, account: Optional[str] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        按时间顺序返回 [start, end] 范围内的有效样本
+        :param account: 为 None 时返回该平台所有账号
+        :param start/end: 'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS'，为 None 表示不限
+        """
+        sql = ('SELECT date, account, platform, followers FROM followers '
+               'WHERE platform = ? AND followers > 0')
+        params = [platform]
+        if account is not None:
+            sql += ' AND account = ?'
+            params.append(account)
+        if start is not None:
+            sql += ' AND date >= ?'
+            params.append(start)
+        if end is not None:
+            # 只给日期时包含当天全天
+            sql += ' AND date <= ?'
+            params.append(end if len(end) > 10 else end + ' 23:59:59')
+        sql += ' ORDER BY account, date'
+        return [_to_record(row) for row in self.conn.execute(sql, params)]
+
+    def delta(self, platform: str, account: str, days: int = 30,
+              end: Optional[str] = None) -> Optional[Dict]:
+        """
+        账号在时间窗口内的粉丝变化
+        :param days: 窗口天数
+        :param end: 窗口结束时间，默认取该账号最新样本的时间
+        :return: {'start': 窗口内第一个样本, 'end': 窗口内最后一个样本, 'change': 变化量}，无样本时返回 None
+        """
+        if end is None:
+            last = self.latest(platform, account)
+            if last is None:
+                return None
+            end = last['日期']
+        elif len(end) <= 10:
+            end = end + ' 23:59:59'
+        start = (_parse_date(end) - timedelta(days=days)).strftime(DATE_FORMAT)
+
+        query = ('SELECT date, account, platform, followers FROM followers '
+                 'WHERE platform = ? AND account = ? AND followers > 0 AND date >= ? AND date <= ? '
+                 'ORDER BY date {} LIMIT 1')
+        params = (platform, account, start, end)
+        first = self.conn.execute(query.format('ASC'), params).fetchone()
+        last = self.conn.execute(query.format('DESC'), params).fetchone()
+        if first is None:
+            return None
+        return {
+            'start': _to_record(first),
+            'end': _to_record(last),
+            'change': last[3] - first[3]
+        }
+
+
+def open_follower_store(db_path: str = DEFAULT_DB_PATH, seed_csv: Optional[str] = None) -> FollowerStore:
+    """打开存储；数据库为空且提供了已有CSV时先一次性导入"""
+    store = FollowerStore(db_path)
+    if seed_csv and store.is_empty() and os.path.exists(seed_csv):
+        imported = store.import_csv(seed_csv)
+        print(f"📥 已从 {seed_csv} 导入 {imported} 条历史数据到 {db_path}")
+    return store
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'data/followers.csv'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DB_PATH
+    with FollowerStore(db_path) as store:
+        count = store.import_csv(csv_path)
+    print(f"✅ 已从 {csv_path} 导入 {count} 条数据到 {db_path}")
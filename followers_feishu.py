@@ -1,10 +1,8 @@
 import asyncio
 import time
-import requests
-import json
-import pandas as pd
-import os
-import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from playwright.async_api import async_playwright
 
 # 导入各平台的数据获取函数
 from bilibili_followers import get_bilibili_data
@@ -14,6 +12,14 @@ from douyin_followers import DouyinFansCollectorEnhanced, load_cookie_from_json
 from weibo_followers import get_weibo_data
 from wechat_followers import get_wechat_data
 from zhihu_followers import get_zhihu_data  
+from collector_registry import (CollectorContext, configure_collector,
+                                get_registered_collectors, register_collector)
+from rate_limiter import configure_rate_limiter
+from feishu_client import FeishuAPIError, get_feishu_client
+from follower_history import FollowerHistoryWriter, maybe_compact_history
+from follower_store import open_follower_store
+from parquet_archive import PARQUET_AVAILABLE, archive_followers
+from follower_series import FollowerSeriesStore
 
 # --- 统一配置区 ---
 # 添加 bilibili 的 uid
@@ -62,22 +68,39 @@ FEISHU_TABLE_ID = "your_table_id"      # 飞书多维表格子表ID
 
 # 输出文件配置
 OUTPUT_FILENAME = 'data/followers.csv'
+FOLLOWER_DB_PATH = 'data/followers.db'  # 粉丝数时间序列 SQLite 库（与CSV同步写入），None 表示不写入
+PARQUET_ARCHIVE_DIR = 'data/archive'    # Parquet 列式归档目录（需要 pyarrow），None 表示不归档
+SERIES_STORE_DIR = None                 # 高频轮询大量账号时使用的内存映射时间序列目录（如 'data/series'），None 表示不写入
+HISTORY_COMPACT_INTERVAL_DAYS = 30  # 每隔多少天压缩一次历史CSV（去重、按日期排序），None 表示不压缩
+
+# 流式写入配置：每条数据获取后立即追加到CSV；飞书按条数或时间攒批写入
+FEISHU_BATCH_SIZE = 50         # 攒够多少条写一次飞书
+FEISHU_FLUSH_INTERVAL = 10     # 最多攒多少秒写一次飞书
+
+# 全局截止时间（秒）：到点仍未完成的平台会被取消，已获取的数据照常写入CSV和飞书
+# monitor_bot 会在 30 分钟时强制终止脚本，这里预留 5 分钟用于写入
+RUN_DEADLINE_SECONDS = 25 * 60
+
+# 是否并发获取各平台数据（False 时按平台顺序逐个获取）
+CONCURRENT_COLLECTION = True
+
+# 按平台调整采集器声明（并发分片数、限速等），无需修改主流程
+# 例如: {'bilibili': {'max_concurrency': 2, 'requests_per_second': 0.5, 'burst': 2, 'max_in_flight': 4}}
+# requests_per_second 为起始速率，运行中会按 412/429 等信号自适应调整（AIMD）
+COLLECTOR_OVERRIDES = {}
 # --- 配置区结束 ---
 
+def get_client():
+    """共享的飞书客户端（连接池复用）"""
+    return get_feishu_client(FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN)
+
 def get_feishu_access_token():
     """获取飞书访问令牌"""
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    payload = {"app_id": FEISHU_APP_ID, "app_secret": FEISHU_APP_SECRET}
-    
     try:
-        response = requests.post(url, json=payload, headers={'Content-Type': 'application/json'})
-        result = response.json()
-        
-        if result.get('code') == 0:
-            return result.get('tenant_access_token')
-        else:
-            print(f"❌ 获取飞书访问令牌失败: {result.get('msg')}")
-            return None
+        return get_client().get_tenant_access_token()
+    except FeishuAPIError as e:
+        print(f"❌ 获取飞书访问令牌失败: {e}")
+        return None
     except Exception as e:
         print(f"❌ 获取飞书访问令牌异常: {e}")
         return None
@@ -88,9 +111,6 @@ def write_to_feishu(data_list, access_token):
         print("❌ 数据为空或访问令牌无效，跳过飞书写入")
         return False
     
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables/{FEISHU_TABLE_ID}/records/batch_create"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    
     current_timestamp = int(time.time() * 1000)
     
     records = []
@@ -106,52 +126,30 @@ def write_to_feishu(data_list, access_token):
     
     try:
         print(f"📝 正在向飞书写入 {len(records)} 条记录...")
-        response = requests.post(url, json={"records": records}, headers=headers)
-        result = response.json()
-        
-        if result.get('code') == 0:
-            print("✅ 成功写入飞书多维表格！")
-            return True
-        else:
-            print(f"❌ 写入飞书失败: {result.get('msg')}")
-            return False
+        get_client().batch_create(access_token, FEISHU_TABLE_ID, records)
+        print("✅ 成功写入飞书多维表格！")
+        return True
+    except FeishuAPIError as e:
+        print(f"❌ 写入飞书失败: {e}")
+        return False
     except Exception as e:
         print(f"❌ 写入飞书异常: {e}")
         return False
 
-def save_to_csv(data, filename='followers.csv'):
-    """保存数据到CSV文件（追加模式）"""
-    if not data:
-        print("❌ 没有数据可保存到CSV")
-        return
-
-    output_columns = ['日期', '账号名', '平台', '粉丝数']
-    new_df = pd.DataFrame(data)[output_columns]
-
+def save_to_archive(data):
+    """把本次数据追加到 Parquet 归档（未安装 pyarrow 时跳过）"""
+    if not PARQUET_ARCHIVE_DIR or not data:
+        return 0
+    if not PARQUET_AVAILABLE:
+        print("ℹ️ 未安装 pyarrow，跳过 Parquet 归档")
+        return 0
     try:
-        if os.path.exists(filename):
-            print(f"\n📖 正在向 {filename} 追加数据...")
-            existing_df = pd.read_csv(filename, encoding='utf-8-sig')
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        else:
-            print(f"\n📝 正在创建新的数据文件 {filename}...")
-            combined_df = new_df
-        
-        combined_df.to_csv(filename, index=False, encoding='utf-8-sig')
-        print(f"✅ 数据已保存到 {filename}")
-        
-        # 统计信息
-        successful_data = [item for item in data if item['粉丝数'] > 0]
-        print(f"\n📊 本次统计信息:")
-        print(f"   总账号数: {len(data)}")
-        print(f"   成功获取: {len(successful_data)}")
-        print(f"   失败数量: {len(data) - len(successful_data)}") 
-        
-        print(f"\n📋 最新数据预览:")
-        print(new_df.head().to_string(index=False))
-
+        count = archive_followers(data, PARQUET_ARCHIVE_DIR)
+        print(f"🗃️ 已归档 {count} 条数据到 {PARQUET_ARCHIVE_DIR}")
+        return count
     except Exception as e:
-        print(f"❌ 保存到CSV文件时出错: {e}")
+        print(f"⚠️ Parquet 归档失败: {e}")
+        return 0
 
 # --- 错误代码定义 ---
 ERROR_CODES = {
@@ -189,6 +187,14 @@ ERROR_CODES = {
     'ZHIHU_002': '知乎数据获取失败 - 用户slug无效',
     'ZHIHU_003': '知乎数据获取失败 - Cookie过期或无效',
     'ZHIHU_004': '知乎数据获取失败 - 其他未知错误',
+    
+    'BILIBILI_005': 'Bilibili数据获取未完成 - 超出时间预算',
+    'YOUTUBE_005': 'YouTube数据获取未完成 - 超出时间预算',
+    'REDBOOK_005': '小红书数据获取未完成 - 超出时间预算',
+    'DOUYIN_005': '抖音数据获取未完成 - 超出时间预算',
+    'WEIBO_005': '微博数据获取未完成 - 超出时间预算',
+    'WECHAT_005': '微信公众号数据获取未完成 - 超出时间预算',
+    'ZHIHU_005': '知乎数据获取未完成 - 超出时间预算',
 }
 
 def print_error_with_code(error_code, additional_info=""):
@@ -199,8 +205,8 @@ def print_error_with_code(error_code, additional_info=""):
         print(f"   详细信息: {additional_info}")
     return error_code
 
-def get_douyin_data(user_ids):
-    """获取抖音数据（同步包装函数）"""
+async def get_douyin_data(user_ids, http_client=None, on_result=None):
+    """获取抖音数据（异步包装函数，可复用共享的HTTP客户端）"""
     if not user_ids:
         print("⚠️ 抖音用户ID列表为空")
         return [], []
@@ -216,10 +222,9 @@ def get_douyin_data(user_ids):
             return [], [error_code]
         
         # 创建收集器实例
-        collector = DouyinFansCollectorEnhanced(cookie=cookie)
+        collector = DouyinFansCollectorEnhanced(cookie=cookie, client=http_client)
         
-        # 使用asyncio运行异步函数
-        douyin_data = asyncio.run(collector.collect_fans_data(user_ids))
+        douyin_data = await collector.collect_fans_data(user_ids, on_result=on_result)
         
         print(f"✅ 抖音数据获取完成，共 {len(douyin_data)} 条记录")
         return douyin_data, []
@@ -234,13 +239,12 @@ def get_douyin_data(user_ids):
         error_code = print_error_with_code('DOUYIN_004', str(e))
         return [], [error_code]
 
-def get_wechat_data_wrapper():
-    """获取微信公众号数据（同步包装函数）"""
+async def get_wechat_data_wrapper(playwright=None, on_result=None):
+    """获取微信公众号数据（异步包装函数，可复用共享的 Playwright 实例）"""
     try:
         print("📱 开始获取微信公众号数据...")
         
-        # 使用asyncio运行异步函数
-        wechat_data, failed_wechat = asyncio.run(get_wechat_data())
+        wechat_data, failed_wechat = await get_wechat_data(playwright=playwright, on_result=on_result)
         
         print(f"✅ 微信公众号数据获取完成，共 {len(wechat_data)} 条记录")
         return wechat_data, failed_wechat
@@ -255,8 +259,8 @@ def get_wechat_data_wrapper():
         error_code = print_error_with_code('WECHAT_004', str(e))
         return [], [error_code]
 
-def get_zhihu_data_wrapper(user_slugs):
-    """获取知乎数据（同步包装函数）"""
+async def get_zhihu_data_wrapper(user_slugs, playwright=None, on_result=None):
+    """获取知乎数据（异步包装函数，可复用共享的 Playwright 实例）"""
     if not user_slugs:
         print("⚠️ 知乎用户slug列表为空")
         return [], []
@@ -264,8 +268,7 @@ def get_zhihu_data_wrapper(user_slugs):
     try:
         print("🔍 开始获取知乎数据...")
         
-        # 直接使用导入的异步函数
-        zhihu_data, failed_zhihu = asyncio.run(get_zhihu_data(user_slugs))
+        zhihu_data, failed_zhihu = await get_zhihu_data(user_slugs, playwright=playwright, on_result=on_result)
         
         print(f"✅ 知乎数据获取完成，共 {len(zhihu_data)} 条记录")
         return zhihu_data, failed_zhihu
@@ -280,8 +283,367 @@ def get_zhihu_data_wrapper(user_slugs):
         error_code = print_error_with_code('ZHIHU_004', str(e))
         return [], [error_code]
 
-def main():
-    """主函数，执行整个流程（同步版本）"""
+def classify_exception(platform_prefix, e):
+    """按异常类型映射为平台错误代码（网络 001 / 参数 002 / 其他 004）并打印"""
+    if isinstance(e, ConnectionError):
+        error_code = f'{platform_prefix}_001'
+    elif isinstance(e, ValueError):
+        error_code = f'{platform_prefix}_002'
+    else:
+        error_code = f'{platform_prefix}_004'
+    return print_error_with_code(error_code, str(e))
+
+def split_platform_errors(platform_prefix, errors):
+    """区分平台错误代码和失败账号，返回 (失败账号列表, 错误代码列表)"""
+    if any(error.startswith(f'{platform_prefix}_') for error in errors):
+        return [], errors
+    return errors, []
+
+class SharedResources:
+    """
+    整个运行期间共享的异步资源（HTTP连接池、Playwright 实例）
+    首次使用时才创建，run_all 结束时统一关闭
+    """
+    def __init__(self):
+        self.http_client = None
+        self.playwright = None
+        self._lock = asyncio.Lock()
+    
+    async def get_http_client(self):
+        """获取共享的 httpx.AsyncClient"""
+        async with self._lock:
+            if self.http_client is None:
+                self.http_client = httpx.AsyncClient(timeout=30)
+            return self.http_client
+    
+    async def get_playwright(self):
+        """获取共享的 Playwright 实例"""
+        async with self._lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            return self.playwright
+    
+    async def close(self):
+        """关闭所有已创建的共享资源"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+class FollowerSink:
+    """
+    流式结果写入：采集器每上报一条数据就放入异步队列，
+    写入任务逐条追加到CSV，并按条数/时间攒批写入飞书（只写粉丝数 > 0 的数据）
+    """
+    def __init__(self, csv_filename, batch_size=FEISHU_BATCH_SIZE, flush_interval=FEISHU_FLUSH_INTERVAL,
+                 db_path=FOLLOWER_DB_PATH, series_dir=SERIES_STORE_DIR):
+        self.csv_filename = csv_filename
+        self.history = FollowerHistoryWriter(csv_filename)
+        self.db_path = db_path
+        self.store = None
+        self.series_dir = series_dir
+        self.series_store = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.loop = None
+        self.queue = None
+        self.task = None
+        self.pending = []           # 等待写入飞书的数据
+        self.access_token = None
+        self.token_failed = False
+        self.csv_rows = 0
+        self.csv_errors = 0
+        self.store_errors = 0
+        self.feishu_rows = 0
+        self.feishu_failed_rows = 0
+    
+    def start(self):
+        """在当前事件循环中启动写入任务"""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        if self.db_path:
+            try:
+                self.store = open_follower_store(self.db_path, seed_csv=self.csv_filename)
+            except Exception as e:
+                print(f"⚠️ 打开粉丝数据库失败，本次只写入CSV: {e}")
+        if self.series_dir:
+            try:
+                self.series_store = FollowerSeriesStore(self.series_dir)
+            except Exception as e:
+                print(f"⚠️ 打开时间序列存储失败: {e}")
+        self.task = asyncio.create_task(self._consume())
+    
+    def emit(self, record):
+        """上报一条数据（可在线程池中调用）"""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            self.queue.put_nowait(record)
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, record)
+    
+    async def stream(self):
+        """以异步流的方式依次产出已上报的数据，收到结束标记时停止"""
+        while True:
+            timeout = self.flush_interval if self.pending else None
+            try:
+                record = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                # 到达攒批时间上限，产出 None 触发一次飞书写入
+                yield None
+                continue
+            if record is self:
+                return
+            yield record
+    
+    async def _consume(self):
+        async for record in self.stream():
+            if record is None:
+                await self.flush_feishu()
+                continue
+            
+            self.write_csv(record)
+            if record['粉丝数'] > 0:
+                self.pending.append(record)
+            if len(self.pending) >= self.batch_size:
+                await self.flush_feishu()
+        await self.flush_feishu()
+    
+    def write_csv(self, record):
+        """立即把单条数据追加到本地CSV"""
+        try:
+            self.history.append([record])
+            self.csv_rows += 1
+        except Exception as e:
+            self.csv_errors += 1
+            print(f"❌ 追加CSV失败: {e}")
+        if self.store is not None:
+            try:
+                self.store.insert_rows([record])
+            except Exception as e:
+                self.store_errors += 1
+                print(f"❌ 写入粉丝数据库失败: {e}")
+        if self.series_store is not None:
+            try:
+                self.series_store.append_rows([record])
+            except Exception as e:
+                self.store_errors += 1
+                print(f"❌ 写入时间序列失败: {e}")
+    
+    async def flush_feishu(self):
+        """把攒下的数据写入飞书（在线程池中执行同步请求，不阻塞采集）"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        
+        if self.access_token is None and not self.token_failed:
+            self.access_token = await self.loop.run_in_executor(None, get_feishu_access_token)
+            self.token_failed = self.access_token is None
+            if self.token_failed:
+                print("⚠️ 无法获取飞书访问令牌，后续数据只保存到CSV")
+        if self.token_failed:
+            self.feishu_failed_rows += len(batch)
+            return
+        
+        success = await self.loop.run_in_executor(None, write_to_feishu, batch, self.access_token)
+        if success:
+            self.feishu_rows += len(batch)
+        else:
+            self.feishu_failed_rows += len(batch)
+    
+    async def close(self):
+        """结束数据流并等待剩余数据写完"""
+        if self.task is None:
+            return
+        self.queue.put_nowait(self)
+        try:
+            await self.task
+        finally:
+            self.task = None
+            # 整次运行只 fsync 一次
+            try:
+                self.history.close()
+            except Exception as e:
+                self.csv_errors += 1
+                print(f"❌ 关闭CSV文件失败: {e}")
+            if self.store is not None:
+                self.store.close()
+                self.store = None
+            if self.series_store is not None:
+                self.series_store.close()
+                self.series_store = None
+    
+    @property
+    def feishu_success(self):
+        return self.feishu_rows > 0 and self.feishu_failed_rows == 0
+
+# --- 各平台采集器注册，统一接口: collect(accounts, ctx) -> (数据列表, 失败账号列表, 错误代码列表) ---
+@register_collector('bilibili', error_prefix='BILIBILI', accounts=lambda: BILIBILI_UIDS,
+                    credentials=['bilibili_cookie.json'], requests_per_second=1 / 3)
+async def collect_bilibili(accounts, ctx):
+    try:
+        print("🎬 开始获取Bilibili数据...")
+        bilibili_data, failed_bilibili = await get_bilibili_data(accounts, on_result=ctx.report)
+        return bilibili_data, failed_bilibili, []
+    except Exception as e:
+        return [], [], [classify_exception('BILIBILI', e)]
+
+@register_collector('youtube', error_prefix='YOUTUBE', accounts=lambda: YOUTUBE_CHANNELS,
+                    requests_per_second=1)
+async def collect_youtube(accounts, ctx):
+    try:
+        print("📺 开始获取YouTube数据...")
+        youtube_data = await ctx.run_sync(get_youtube_data, accounts, ctx.report)
+        return youtube_data, [], []
+    except Exception as e:
+        return [], [], [classify_exception('YOUTUBE', e)]
+
+@register_collector('redbook', error_prefix='REDBOOK', accounts=lambda: REDBOOK_USER_IDS,
+                    credentials=['redbook_cookie.json'], requests_per_second=1 / 5)
+async def collect_redbook(accounts, ctx):
+    try:
+        print("📖 开始获取小红书数据...")
+        redbook_data = await ctx.run_sync(get_redbook_data, accounts, ctx.report)
+        return redbook_data, [], []
+    except Exception as e:
+        return [], [], [classify_exception('REDBOOK', e)]
+
+@register_collector('douyin', error_prefix='DOUYIN', accounts=lambda: DOUYIN_USER_IDS,
+                    credentials=['douyin_cookie.json'], requests_per_second=1 / 4)
+async def collect_douyin(accounts, ctx):
+    http_client = await ctx.resources.get_http_client()
+    douyin_data, douyin_errors = await get_douyin_data(accounts, http_client=http_client, on_result=ctx.report)
+    return douyin_data, [], douyin_errors
+
+@register_collector('weibo', error_prefix='WEIBO', accounts=lambda: WEIBO_USER_IDS,
+                    credentials=['weibo_cookie.json'], requests_per_second=1 / 3)
+async def collect_weibo(accounts, ctx):
+    try:
+        print("🐦 开始获取微博数据...")
+        weibo_data = await ctx.run_sync(get_weibo_data, accounts, 'weibo_cookie.json', ctx.report)
+        return weibo_data, [], []
+    except Exception as e:
+        return [], [], [classify_exception('WEIBO', e)]
+
+@register_collector('wechat', error_prefix='WECHAT', accounts=lambda: WECHAT_ACCOUNTS,
+                    time_budget=10 * 60, run_without_accounts=True)  # 即使列表为空也尝试获取
+async def collect_wechat(accounts, ctx):
+    playwright = await ctx.resources.get_playwright()
+    wechat_data, wechat_errors = await get_wechat_data_wrapper(playwright=playwright, on_result=ctx.report)
+    failed, errors = split_platform_errors('WECHAT', wechat_errors)
+    
+    # 添加微信公众号特殊检查
+    wechat_success_count = len([item for item in wechat_data if item['平台'] == '微信公众号' and item['粉丝数'] > 0])
+    if wechat_success_count == 0 and not wechat_errors:
+        print("⚠️ 微信公众号数据获取可能存在问题（无数据且无错误）")
+        failed = ['登录状态异常或数据获取失败']
+    
+    return wechat_data, failed, errors
+
+@register_collector('zhihu', error_prefix='ZHIHU', accounts=lambda: ZHIHU_USER_SLUGS,
+                    requests_per_second=1 / 2, time_budget=10 * 60)
+async def collect_zhihu(accounts, ctx):
+    playwright = await ctx.resources.get_playwright()
+    zhihu_data, zhihu_errors = await get_zhihu_data_wrapper(accounts, playwright=playwright, on_result=ctx.report)
+    failed, errors = split_platform_errors('ZHIHU', zhihu_errors)
+    return zhihu_data, failed, errors
+
+def apply_collector_overrides():
+    """把配置区的 COLLECTOR_OVERRIDES 应用到已注册的采集器，并同步各平台的令牌桶和自适应限流"""
+    for name, options in COLLECTOR_OVERRIDES.items():
+        configure_collector(name, **options)
+    for spec in get_registered_collectors():
+        configure_rate_limiter(spec.name, spec.requests_per_second, spec.burst,
+                               max_concurrency=spec.max_in_flight)
+
+async def run_collector_shard(spec, accounts, ctx):
+    """运行单个分片，兜底捕获采集函数未处理的异常"""
+    try:
+        return await spec.collect(accounts, ctx)
+    except Exception as e:
+        return [], [], [classify_exception(spec.error_prefix, e)]
+
+def platform_time_budget(spec, deadline):
+    """计算平台本次可用的时间（秒）：取平台预算与距全局截止时间剩余时间的较小值，None 表示不限时"""
+    budgets = []
+    if spec.time_budget is not None:
+        budgets.append(spec.time_budget)
+    if deadline is not None:
+        budgets.append(deadline - asyncio.get_running_loop().time())
+    return max(0.0, min(budgets)) if budgets else None
+
+async def run_collector(spec, resources, executor, deadline=None, sink=None):
+    """
+    按声明调度单个平台：检查凭据，按并发上限分片运行并合并结果
+    超出时间预算时取消该平台，返回已上报的数据，并把未完成的账号记为失败
+    """
+    missing = spec.missing_credentials()
+    if missing:
+        error_code = print_error_with_code(f'{spec.error_prefix}_003', f"缺少凭据文件: {', '.join(missing)}")
+        return [], [], [error_code]
+    
+    ctx = CollectorContext(spec, resources, executor, sink=sink)
+    budget = platform_time_budget(spec, deadline)
+    shards = asyncio.gather(*(run_collector_shard(spec, shard, ctx) for shard in spec.shard_accounts()))
+    try:
+        outcomes = await asyncio.wait_for(shards, timeout=budget)
+    except asyncio.TimeoutError:
+        ctx.cancel()
+        unfinished = ctx.unfinished_accounts()
+        error_code = print_error_with_code(
+            f'{spec.error_prefix}_005',
+            f"{budget:.0f} 秒内未完成，已保留 {len(ctx.records)} 条数据，未完成账号: {', '.join(unfinished)}"
+        )
+        return list(ctx.records), ctx.failed + unfinished, [error_code]
+    
+    data, failed, errors = [], [], []
+    for shard_data, shard_failed, shard_errors in outcomes:
+        data.extend(shard_data)
+        failed.extend(shard_failed)
+        errors.extend(error for error in shard_errors if error not in errors)
+    return data, failed, errors
+
+async def collect_all_platforms(resources, concurrent=True, deadline_seconds=None, sink=None):
+    """
+    在当前事件循环中调度所有已注册且启用的平台采集器
+    :param resources: 本次运行的共享资源（SharedResources）
+    :param concurrent: True 时各平台作为独立任务并发运行，同步采集函数在线程池中执行；
+                       False 时按注册顺序逐个平台运行
+    :param deadline_seconds: 全局截止时间（秒），到点仍在运行的平台会被取消
+    :param sink: 可选的 FollowerSink，每条数据获取后立即推送
+    :return: [(平台, (数据列表, 失败账号列表, 错误代码列表)), ...]，顺序与注册顺序一致
+    """
+    apply_collector_overrides()
+    specs = [spec for spec in get_registered_collectors() if spec.is_enabled()]
+    if not specs:
+        return []
+    
+    deadline = None
+    if deadline_seconds is not None:
+        deadline = asyncio.get_running_loop().time() + deadline_seconds
+    
+    max_workers = sum(len(spec.shard_accounts()) for spec in specs)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='collector')
+    try:
+        if concurrent:
+            outcomes = await asyncio.gather(*(run_collector(spec, resources, executor, deadline, sink) for spec in specs))
+        else:
+            outcomes = [await run_collector(spec, resources, executor, deadline, sink) for spec in specs]
+    finally:
+        # 超时平台的同步采集线程无法强制结束，不等待它们（下次上报结果时会自行退出）
+        executor.shutdown(wait=False)
+    
+    return [(spec.name, outcome) for spec, outcome in zip(specs, outcomes)]
+
+async def run_all(deadline_seconds=RUN_DEADLINE_SECONDS):
+    """
+    主流程（异步版本），整个运行共用一个事件循环和一组共享资源
+    :param deadline_seconds: 数据获取阶段的全局截止时间（秒），None 表示不限时
+    """
     print("🚀 开始获取多平台粉丝数据并写入飞书...")
     
     all_data = []
@@ -290,109 +652,36 @@ def main():
     
     # 获取各平台数据
     print("\n=== 开始获取各平台数据 ===")
+    mode = "并发" if CONCURRENT_COLLECTION else "顺序"
+    print(f"⚙️ 采集模式: {mode}")
+    
+    collect_start = time.time()
+    resources = SharedResources()
+    # 数据边获取边写入：CSV 逐条追加，飞书攒批写入
+    sink = FollowerSink(OUTPUT_FILENAME)
+    sink.start()
+    try:
+        results = await collect_all_platforms(resources, concurrent=CONCURRENT_COLLECTION,
+                                              deadline_seconds=deadline_seconds, sink=sink)
+    finally:
+        await resources.close()
+        await sink.close()
+    print(f"\n⏱️ 各平台数据获取耗时 {time.time() - collect_start:.1f} 秒")
     
-    # 获取Bilibili数据
-    if BILIBILI_UIDS:
-        try:
-            print("🎬 开始获取Bilibili数据...")
-            bilibili_data, failed_bilibili = asyncio.run(get_bilibili_data(BILIBILI_UIDS))
-            all_data.extend(bilibili_data)
-            if failed_bilibili:
-                failed_accounts['bilibili'] = failed_bilibili
-        except ConnectionError as e:
-            error_code = print_error_with_code('BILIBILI_001', str(e))
-            error_summary['bilibili'] = [error_code]
-        except ValueError as e:
-            error_code = print_error_with_code('BILIBILI_002', str(e))
-            error_summary['bilibili'] = [error_code]
-        except Exception as e:
-            error_code = print_error_with_code('BILIBILI_004', str(e))
-            error_summary['bilibili'] = [error_code]
-    
-    # 获取YouTube数据
-    if YOUTUBE_CHANNELS:
-        try:
-            print("📺 开始获取YouTube数据...")
-            youtube_data = get_youtube_data(YOUTUBE_CHANNELS)
-            all_data.extend(youtube_data)
-        except ConnectionError as e:
-            error_code = print_error_with_code('YOUTUBE_001', str(e))
-            error_summary['youtube'] = [error_code]
-        except ValueError as e:
-            error_code = print_error_with_code('YOUTUBE_002', str(e))
-            error_summary['youtube'] = [error_code]
-        except Exception as e:
-            error_code = print_error_with_code('YOUTUBE_004', str(e))
-            error_summary['youtube'] = [error_code]
+    try:
+        compacted = maybe_compact_history(OUTPUT_FILENAME, HISTORY_COMPACT_INTERVAL_DAYS)
+        if compacted:
+            print(f"🗜️ 已压缩历史数据 {OUTPUT_FILENAME}: {compacted[0]} 行 -> {compacted[1]} 行")
+    except Exception as e:
+        print(f"⚠️ 压缩历史数据失败: {e}")
     
-    # 获取小红书数据
-    if REDBOOK_USER_IDS:
-        try:
-            print("📖 开始获取小红书数据...")
-            redbook_data = get_redbook_data(REDBOOK_USER_IDS)
-            all_data.extend(redbook_data)
-        except ConnectionError as e:
-            error_code = print_error_with_code('REDBOOK_001', str(e))
-            error_summary['redbook'] = [error_code]
-        except ValueError as e:
-            error_code = print_error_with_code('REDBOOK_002', str(e))
-            error_summary['redbook'] = [error_code]
-        except Exception as e:
-            error_code = print_error_with_code('REDBOOK_004', str(e))
-            error_summary['redbook'] = [error_code]
-    
-    # 获取抖音数据
-    if DOUYIN_USER_IDS:
-        douyin_data, douyin_errors = get_douyin_data(DOUYIN_USER_IDS)
-        all_data.extend(douyin_data)
-        if douyin_errors:
-            error_summary['douyin'] = douyin_errors
-    
-    # 获取微博数据
-    if WEIBO_USER_IDS:
-        try:
-            print("🐦 开始获取微博数据...")
-            weibo_data = get_weibo_data(WEIBO_USER_IDS)
-            all_data.extend(weibo_data)
-        except ConnectionError as e:
-            error_code = print_error_with_code('WEIBO_001', str(e))
-            error_summary['weibo'] = [error_code]
-        except ValueError as e:
-            error_code = print_error_with_code('WEIBO_002', str(e))
-            error_summary['weibo'] = [error_code]
-        except Exception as e:
-            error_code = print_error_with_code('WEIBO_004', str(e))
-            error_summary['weibo'] = [error_code]
-    
-    # 获取微信公众号数据
-    if WECHAT_ACCOUNTS is not None:  # 即使列表为空也尝试获取
-        # 获取微信公众号数据
-        if WECHAT_ACCOUNTS is not None:
-            wechat_data, wechat_errors = get_wechat_data_wrapper()
-            all_data.extend(wechat_data)
-            if wechat_errors:
-                # 检查是否是错误代码
-                if any(error.startswith('WECHAT_') for error in wechat_errors):
-                    error_summary['wechat'] = wechat_errors
-                else:
-                    failed_accounts['wechat'] = wechat_errors
-            
-            # 添加微信公众号特殊检查
-            wechat_success_count = len([item for item in wechat_data if item['平台'] == '微信公众号' and item['粉丝数'] > 0])
-            if wechat_success_count == 0 and not wechat_errors:
-                print("⚠️ 微信公众号数据获取可能存在问题（无数据且无错误）")
-                failed_accounts['wechat'] = ['登录状态异常或数据获取失败']
-    
-    # 获取知乎数据
-    if ZHIHU_USER_SLUGS:
-        zhihu_data, zhihu_errors = get_zhihu_data_wrapper(ZHIHU_USER_SLUGS)
-        all_data.extend(zhihu_data)
-        if zhihu_errors:
-            # 检查是否是错误代码
-            if any(error.startswith('ZHIHU_') for error in zhihu_errors):
-                error_summary['zhihu'] = zhihu_errors
-            else:
-                failed_accounts['zhihu'] = zhihu_errors
+    # 合并各平台结果（按配置顺序，保证输出稳定）
+    for platform, (data, failed, errors) in results:
+        all_data.extend(data)
+        if failed:
+            failed_accounts[platform] = failed
+        if errors:
+            error_summary[platform] = errors
     
     if not all_data:
         print("\n❌ 未获取到任何数据")
@@ -421,22 +710,17 @@ def main():
     for platform, stats in platform_stats.items():
         print(f"   {platform}: {stats['count']} 个账号，总粉丝数 {stats['total_fans']:,}")
     
-    # 写入飞书（只写入成功的数据）
-    print("\n=== 开始写入飞书 ===")
-    access_token = get_feishu_access_token()
-    if access_token and successful_data:
-        print("✅ 飞书访问令牌获取成功")
-        feishu_success = write_to_feishu(successful_data, access_token)
-    else:
-        if not successful_data:
-            print("⚠️ 没有成功的数据可写入飞书")
-        else:
-            print("⚠️ 未能写入飞书，因为无法获取访问令牌")
-        feishu_success = False
-    
-    # 保存到CSV（包含所有数据，包括失败的）
-    print("\n=== 开始保存到CSV ===")
-    save_to_csv(all_data, OUTPUT_FILENAME)
+    # 数据已在获取过程中流式写入：CSV 包含所有数据（包括失败的），飞书只写入成功的数据
+    print("\n=== 数据写入结果 ===")
+    print(f"📝 CSV: 已向 {OUTPUT_FILENAME} 追加 {sink.csv_rows} 条记录" + (f"，{sink.csv_errors} 条失败" if sink.csv_errors else ""))
+    if sink.db_path:
+        print(f"🗄️ 数据库: {sink.db_path}" + (f"（{sink.store_errors} 条写入失败）" if sink.store_errors else ""))
+    # 一次运行归档为每个平台/月份一个 Parquet 文件（逐条写入会产生大量小文件）
+    save_to_archive(all_data)
+    if not successful_data:
+        print("⚠️ 没有成功的数据可写入飞书")
+    print(f"🚀 飞书: 成功写入 {sink.feishu_rows} 条" + (f"，{sink.feishu_failed_rows} 条未写入" if sink.feishu_failed_rows else ""))
+    feishu_success = sink.feishu_success
     
     # 最终总结
     print("\n=== 任务完成总结 ===")
@@ -454,7 +738,7 @@ def main():
         for platform, errors in error_summary.items():
             print(f"   {platform}: {', '.join(errors)}")
     
-    print(f"📝 CSV保存: ✅ 已保存到 {OUTPUT_FILENAME}")
+    print(f"📝 CSV保存: {'✅ 已保存到 ' + OUTPUT_FILENAME if not sink.csv_errors else '⚠️ 部分数据保存失败'}")
     print(f"🚀 飞书写入: {'✅ 成功' if feishu_success else '❌ 失败'}")
     
     if successful_data:
@@ -479,6 +763,12 @@ def main():
         if 'wechat' in failed_accounts or 'wechat' in error_summary:
             print("STATUS:WECHAT_FAILED - 微信公众号登录状态异常或数据获取失败")
     
+    # 报告超出时间预算、被提前取消的平台（已获取的数据已正常保存）
+    timed_out_platforms = [platform for platform, errors in error_summary.items()
+                           if any(error.endswith('_005') for error in errors)]
+    if timed_out_platforms:
+        print(f"STATUS:PARTIAL - 超出时间预算的平台: {', '.join(timed_out_platforms)}")
+    
     # 返回状态信息供外部调用
     return {
         'successful_data': successful_data,
@@ -487,5 +777,9 @@ def main():
         'feishu_success': feishu_success if 'feishu_success' in locals() else False
     }
 
+def main(deadline_seconds=RUN_DEADLINE_SECONDS):
+    """主函数（同步入口），在单个事件循环中运行 run_all"""
+    return asyncio.run(run_all(deadline_seconds))
+
 if __name__ == "__main__":
-    main()  # 直接调用同步函数，不使用 asyncio.run()
+    main()  # 同步入口，内部只创建一次事件循环
@@ -0,0 +1,193 @@
+"""
+小红书笔记与飞书现有记录的列式比较
+
+新数据和飞书现有记录各整理一次为按主键对齐的 DataFrame（文本列为字符串，数字列为数值），
+逐列计算变化掩码，再直接由掩码生成批量更新/新增接口需要的 records，不再逐条逐字段比较。
+规范化规则与写入飞书时相同：文本截断到 1000 字，数字取整，空值为 ''/0。
+现有记录带内容哈希（本地镜像，见 note_hash）时，每行先比较一次哈希，只有哈希不同的行才逐列比较。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from note_hash import KEY_COLUMN, TEXT_COLUMNS, normalized_content_hashes, note_content_hash
+from publish_time import to_epoch_ms, to_time_keys
+
+TEXT_MAX_LENGTH = 1000
+
+
+def _present(values: pd.Series) -> pd.Series:
+    """非空（不是 NaN/None，也不是空字符串）"""
+    return values.notna() & (values.astype(object) != '')
+
+
+def publish_time_fields(values) -> pd.Series:
+    """
+    发布时间列 -> 飞书日期字段（UTC 毫秒时间戳，见 publish_time）
+    空值为 ''，无法解析时保留原始字符串
+    """
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values, dtype=object)
+    millis = to_epoch_ms(values)
+    fields = millis.astype(object).where(millis.notna(), '')
+    failed = _present(values) & millis.isna()
+    if failed.any():
+        print(f"⚠️ {int(failed.sum())} 条记录的时间字段转换失败，使用原始字符串")
+        fields[failed] = values[failed].astype(str)
+    return fields
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """新数据的文本列：截断到 1000 字，空值为 ''"""
+    values = pd.Series(values, dtype=object)
+    return values.where(values.notna(), '').astype(str).str.slice(0, TEXT_MAX_LENGTH).astype(object)
+
+
+def normalize_number(values: pd.Series) -> np.ndarray:
+    """新数据的数字列：取整，空值或无法转换为数字时为 0"""
+    values = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values.dtype):
+        values = pd.to_numeric(values.astype(object), errors='coerce')
+    # 已按 note_schema 转换的计数列（可空整数）直接取数值
+    numbers = values.to_numpy(dtype=float, na_value=np.nan, copy=True)
+    numbers[~np.isfinite(numbers)] = 0
+    return np.trunc(numbers).astype(np.int64)
+
+
+def _existing_numbers(values: List) -> np.ndarray:
+    """
+    飞书现有记录的数字列（缺失的字段已取 0）：字符串取整，无法转换时为 0；
+    其他无法转换为数字的值（如 None）为 NaN，与任何新值都不相等，会被更新
+    """
+    values = pd.Series(values, dtype=object)
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, copy=True)
+    is_text = values.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    text_numbers = np.trunc(np.where(np.isnan(numbers), 0, numbers))
+    return np.where(is_text, text_numbers, numbers)
+
+
+def as_notes_frame(data) -> pd.DataFrame:
+    """新数据（DataFrame 或字典列表）-> 以行位置为索引的 DataFrame"""
+    if isinstance(data, pd.DataFrame):
+        return data.reset_index(drop=True)
+    return pd.DataFrame.from_records(list(data)) if len(data) else pd.DataFrame()
+
+
+def _column(frame: pd.DataFrame, col: str) -> pd.Series:
+    """取一列（保留列类型），没有该列时为空字符串"""
+    if col in frame.columns:
+        return frame[col]
+    return pd.Series('', index=frame.index, dtype=object)
+
+
+def new_notes_frame(frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    新数据 -> DataFrame：'_key' 为主键，其余为规范化后的比较列
+    没有发布时间的行不参与比较；索引为行在新数据中的位置
+    """
+    keys = to_time_keys(_column(frame, KEY_COLUMN))
+    keep = keys.notna().to_numpy()
+    result = pd.DataFrame({'_key': keys[keep].astype(str)}, index=frame.index[keep])
+    for col in columns:
+        if col == KEY_COLUMN:
+            continue
+        values = _column(frame, col)[keep]
+        result[col] = normalize_text(values) if col in TEXT_COLUMNS else normalize_number(values)
+    return result
+
+
+def existing_notes_frame(existing_records: Dict[str, Dict], columns: List[str]) -> pd.DataFrame:
+    """
+    现有记录（主键 -> {'record_id', 'fields', 'hash'}）-> 以主键为索引的 DataFrame
+    'hash' 为按飞书写入规则计算的内容哈希（本地镜像中的记录才有），没有时为 None
+    """
+    records = list(existing_records.values())
+    frame = pd.DataFrame({'record_id': [record['record_id'] for record in records],
+                          'hash': [record.get('hash') for record in records]},
+                         index=pd.Index(list(existing_records), dtype=object))
+    for col in columns:
+        if col == KEY_COLUMN:
+            continue
+        if col in TEXT_COLUMNS:
+            frame[col] = pd.Series([str(record['fields'].get(col, '')) for record in records],
+                                   index=frame.index, dtype=object)
+        else:
+            frame[col] = _existing_numbers([record['fields'].get(col, 0) for record in records])
+    return frame
+
+
+def diff_notes(new_data: List[Dict], existing_records: Dict[str, Dict], columns: List[str],
+               hash_field: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    比较新数据与飞书现有记录
+    :param new_data: 新数据（DataFrame 或字典列表）
+    :param existing_records: 主键 -> {'record_id', 'fields', 'hash'}，带 'hash' 时哈希相同的行不再逐列比较
+    :param hash_field: 同时写入内容哈希的飞书列（只写入，不参与比较），None 表示不写入
+    :return: (updates, creates)，分别为批量更新/批量新增接口的 records，顺序与新数据一致
+    """
+    frame = as_notes_frame(new_data)
+    new = new_notes_frame(frame, columns)
+    existing = existing_notes_frame(existing_records, columns)
+    compare_columns = [col for col in columns if col != KEY_COLUMN]
+
+    positions = existing.index.get_indexer(new['_key'])
+    matched = positions >= 0
+
+    # 已存在的记录：逐列计算变化掩码，由掩码生成只包含变化字段的更新
+    old = existing.iloc[positions[matched]]
+    matched_new = new[matched]
+    if old['hash'].notna().any():
+        # 每行先比较一次内容哈希，只有哈希不同的行才逐列计算变化掩码
+        exclude = [hash_field] if hash_field else []
+        new_hashes = np.array(normalized_content_hashes(matched_new, compare_columns, exclude), dtype=object)
+        differs = old['hash'].to_numpy(dtype=object) != new_hashes
+        old, matched_new = old[differs], matched_new[differs]
+    changed_columns = []
+    for col in compare_columns:
+        mask = matched_new[col].to_numpy() != old[col].to_numpy()
+        if mask.any():
+            changed_columns.append((col, mask, matched_new[col].tolist()))
+
+    update_fields: Dict[int, Dict] = {}
+    for col, mask, values in changed_columns:
+        for i in np.flatnonzero(mask):
+            update_fields.setdefault(i, {})[col] = values[i]
+    record_ids = old['record_id'].tolist()
+    row_labels = matched_new.index
+    updates = []
+    for i in sorted(update_fields):
+        fields = update_fields[i]
+        if hash_field:
+            fields[hash_field] = note_content_hash(frame.loc[row_labels[i]], columns, exclude=[hash_field])
+        updates.append({'record_id': record_ids[i], 'fields': fields})
+
+    # 新记录：按列生成完整字段
+    created = frame.loc[new.index[~matched]]
+    creates = [{'fields': fields} for fields in feishu_fields(created, columns, hash_field)]
+    return updates, creates
+
+
+def feishu_fields(data, columns: List[str], hash_field: Optional[str] = None) -> List[Dict]:
+    """
+    按列把新数据（DataFrame 或字典列表）转换为飞书记录的字段（发布时间为毫秒时间戳，文本截断，数字取整）
+    :param hash_field: 同时写入内容哈希的飞书列（只写入，不参与比较），None 表示不写入
+    """
+    frame = as_notes_frame(data)
+    if frame.empty:
+        return []
+    column_values = {}
+    for col in columns:
+        values = _column(frame, col)
+        if col == KEY_COLUMN:
+            column_values[col] = publish_time_fields(values).tolist()
+        elif col in TEXT_COLUMNS:
+            column_values[col] = normalize_text(values).tolist()
+        else:
+            column_values[col] = normalize_number(values).tolist()
+    records = [dict(zip(columns, values)) for values in zip(*(column_values[col] for col in columns))]
+    if hash_field:
+        for fields, (_, row) in zip(records, frame.iterrows()):
+            fields[hash_field] = note_content_hash(row, columns, exclude=[hash_field])
+    return records
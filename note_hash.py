@@ -0,0 +1,66 @@
+"""
+小红书笔记行的内容哈希
+
+按与写入飞书时相同的规则规范化每个字段（文本截断到 1000 字，数字取整，空值为 ''/0），
+再对规范化后的内容计算稳定的哈希。同一行无论来自 Excel 还是飞书记录，
+内容相同则哈希相同，变化检测只需比较一次哈希，哈希不同的行才逐字段比较。
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+TEXT_COLUMNS = ['笔记标题', '体裁']
+KEY_COLUMN = '首次发布时间'
+
+
+def normalize_note_value(column: str, value):
+    """按飞书写入规则规范化单个字段（文本截断，数字取整，非数字为 0）"""
+    if column in TEXT_COLUMNS:
+        return str(value)[:1000] if _present(value) else ''
+    if not _present(value) or value == '':
+        return 0
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def _present(value) -> bool:
+    try:
+        return bool(pd.notna(value))
+    except (TypeError, ValueError):
+        # 列表等非标量值（如飞书富文本）视为有值
+        return True
+
+
+def note_content_hash(row: Dict, columns: Iterable[str], exclude: Iterable[str] = ()) -> str:
+    """
+    计算一行笔记数据的内容哈希（不含主键列和 exclude 中的列）
+    :param row: 字段字典（Excel 行或飞书记录的 fields）
+    :param columns: 参与比较的列
+    """
+    skipped = {KEY_COLUMN, *exclude}
+    normalized = [[col, normalize_note_value(col, row.get(col, ''))]
+                  for col in sorted(columns) if col not in skipped]
+    return _digest(normalized)
+
+
+def normalized_content_hashes(frame, columns: Iterable[str], exclude: Iterable[str] = ()) -> List[str]:
+    """
+    按列计算多行的内容哈希，与逐行调用 note_content_hash 的结果相同
+    :param frame: 已按飞书写入规则规范化的 DataFrame（文本列为字符串，数字列为整数，见 note_diff）
+    """
+    skipped = {KEY_COLUMN, *exclude}
+    names = [col for col in sorted(columns) if col not in skipped]
+    values = [frame[col].tolist() for col in names]
+    return [_digest([list(pair) for pair in zip(names, row)]) for row in zip(*values)] \
+        if names else [_digest([])] * len(frame)
+
+
+def _digest(normalized) -> str:
+    payload = json.dumps(normalized, ensure_ascii=False)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
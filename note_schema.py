@@ -0,0 +1,115 @@
+"""
+小红书笔记数据的列类型
+
+导出数据在读取 Excel、读取本地 CSV 和合并历史数据时统一按以下类型转换，
+之后的比较、哈希和写入飞书都直接按列类型处理，不再逐个单元格转换：
+- 首次发布时间: datetime64（中国时间，不带时区）
+- 笔记标题: string
+- 体裁: category
+- 其余各项计数: 可空整数（都在 int32 范围内时为 Int32，否则为 Int64），有小数的列为 float64，
+  存在无法转换为数字的值（如 "1分20秒"）时整列保留为 string
+保存CSV时发布时间仍写成中文格式（2025年07月20日17时37分34秒），CSV文件格式不变。
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from publish_time import PUBLISH_TIME_FORMAT, parse_publish_times
+
+TIME_COLUMN = '首次发布时间'
+TEXT_COLUMNS: List[str] = ['笔记标题']
+CATEGORY_COLUMNS: List[str] = ['体裁']
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def _present(values: pd.Series) -> pd.Series:
+    """非空（不是 NaN/None，也不是空字符串）"""
+    return values.notna() & (values.astype(object) != '')
+
+
+def time_column(values: pd.Series) -> pd.Series:
+    """
+    发布时间列 -> datetime64
+    存在无法解析的值时整列保留为 string（能解析的值统一为中文格式），不丢失原始内容
+    """
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values
+    parsed = parse_publish_times(values)
+    if not (parsed.isna() & _present(values)).any():
+        return parsed
+    text = values.astype(object)
+    text[parsed.notna()] = format_publish_times(parsed[parsed.notna()])
+    return text.astype('string')
+
+
+def count_column(values: pd.Series) -> pd.Series:
+    """计数列 -> Int32/Int64，有小数时为 float64，存在非数字的值时为 string"""
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numeric = values
+    else:
+        numeric = pd.to_numeric(values.astype(object), errors='coerce')
+        if (numeric.isna() & values.notna()).any():
+            return values.astype('string')
+    present = numeric.dropna()
+    if not (present % 1 == 0).all():
+        return numeric.astype('float64')
+    dtype = 'Int32' if present.empty or present.abs().max() <= INT32_MAX else 'Int64'
+    if pd.api.types.is_float_dtype(numeric.dtype):
+        numeric = numeric.round()
+    return numeric.astype(dtype)
+
+
+def apply_note_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """按笔记数据的列类型转换（返回新的 DataFrame，已是目标类型的列不再转换）"""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col == TIME_COLUMN:
+            columns[col] = time_column(values)
+        elif col in TEXT_COLUMNS:
+            columns[col] = values.astype('string')
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = values if isinstance(values.dtype, pd.CategoricalDtype) \
+                else values.astype('string').astype('category')
+        else:
+            columns[col] = count_column(values)
+    return pd.DataFrame(columns, index=df.index, columns=df.columns)
+
+
+def note_keys(values: pd.Series) -> pd.Series:
+    """
+    主键列 -> 用于对齐的值：能解析的发布时间为 datetime64，无法解析的保留原始字符串
+    一侧的时间列因含无法解析的值保留为文本时，两侧的主键仍然一致
+    """
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values
+    parsed = parse_publish_times(values)
+    fallback = parsed.isna() & _present(values)
+    if not fallback.any():
+        return parsed
+    keys = parsed.astype(object)
+    keys[fallback] = values[fallback].astype(str)
+    return keys
+
+
+def format_publish_times(values: pd.Series) -> pd.Series:
+    """datetime64 的发布时间 -> 中文格式字符串（空值为 NaN），其他类型原样返回"""
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.dt.strftime(PUBLISH_TIME_FORMAT).astype(object)
+    return values
+
+
+def to_csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """写出 CSV 前把发布时间转换回中文格式"""
+    if TIME_COLUMN in df.columns and pd.api.types.is_datetime64_dtype(df[TIME_COLUMN].dtype):
+        df = df.copy()
+        df[TIME_COLUMN] = format_publish_times(df[TIME_COLUMN])
+    return df
+
+
+def read_notes_csv(path: str) -> pd.DataFrame:
+    """读取本地笔记 CSV 并转换列类型"""
+    return apply_note_schema(pd.read_csv(path))
@@ -0,0 +1,263 @@
+"""
+小红书笔记各项计数的快照存储（按笔记和导出日期，只追加）
+
+合并历史数据时每篇笔记只保留最新一次导出的计数，这里按导出日期保留每篇笔记计数的变化过程：
+每条快照为 (笔记编号, 导出日期, 各计数相对该笔记上一条快照的增量)，第一条快照的增量即完整的值；
+计数没有变化的笔记不写入快照，同一天多次导出时以最后一条为准。
+各列是定长的 int32 数组文件，只追加写入；读取时整列加载，按笔记累加增量还原各次的计数，
+增长曲线和"本周增长最快的笔记"都是对这几列的向量化计算。
+
+目录结构:
+    <root>/index.json    笔记主键（首次发布时间）和标题、计数列名、快照行数
+    <root>/note.i4       笔记编号（index.json 中 notes 的位置）
+    <root>/day.i4        导出日期（1970-01-01 起的天数）
+    <root>/m<k>.i4       第 k 个计数列的增量
+同一目录只允许一个写入进程。
+
+查看最近 7 天某项计数增长最快的笔记:
+    python note_snapshots.py 观看量 7
+"""
+
+import json
+import os
+import sys
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from note_schema import TIME_COLUMN, apply_note_schema, format_publish_times
+from publish_time import PUBLISH_TIME_FORMAT
+
+DEFAULT_SNAPSHOT_DIR = os.path.join('data', 'note_snapshots')
+TITLE_COLUMN = '笔记标题'
+
+_EPOCH_DAY = pd.Timestamp('1970-01-01')
+_INT32 = np.iinfo(np.int32)
+
+
+def _day_number(value) -> int:
+    """日期 / datetime / 字符串 -> 1970-01-01 起的天数"""
+    return int((pd.Timestamp(value).normalize() - _EPOCH_DAY).days)
+
+
+def _day_to_date(days: np.ndarray) -> pd.Series:
+    return pd.Series(_EPOCH_DAY + pd.to_timedelta(days, unit='D'))
+
+
+def _note_keys(values: pd.Series) -> pd.Series:
+    """首次发布时间列 -> 笔记主键（中文格式的发布时间字符串），空值为 NaN"""
+    keys = format_publish_times(values).astype(object)
+    return keys.map(lambda key: str(key) if pd.notna(key) else np.nan)
+
+
+class NoteSnapshotStore:
+    """笔记计数快照（增量编码的列式数组文件）"""
+    def __init__(self, root: str = DEFAULT_SNAPSHOT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, 'index.json')
+        self.notes: List[str] = []        # 笔记编号 -> 主键
+        self.titles: List[str] = []       # 笔记编号 -> 最近一次的标题
+        self.metrics: List[str] = []      # 计数列名，第 k 列保存在 m<k>.i4
+        self.rows = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.notes = index.get('notes', [])
+            self.titles = index.get('titles', [''] * len(self.notes))
+            self.metrics = index.get('metrics', [])
+            self.rows = index.get('rows', 0)
+        self._note_ids: Dict[str, int] = {key: i for i, key in enumerate(self.notes)}
+        self._truncate()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, f'{name}.i4')
+
+    def _files(self) -> List[str]:
+        return ['note', 'day'] + [f'm{k}' for k in range(len(self.metrics))]
+
+    def _truncate(self):
+        """截掉上次写入中断时多出的行（行数以 index.json 为准），新增的计数列补 0"""
+        for name in self._files():
+            path = self._path(name)
+            with open(path, 'ab') as f:
+                if f.tell() != self.rows * 4:
+                    f.truncate(self.rows * 4)
+
+    def _save_index(self):
+        index = {'notes': self.notes, 'titles': self.titles, 'metrics': self.metrics, 'rows': self.rows}
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    def _load(self, name: str) -> np.ndarray:
+        path = self._path(name)
+        if not self.rows or not os.path.exists(path):
+            return np.zeros(self.rows, dtype=np.int32)
+        return np.fromfile(path, dtype=np.int32, count=self.rows)
+
+    def _deltas(self, metrics: List[str]) -> np.ndarray:
+        """指定计数列的增量矩阵（行数 × 列数，int64）"""
+        columns = [self._load(f'm{self.metrics.index(metric)}').astype(np.int64) for metric in metrics]
+        return np.column_stack(columns) if columns else np.zeros((self.rows, 0), dtype=np.int64)
+
+    def _latest(self):
+        """各笔记最近一条快照的 (导出日期, 计数矩阵)，没有快照的笔记日期为 -1"""
+        note_ids = self._load('note')
+        last_day = np.full(len(self.notes), -1, dtype=np.int64)
+        values = np.zeros((len(self.notes), len(self.metrics)), dtype=np.int64)
+        if self.rows:
+            days = pd.Series(self._load('day')).groupby(note_ids).max()
+            last_day[days.index] = days.to_numpy()
+            totals = pd.DataFrame(self._deltas(self.metrics)).groupby(note_ids).sum()
+            values[totals.index] = totals.to_numpy()
+        return last_day, values
+
+    def record(self, data, export_date=None) -> int:
+        """
+        记录一次导出中各笔记的计数（只追加计数有变化的笔记）
+        :param data: 导出数据（DataFrame 或字典列表），整数类型的列（见 note_schema）作为计数
+        :param export_date: 导出日期，默认今天；早于笔记已有快照的导出不会写入该笔记
+        :return: 写入的快照行数
+        """
+        frame = apply_note_schema(data if isinstance(data, pd.DataFrame) else pd.DataFrame(data))
+        if frame.empty or TIME_COLUMN not in frame.columns:
+            return 0
+        keys = _note_keys(frame[TIME_COLUMN])
+        present = keys.notna() & ~keys.duplicated(keep='last')
+        frame, keys = frame[present.to_numpy()], keys[present].tolist()
+        if not keys:
+            return 0
+
+        metrics = [col for col in frame.columns
+                   if col != TIME_COLUMN and pd.api.types.is_integer_dtype(frame[col].dtype)]
+        for metric in metrics:
+            if metric not in self.metrics:
+                self.metrics.append(metric)
+        self._truncate()
+
+        titles = frame[TITLE_COLUMN].astype(object).tolist() if TITLE_COLUMN in frame.columns else [None] * len(keys)
+        ids = np.empty(len(keys), dtype=np.int64)
+        for i, (key, title) in enumerate(zip(keys, titles)):
+            note_id = self._note_ids.get(key)
+            if note_id is None:
+                note_id = self._note_ids[key] = len(self.notes)
+                self.notes.append(key)
+                self.titles.append('')
+            if pd.notna(title):
+                self.titles[note_id] = str(title)
+            ids[i] = note_id
+
+        day = _day_number(export_date if export_date is not None else date.today())
+        last_day, last_values = self._latest()
+        previous = last_values[ids]
+        current = previous.copy()
+        for k, metric in enumerate(self.metrics):
+            if metric in frame.columns and pd.api.types.is_integer_dtype(frame[metric].dtype):
+                values = frame[metric]
+                # 本次导出没有的值视为没有变化
+                current[:, k] = np.where(values.notna().to_numpy(),
+                                         values.to_numpy(dtype=np.int64, na_value=0), previous[:, k])
+        deltas = current - previous
+        first = last_day[ids] < 0
+        write = (first | deltas.any(axis=1)) & (last_day[ids] <= day)
+        if not write.any():
+            self._save_index()
+            return 0
+        deltas = deltas[write]
+        if deltas.size and (deltas.min() < _INT32.min or deltas.max() > _INT32.max):
+            raise ValueError("计数的变化超出 int32 范围，无法写入快照")
+
+        columns = {'note': ids[write], 'day': np.full(int(write.sum()), day)}
+        columns.update({f'm{k}': deltas[:, k] for k in range(len(self.metrics))})
+        for name, values in columns.items():
+            with open(self._path(name), 'ab') as f:
+                f.write(np.asarray(values, dtype=np.int32).tobytes())
+        self.rows += int(write.sum())
+        self._save_index()
+        return int(write.sum())
+
+    def snapshots(self, metrics: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        所有快照还原后的计数（每篇笔记每个导出日期一行，同一天以最后一条为准）
+        :return: 列为 note_id、日期、各计数列，按 note_id、日期排序
+        """
+        metrics = [metric for metric in (metrics or self.metrics) if metric in self.metrics]
+        note_ids = self._load('note')
+        values = pd.DataFrame(self._deltas(metrics), columns=metrics).groupby(note_ids).cumsum()
+        frame = pd.concat([pd.DataFrame({'note_id': note_ids, 'day': self._load('day')}), values], axis=1)
+        frame = frame.drop_duplicates(['note_id', 'day'], keep='last')
+        frame = frame.sort_values(['note_id', 'day'], kind='stable', ignore_index=True)
+        frame.insert(1, '日期', _day_to_date(frame.pop('day').to_numpy()))
+        return frame
+
+    def growth_curve(self, note_key: str, metric: str) -> pd.DataFrame:
+        """
+        单篇笔记某项计数的增长曲线
+        :param note_key: 笔记的首次发布时间（中文格式）
+        :return: 列为 日期、<metric>、增量（相对上一次快照）
+        """
+        note_id = self._note_ids.get(note_key)
+        if note_id is None or metric not in self.metrics:
+            return pd.DataFrame(columns=['日期', metric, '增量'])
+        frame = self.snapshots([metric])
+        curve = frame.loc[frame['note_id'] == note_id, ['日期', metric]].reset_index(drop=True)
+        curve['增量'] = curve[metric].diff().fillna(curve[metric]).astype(np.int64)
+        return curve
+
+    def top_growth(self, metric: str, days: int = 7, end=None, limit: Optional[int] = 10) -> pd.DataFrame:
+        """
+        [end - days, end] 内某项计数增长最多的笔记
+        窗口开始时的值取窗口开始前的最后一条快照；之前没有快照时，窗口内发布的笔记从 0 算起，
+        更早发布的笔记从窗口内第一条快照算起
+        :param end: 窗口结束日期，默认今天
+        :return: 列为 首次发布时间、笔记标题、start、end、change，按 change 降序
+        """
+        columns = [TIME_COLUMN, TITLE_COLUMN, 'start', 'end', 'change']
+        if metric not in self.metrics or not self.rows:
+            return pd.DataFrame(columns=columns)
+        end_day = _day_number(end if end is not None else date.today())
+        start_day = end_day - days
+        frame = self.snapshots([metric])
+        frame['day'] = (frame['日期'] - _EPOCH_DAY).dt.days
+
+        upto_end = frame[frame['day'] <= end_day]
+        at_end = upto_end.groupby('note_id')[metric].last()
+        at_start = upto_end[upto_end['day'] <= start_day].groupby('note_id')[metric].last()
+        in_window = upto_end[upto_end['day'] > start_day]
+        first_in_window = in_window.groupby('note_id')[metric].first()
+        active = in_window['note_id'].unique()
+
+        at_end = at_end.reindex(active)
+        baseline = at_start.reindex(active)
+        keys = pd.Series([self.notes[i] for i in active], index=active)
+        published = pd.to_datetime(keys, format=PUBLISH_TIME_FORMAT, errors='coerce')
+        published_in_window = (published >= _EPOCH_DAY + pd.Timedelta(days=start_day)).to_numpy()
+        baseline = baseline.fillna(pd.Series(np.where(published_in_window, 0, first_in_window.reindex(active)),
+                                             index=active))
+
+        result = pd.DataFrame({
+            TIME_COLUMN: keys.to_numpy(),
+            TITLE_COLUMN: [self.titles[i] for i in active],
+            'start': baseline.astype(np.int64).to_numpy(),
+            'end': at_end.astype(np.int64).to_numpy(),
+        })
+        result['change'] = result['end'] - result['start']
+        result = result.sort_values('change', ascending=False, kind='stable', ignore_index=True)
+        return result.head(limit) if limit else result
+
+    def list_notes(self) -> List[str]:
+        return list(self.notes)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("用法: python note_snapshots.py <计数列名> [天数]")
+        sys.exit(1)
+    store = NoteSnapshotStore()
+    window = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    print(f"📈 最近 {window} 天 {sys.argv[1]} 增长最快的笔记（截至 {datetime.now():%Y-%m-%d}）:")
+    print(store.top_growth(sys.argv[1], window).to_string(index=False))
@@ -0,0 +1,197 @@
+"""
+粉丝数和小红书笔记数据的 Parquet 列式归档（可选，需要 pip install pyarrow）
+
+- 粉丝数: data/archive/followers/平台=<平台>/month=<YYYY-MM>/part-*.parquet
+  每次运行只追加本次的数据文件，不重写历史
+- 小红书笔记: data/archive/redbook/month=<YYYY-MM>/part-*.parquet
+  按首次发布时间的月份分区，每次运行用合并后的全量数据替换有变化的分区
+
+列带类型保存（粉丝数为 int64，各项计数为 int32/int64，日期为 timestamp，平台/体裁为字典编码），
+读取时只加载需要的列，并按平台/时间过滤下推到分区和行组，不必解析整个CSV。
+"""
+
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from note_schema import CATEGORY_COLUMNS, TEXT_COLUMNS, TIME_COLUMN, apply_note_schema
+from publish_time import PUBLISH_TIME_FORMAT, parse_publish_times
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    ds = None
+    PARQUET_AVAILABLE = False
+
+DEFAULT_ARCHIVE_DIR = os.path.join('data', 'archive')
+
+REDBOOK_TIME_FORMAT = PUBLISH_TIME_FORMAT
+REDBOOK_TEXT_COLUMNS = TEXT_COLUMNS
+REDBOOK_CATEGORY_COLUMNS = CATEGORY_COLUMNS
+REDBOOK_TIME_COLUMN = TIME_COLUMN
+
+
+def _require_pyarrow():
+    if not PARQUET_AVAILABLE:
+        raise ImportError("Parquet 归档需要安装 pyarrow: pip install pyarrow")
+
+
+def _followers_schema():
+    return pa.schema([
+        ('日期', pa.timestamp('s')),
+        ('账号名', pa.string()),
+        ('平台', pa.dictionary(pa.int32(), pa.string())),
+        ('粉丝数', pa.int64()),
+        ('month', pa.string()),
+    ])
+
+
+def _followers_partitioning():
+    return ds.partitioning(pa.schema([('平台', pa.string()), ('month', pa.string())]), flavor='hive')
+
+
+def _redbook_partitioning():
+    return ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+
+
+def _part_basename():
+    """每次写入使用不同的文件名前缀，追加写入不会覆盖已有文件"""
+    return f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{{i}}.parquet"
+
+
+def _to_timestamp(value):
+    """转换为 pyarrow 时间过滤值"""
+    return pa.scalar(pd.Timestamp(value).to_pydatetime(), type=pa.timestamp('s'))
+
+
+def _to_pandas(table):
+    """pyarrow 表转 DataFrame，字典编码列转为 category，计数列保留可空整数"""
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype(), pa.int32(): pd.Int32Dtype()}.get)
+
+
+# --- 粉丝数 ---
+def archive_followers(rows: Iterable[dict], archive_dir: str = DEFAULT_ARCHIVE_DIR) -> int:
+    """
+    把一批粉丝数数据（字段同 followers.csv）追加到 Parquet 归档
+    :return: 写入行数
+    """
+    _require_pyarrow()
+    df = pd.DataFrame(list(rows), columns=['日期', '账号名', '平台', '粉丝数'])
+    if df.empty:
+        return 0
+    df['日期'] = pd.to_datetime(df['日期'], errors='coerce')
+    df = df.dropna(subset=['日期', '平台'])
+    df['粉丝数'] = pd.to_numeric(df['粉丝数'], errors='coerce').fillna(0).astype('int64')
+    df['账号名'] = df['账号名'].astype(str)
+    df['平台'] = df['平台'].astype(str)
+    df['month'] = df['日期'].dt.strftime('%Y-%m')
+
+    table = pa.Table.from_pandas(df, schema=_followers_schema(), preserve_index=False)
+    ds.write_dataset(table, os.path.join(archive_dir, 'followers'), format='parquet',
+                     partitioning=_followers_partitioning(),
+                     basename_template=_part_basename(),
+                     existing_data_behavior='overwrite_or_ignore')
+    return len(df)
+
+
+def archive_followers_csv(csv_path: str, archive_dir: str = DEFAULT_ARCHIVE_DIR) -> int:
+    """一次性把已有的 followers.csv 转存为 Parquet 归档"""
+    df = pd.read_csv(csv_path, encoding='utf-8-sig')
+    return archive_followers(df.to_dict('records'), archive_dir)
+
+
+def read_followers(columns: Optional[List[str]] = None, platform: Optional[str] = None,
+                   account: Optional[str] = None, start=None, end=None,
+                   archive_dir: str = DEFAULT_ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    读取粉丝数归档
+    :param columns: 需要的列（只读取这些列），默认 日期/账号名/平台/粉丝数
+    :param platform: 只读取该平台的分区
+    :param account: 只返回该账号
+    :param start/end: 日期范围（包含），可以是字符串或 datetime
+    """
+    _require_pyarrow()
+    path = os.path.join(archive_dir, 'followers')
+    columns = columns or ['日期', '账号名', '平台', '粉丝数']
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+
+    dataset = ds.dataset(path, format='parquet', partitioning=_followers_partitioning())
+    condition = None
+    for expr in (
+        ds.field('平台') == platform if platform is not None else None,
+        ds.field('账号名') == account if account is not None else None,
+        ds.field('日期') >= _to_timestamp(start) if start is not None else None,
+        ds.field('日期') <= _to_timestamp(end) if end is not None else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+
+    df = _to_pandas(dataset.to_table(columns=columns, filter=condition))
+    if '平台' in df.columns:
+        df['平台'] = df['平台'].astype('category')
+    return df
+
+
+# --- 小红书笔记 ---
+def _redbook_frame(data) -> pd.DataFrame:
+    """规范小红书笔记数据的列类型（见 note_schema），发布时间以秒为精度"""
+    df = apply_note_schema(pd.DataFrame(data))
+    if REDBOOK_TIME_COLUMN in df.columns:
+        # 含无法解析的发布时间时 note_schema 保留文本，归档只保存能解析的行
+        df[REDBOOK_TIME_COLUMN] = parse_publish_times(df[REDBOOK_TIME_COLUMN]).astype('datetime64[s]')
+    return df
+
+
+def archive_redbook_notes(data, archive_dir: str = DEFAULT_ARCHIVE_DIR) -> int:
+    """
+    把合并后的小红书笔记全量数据写入 Parquet 归档（按发布月份分区，替换本次涉及的分区）
+    :param data: 字典列表或 DataFrame
+    :return: 写入行数
+    """
+    _require_pyarrow()
+    df = _redbook_frame(data)
+    if df.empty or REDBOOK_TIME_COLUMN not in df.columns:
+        return 0
+    df = df.dropna(subset=[REDBOOK_TIME_COLUMN])
+    df['month'] = df[REDBOOK_TIME_COLUMN].dt.strftime('%Y-%m')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(table, os.path.join(archive_dir, 'redbook'), format='parquet',
+                     partitioning=_redbook_partitioning(),
+                     basename_template=_part_basename(),
+                     existing_data_behavior='delete_matching')
+    return len(df)
+
+
+def read_redbook_notes(columns: Optional[List[str]] = None, genre: Optional[str] = None,
+                       start=None, end=None, archive_dir: str = DEFAULT_ARCHIVE_DIR) -> pd.DataFrame:
+    """
+    读取小红书笔记归档
+    :param columns: 需要的列（只读取这些列），默认全部
+    :param genre: 只返回该体裁
+    :param start/end: 首次发布时间范围（包含）
+    """
+    _require_pyarrow()
+    path = os.path.join(archive_dir, 'redbook')
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns or [])
+
+    dataset = ds.dataset(path, format='parquet', partitioning=_redbook_partitioning())
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != 'month']
+    condition = None
+    for expr in (
+        ds.field('体裁') == genre if genre is not None else None,
+        ds.field(REDBOOK_TIME_COLUMN) >= _to_timestamp(start) if start is not None else None,
+        ds.field(REDBOOK_TIME_COLUMN) <= _to_timestamp(end) if end is not None else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+
+    return _to_pandas(dataset.to_table(columns=columns, filter=condition))
@@ -0,0 +1,168 @@
+"""
+小红书笔记发布时间的统一转换
+
+导出数据中的发布时间是中国时间字符串（2025年07月20日17时37分34秒），飞书日期字段是 UTC 毫秒时间戳。
+写入飞书、比较数据和读取飞书现有记录都用这里的函数按整列转换，保证几处得到的主键一致：
+- parse_publish_times: 发布时间 -> 不带时区的中国时间（datetime64）
+- to_epoch_ms: 发布时间（中文格式、其他可解析的格式或 datetime64 列，按 Asia/Shanghai 时间）-> UTC 毫秒时间戳
+- from_epoch_ms: UTC 毫秒时间戳 -> 主键字符串（中国时间，中文格式）
+- to_time_keys: 发布时间 -> 主键字符串（先转换为时间戳再转换回来，与飞书记录的主键一致）
+- feishu_time_keys: 飞书记录中的发布时间字段 -> 主键字符串
+转换结果按原始值缓存，同一批数据重复转换时（多次同步、重建镜像）不再解析。
+"""
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+PUBLISH_TIME_FORMAT = '%Y年%m月%d日%H时%M分%S秒'
+LOCAL_TIMEZONE = 'Asia/Shanghai'
+MAX_CACHE_SIZE = 200000
+
+_ISO_FORMAT = '%Y-%m-%d %H:%M:%S'
+_ISO_SEPARATORS = (('年', '-'), ('月', '-'), ('日', ' '), ('时', ':'), ('分', ':'), ('秒', ''))
+
+_UTC_EPOCH = pd.Timestamp(0, tz='UTC')
+_MILLISECOND = pd.Timedelta(milliseconds=1)
+
+_millis_cache: Dict = {}          # 原始发布时间 -> 毫秒时间戳（无法解析时为 None）
+_key_cache: Dict[int, str] = {}   # 毫秒时间戳 -> 主键字符串
+
+
+def _remember(cache: Dict, values: Dict):
+    if len(cache) + len(values) > MAX_CACHE_SIZE:
+        cache.clear()
+    cache.update(values)
+
+
+def _as_series(values) -> pd.Series:
+    return values.astype(object) if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+
+
+def _none_for_missing(keys: pd.Series) -> pd.Series:
+    return keys.astype(object).where(keys.notna(), None)
+
+
+def _present(values: pd.Series) -> pd.Series:
+    """非空（不是 NaN/None，也不是空字符串）"""
+    return values.notna() & (values != '')
+
+
+def _to_local_naive(value):
+    """单个值解析为不带时区的中国时间，无法解析时为 NaT"""
+    ts = pd.to_datetime(value, errors='coerce')
+    if pd.notna(ts) and ts.tzinfo is not None:
+        ts = ts.tz_convert(LOCAL_TIMEZONE).tz_localize(None)
+    return ts
+
+
+def _parse_chinese(values: pd.Series) -> pd.Series:
+    """中文格式的发布时间：替换为 ISO 格式后解析（按中文格式直接解析要慢一个数量级）"""
+    iso = values.astype(str)
+    for char, separator in _ISO_SEPARATORS:
+        iso = iso.str.replace(char, separator, regex=False)
+    return pd.to_datetime(iso, format=_ISO_FORMAT, errors='coerce')
+
+
+def _parse_local(values: pd.Series) -> pd.Series:
+    """解析发布时间为不带时区的中国时间（datetime64），无法解析的为 NaT"""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        is_text = values.notna()
+    else:
+        is_text = values.map(lambda value: isinstance(value, str))
+    chinese = is_text & values.where(is_text, '').str.contains('年', regex=False)
+    if chinese.any():
+        parsed[chinese] = _parse_chinese(values[chinese])
+    others = ~chinese
+    if others.any():
+        try:
+            other_times = pd.to_datetime(values[others], errors='coerce', format='mixed')
+            if getattr(other_times.dt, 'tz', None) is not None:
+                other_times = other_times.dt.tz_convert(LOCAL_TIMEZONE).dt.tz_localize(None)
+        except (TypeError, ValueError):
+            # 混合了带时区和不带时区的值等情况，逐个解析
+            other_times = values[others].map(_to_local_naive)
+        parsed[others] = other_times
+    return parsed
+
+
+def parse_publish_times(values) -> pd.Series:
+    """发布时间列 -> 不带时区的中国时间（datetime64），空值和无法解析的值为 NaT"""
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_dtype(values.dtype):
+        return values
+    values = _as_series(values)
+    return _parse_local(values.where(_present(values)))
+
+
+def _local_to_epoch_ms(local: pd.Series) -> pd.Series:
+    utc = local.dt.tz_localize(LOCAL_TIMEZONE, ambiguous='NaT', nonexistent='NaT').dt.tz_convert('UTC')
+    return (utc - _UTC_EPOCH) // _MILLISECOND
+
+
+def to_epoch_ms(values) -> pd.Series:
+    """
+    发布时间列 -> UTC 毫秒时间戳（Int64），原始时间按 Asia/Shanghai 时间处理
+    空值和无法解析的值为 <NA>
+    """
+    if isinstance(values, pd.Series) and pd.api.types.is_datetime64_dtype(values.dtype):
+        # 已是 datetime64 列（见 note_schema），直接按列换算，不经过缓存
+        return _local_to_epoch_ms(values.astype('datetime64[ns]')).astype('Int64')
+    values = _as_series(values)
+    present = _present(values)
+    uncached = [value for value in pd.unique(values[present]) if value not in _millis_cache]
+    if uncached:
+        millis = _local_to_epoch_ms(_parse_local(pd.Series(uncached, dtype=object)))
+        _remember(_millis_cache, {value: (None if pd.isna(ms) else int(ms))
+                                  for value, ms in zip(uncached, millis)})
+    result = values.where(present).map(lambda value: _millis_cache.get(value) if pd.notna(value) else None)
+    return result.astype('Int64')
+
+
+def from_epoch_ms(values) -> pd.Series:
+    """UTC 毫秒时间戳列 -> 主键字符串（中国时间），无法转换为数字的值为 None"""
+    numbers = pd.to_numeric(_as_series(values), errors='coerce').astype('Int64')
+    present = numbers.notna()
+    uncached = [int(ms) for ms in pd.unique(numbers[present]) if int(ms) not in _key_cache]
+    if uncached:
+        times = pd.to_datetime(pd.Series(uncached, dtype='int64'), unit='ms', utc=True)
+        keys = times.dt.tz_convert(LOCAL_TIMEZONE).dt.strftime(PUBLISH_TIME_FORMAT)
+        _remember(_key_cache, dict(zip(uncached, keys.tolist())))
+    keys = numbers.astype(object).map(lambda ms: _key_cache.get(int(ms)) if pd.notna(ms) else None)
+    return _none_for_missing(keys)
+
+
+def to_time_keys(values) -> pd.Series:
+    """
+    发布时间列 -> 主键字符串
+    可解析的时间经由毫秒时间戳统一格式，无法解析时使用原始字符串，空值为 None
+    """
+    keys = from_epoch_ms(to_epoch_ms(values))
+    values = _as_series(values)
+    fallback = _present(values) & keys.isna()
+    keys[fallback] = values[fallback].astype(str)
+    return _none_for_missing(keys)
+
+
+def feishu_time_keys(values) -> pd.Series:
+    """
+    飞书记录中的发布时间字段 -> 主键字符串
+    日期字段是 UTC 毫秒时间戳；文本等其他类型使用原始值的字符串，空值为 None
+    """
+    values = _as_series(values)
+    is_number = values.map(lambda value: isinstance(value, (int, float)) and not isinstance(value, bool))
+    present = values.map(bool) & values.notna()
+    keys = pd.Series(None, index=values.index, dtype=object)
+    numbers = present & is_number
+    if numbers.any():
+        keys[numbers] = from_epoch_ms(values[numbers])
+    others = present & ~is_number
+    keys[others] = values[others].astype(str)
+    return _none_for_missing(keys)
+
+
+def feishu_time_key(value) -> Optional[str]:
+    """单条飞书记录的发布时间字段 -> 主键字符串（缓存命中时不经过 pandas）"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value in _key_cache:
+        return _key_cache[value]
+    return feishu_time_keys([value]).iloc[0]
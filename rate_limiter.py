@@ -0,0 +1,232 @@
+"""
+按平台共享的令牌桶限速器
+
+令牌以 rate（次/秒）的速度补充，桶内最多存放 burst 个令牌。
+每次请求前先取令牌，令牌不足时等待到下一个令牌可用为止，
+这样账号再多也正好以平台允许的速率运行，而不是固定 sleep 空等。
+同一个限速器可以同时被协程（acquire）和线程（acquire_sync）使用。
+
+AdaptiveThrottle 在令牌桶之上做 AIMD 自适应：请求成功时线性提高速率和并发，
+遇到 412/429/反爬页面时按比例降低，自动逼近平台可接受的最快速度。
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+# 各平台默认限速 (次/秒, 突发数)，独立运行各平台脚本时使用；
+# followers_feishu 运行时会用采集器注册表中的声明覆盖
+DEFAULT_RATE_LIMITS = {
+    'bilibili': (1 / 3, 1),
+    'youtube': (1, 1),
+    'redbook': (1 / 5, 1),
+    'douyin': (1 / 4, 1),
+    'weibo': (1 / 3, 1),
+    'zhihu': (1 / 2, 1),
+}
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）"""
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        """
+        :param rate: 每秒补充的令牌数，None 或 <= 0 表示不限速
+        :param burst: 桶容量，即允许连续突发的请求数
+        """
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return not self.rate or self.rate <= 0
+
+    def _refill(self, now: float):
+        """按经过的时间补充令牌（调用方需持有锁）"""
+        if not self.unlimited:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: Optional[float], burst: Optional[int] = None):
+        """原地调整速率和桶容量，已持有该限速器的调用方立即生效"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            if burst is not None:
+                self.burst = max(1, int(burst))
+            self.tokens = min(self.tokens, float(self.burst))
+
+    def drain(self):
+        """清空桶内令牌，下一个请求至少等待一个补充周期（用于被限流后的退避）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+    def reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数（0 表示立即可用）"""
+        with self._lock:
+            if self.unlimited:
+                return 0.0
+            self._refill(time.monotonic())
+            # 允许令牌数为负：后来的请求依次排在更晚的时间点上
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self):
+        """协程中获取一个令牌"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self):
+        """线程中获取一个令牌（阻塞当前线程）"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# 判定为"被限流"的 HTTP 状态码
+THROTTLE_STATUS_CODES = {403, 412, 429, 503}
+
+
+class AdaptiveThrottle:
+    """
+    AIMD 自适应限流（加性增、乘性减）
+    - 每次成功：速率 += rate_step，并发窗口 += 1/窗口（约每一轮并发请求 +1）
+    - 被限流：速率 *= decrease_factor，并发窗口减半，并清空令牌桶立即退避
+    速率作用在共享的 TokenBucket 上；并发窗口通过 slot() 限制同时在途的协程请求数
+    """
+    def __init__(self, name: str, limiter: TokenBucket, max_concurrency: int = 4,
+                 decrease_factor: float = 0.5, increase_ratio: float = 0.1,
+                 min_ratio: float = 0.125, max_ratio: float = 4.0):
+        """
+        :param name: 平台名（用于日志）
+        :param limiter: 被调节的令牌桶
+        :param max_concurrency: 并发窗口上限
+        :param decrease_factor: 被限流时的乘性降低系数
+        :param increase_ratio: 每次成功增加的速率，占基准速率的比例
+        :param min_ratio: 速率下限，占基准速率的比例
+        :param max_ratio: 速率上限，占基准速率的比例
+        """
+        self.name = name
+        self.limiter = limiter
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.decrease_factor = decrease_factor
+        self.increase_ratio = increase_ratio
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self._lock = threading.Lock()
+        self._condition = None
+        self._condition_loop = None
+        self.in_flight = 0
+        self.throttled_count = 0
+        self.reset(limiter.rate)
+
+    def reset(self, base_rate: Optional[float]):
+        """以新的基准速率重置自适应状态"""
+        with self._lock:
+            self.base_rate = base_rate if base_rate and base_rate > 0 else None
+            self.concurrency = 1.0
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(1, min(self.max_concurrency, int(self.concurrency)))
+
+    def record_success(self):
+        """请求成功：加性提高速率和并发窗口"""
+        with self._lock:
+            self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            if self.base_rate is not None:
+                rate = min(self.base_rate * self.max_ratio,
+                           self.limiter.rate + self.base_rate * self.increase_ratio)
+                self.limiter.configure(rate)
+
+    def record_throttled(self, reason: str = ""):
+        """被限流（412/429/反爬页面等）：乘性降低速率和并发窗口，并立即退避"""
+        with self._lock:
+            self.throttled_count += 1
+            self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+            if self.base_rate is not None:
+                rate = max(self.base_rate * self.min_ratio, self.limiter.rate * self.decrease_factor)
+                self.limiter.configure(rate)
+            rate = self.limiter.rate
+        self.limiter.drain()
+        rate_text = f"{rate:.3f} 次/秒" if rate else "不限速"
+        print(f"🐢 {self.name} 触发限流信号{f'（{reason}）' if reason else ''}，速率降至 {rate_text}，并发 {self.concurrency_limit}")
+
+    def record_response(self, status_code: int):
+        """按 HTTP 状态码反馈：限流状态码降速，200 视为成功"""
+        if status_code in THROTTLE_STATUS_CODES:
+            self.record_throttled(f"HTTP {status_code}")
+        elif status_code == 200:
+            self.record_success()
+
+    async def acquire(self):
+        await self.limiter.acquire()
+
+    def acquire_sync(self):
+        self.limiter.acquire_sync()
+
+    @asynccontextmanager
+    async def slot(self):
+        """占用一个并发窗口（窗口已满时等待）；每个请求仍需单独 acquire 令牌"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            # Condition 绑定事件循环，独立脚本多次 asyncio.run 时需要重建
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+            self.in_flight = 0
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.concurrency_limit)
+            self.in_flight += 1
+        try:
+            yield self
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_throttles: Dict[str, AdaptiveThrottle] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(platform: str) -> TokenBucket:
+    """获取平台共享的限速器，首次使用时按默认配置创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(platform)
+        if limiter is None:
+            rate, burst = DEFAULT_RATE_LIMITS.get(platform, (None, 1))
+            limiter = TokenBucket(rate, burst)
+            _limiters[platform] = limiter
+        return limiter
+
+
+def get_throttle(platform: str) -> AdaptiveThrottle:
+    """获取平台共享的自适应限流器（调节同一个令牌桶）"""
+    limiter = get_rate_limiter(platform)
+    with _limiters_lock:
+        throttle = _throttles.get(platform)
+        if throttle is None:
+            throttle = AdaptiveThrottle(platform, limiter)
+            _throttles[platform] = throttle
+        return throttle
+
+
+def configure_rate_limiter(platform: str, rate: Optional[float], burst: int = 1,
+                           max_concurrency: Optional[int] = None) -> TokenBucket:
+    """设置平台限速（次/秒, 突发数），同时以该速率作为自适应限流的基准"""
+    limiter = get_rate_limiter(platform)
+    limiter.configure(rate, burst)
+    throttle = get_throttle(platform)
+    if max_concurrency is not None:
+        throttle.max_concurrency = max(1, int(max_concurrency))
+    throttle.reset(rate)
+    return limiter
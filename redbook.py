@@ -1,13 +1,23 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
-import requests
-import json
 import time
 import os
 import subprocess
 import sys
 import asyncio
 import logging
+from feishu_client import MAX_BATCH_SIZE, FeishuAPIError, get_feishu_client
+from feishu_mirror import TableMirror
+from note_diff import diff_notes, feishu_fields
+from note_hash import note_content_hash
+from note_schema import apply_note_schema, format_publish_times, note_keys, read_notes_csv, to_csv_frame
+from note_snapshots import NoteSnapshotStore
+from publish_time import feishu_time_key, feishu_time_keys
+from parquet_archive import PARQUET_AVAILABLE, archive_redbook_notes
+from redbook_ingest import file_sha256, load_export
+from export_catalog import ExportCatalog
+from stage_cache import StageCache, frame_fingerprint
 
 """
 从小红书创作者中心导出数据，本地备份并增量更新到飞书表格
@@ -22,6 +32,27 @@ FEISHU_TABLE_ID = "your_table_id"      # 飞书多维表格子表ID
 # 数据文件配置
 DATA_CSV_PATH = os.path.join("data", "redbook_data.csv")
 EXCEL_DIR = os.path.join("downloads", "redbook")
+EXCEL_CACHE_DIR = os.path.join("data", "cache", "excel")  # 导出文件解析结果的缓存目录，None 表示每次都解析
+EXPORT_INDEX_PATH = os.path.join("data", "redbook_exports.json")  # 导出目录的索引（文件哈希、行数等）
+
+# 飞书批量写入配置
+FEISHU_UPLOAD_CONCURRENCY = 1   # 同时在途的批次数（每批500条），默认逐批写入；大于 1 为可选项，同一数据表并发写入会触发写冲突
+FEISHU_UPLOAD_QPS = 5           # 写请求每秒上限（飞书写接口限频约 10 次/秒）
+
+# 飞书表格本地镜像：数据表未被修改时不再全量分页读取；None 表示每次都全量读取
+FEISHU_MIRROR_PATH = os.path.join("data", "feishu_mirror.json")
+FEISHU_MIRROR_MAX_AGE_HOURS = 24 * 7   # 无论是否变化，超过该时间后全量读取校准一次
+
+# 把内容哈希写入飞书的隐藏文本列（需先在数据表中创建该列），供表格之外的工具判断记录是否变化，None 表示不写入。
+# 该列只写入、不读取：增量同步的变化检测使用本地镜像按记录字段重新计算的哈希（见 note_diff），
+# 表格被手动修改时该列不会随之更新，不能作为比较依据
+FEISHU_CONTENT_HASH_FIELD = None
+# 阶段缓存：输入没有变化的阶段直接跳过（命令行加 --force 时完整运行），None 表示不使用
+STAGE_CACHE_PATH = os.path.join("data", "redbook_stages.json")
+FEISHU_RESYNC_HOURS = 24    # 数据没有变化时，超过该时间仍重新同步一次飞书（校准表格中的手动修改）
+EXPORT_REUSE_MINUTES = 10   # 该时间内已有导出文件时不再启动浏览器导出，0 表示每次都导出
+PARQUET_ARCHIVE_DIR = os.path.join("data", "archive")  # Parquet 列式归档目录（需要 pyarrow），None 表示不归档
+NOTE_SNAPSHOT_DIR = os.path.join("data", "note_snapshots")  # 按导出日期保存各笔记计数的快照，None 表示不保存
 
 # 配置日志
 def setup_logging():
@@ -47,146 +78,168 @@ def setup_logging():
     
     return log_path
 
+def get_client():
+    """共享的飞书客户端（连接池复用）"""
+    return get_feishu_client(FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN)
+
 def get_feishu_access_token():
     """获取飞书访问令牌"""
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    payload = {"app_id": FEISHU_APP_ID, "app_secret": FEISHU_APP_SECRET}
-    
     try:
-        response = requests.post(url, json=payload, headers={'Content-Type': 'application/json'})
-        result = response.json()
-        
-        if result.get('code') == 0:
-            logging.info("✅ 成功获取飞书访问令牌")
-            return result.get('tenant_access_token')
-        else:
-            logging.error(f"❌ 获取飞书访问令牌失败: {result.get('msg')}")
-            return None
+        token = get_client().get_tenant_access_token()
+        logging.info("✅ 成功获取飞书访问令牌")
+        return token
+    except FeishuAPIError as e:
+        logging.error(f"❌ 获取飞书访问令牌失败: {e}")
+        return None
     except Exception as e:
         logging.error(f"❌ 获取飞书访问令牌异常: {e}")
         return None
 
+def upload_records(operation, access_token, table_id, records, action):
+    """
+    分批写入飞书（QPS 受 FEISHU_UPLOAD_QPS 限制，默认逐批发送，见 FEISHU_UPLOAD_CONCURRENCY），
+    失败的批次单独重试
+    :return: (是否全部成功, 按批次顺序排列的结果)
+    """
+    total_batches = (len(records) + MAX_BATCH_SIZE - 1) // MAX_BATCH_SIZE
+    concurrency_note = f"（并发 {FEISHU_UPLOAD_CONCURRENCY} 批）" if FEISHU_UPLOAD_CONCURRENCY > 1 else ""
+    print(f"🚀 共 {len(records)} 条记录，分 {total_batches} 批{action}{concurrency_note}...")
+    
+    def report(result, total):
+        batch_num = result.index + 1
+        retry_note = f"（重试 {result.attempts - 1} 次）" if result.attempts > 1 else ""
+        if result.ok:
+            print(f"✅ 第 {batch_num}/{total} 批{action}成功！({len(result.records)} 条记录){retry_note}")
+        else:
+            print(f"❌ 第 {batch_num}/{total} 批{action}失败: {result.error}{retry_note} (client_token: {result.client_token})")
+    
+    try:
+        results = get_client().upload_batches(operation, access_token, table_id, records,
+                                              concurrency=FEISHU_UPLOAD_CONCURRENCY,
+                                              qps=FEISHU_UPLOAD_QPS, on_batch=report)
+    except Exception as e:
+        print(f"❌ 批量{action}异常: {e}")
+        return False, []
+    
+    failed = [result for result in results if not result.ok]
+    if failed:
+        failed_count = sum(len(result.records) for result in failed)
+        print(f"❌ {len(failed)}/{len(results)} 批{action}失败，共 {failed_count} 条记录未{action}")
+        return False, results
+    return True, results
+
 def write_to_feishu_table(data_list, access_token, table_id, columns):
-    """写入数据到飞书数据表（支持分批写入）"""
-    if not data_list or not access_token or not table_id:
+    """写入数据（DataFrame 或字典列表）到飞书数据表（支持分批写入）"""
+    if data_list is None or len(data_list) == 0 or not access_token or not table_id:
         print("❌ 数据为空或参数无效，跳过飞书写入")
         return False
     
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables/{table_id}/records/batch_create"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
+    # 按列转换数据格式（发布时间转为 UTC 毫秒时间戳，文本截断，数字取整）
+    records = [{"fields": fields} for fields in feishu_fields(data_list, columns, FEISHU_CONTENT_HASH_FIELD)]
     
-    # 分批处理，每批最多500条
-    batch_size = 500
-    total_records = len(data_list)
-    success_count = 0
-    
-    for i in range(0, total_records, batch_size):
-        batch_data = data_list[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (total_records + batch_size - 1) // batch_size
-        
-        print(f"📝 正在写入第 {batch_num}/{total_batches} 批数据 ({len(batch_data)} 条记录)...")
-        
-        # 转换数据格式
-        records = []
-        for item in batch_data:
-            fields = {}
-            for col in columns:
-                value = item.get(col, '')
-                
-                # 处理时间字段
-                if col == '首次发布时间':
-                    if pd.notna(value) and value != '':
-                        try:
-                            if isinstance(value, str):
-                                # 处理中文时间格式：2025年07月20日17时37分34秒
-                                if '年' in value and '月' in value and '日' in value:
-                                    # 替换中文字符为标准格式
-                                    time_str = value.replace('年', '-').replace('月', '-').replace('日', ' ')
-                                    time_str = time_str.replace('时', ':').replace('分', ':').replace('秒', '')
-                                    # 原始时间是中国时间，需要转换为UTC
-                                    time_obj = pd.to_datetime(time_str)
-                                    # 减去8小时转换为UTC时间
-                                    time_obj_utc = time_obj - pd.Timedelta(hours=8)
-                                    fields[col] = int(time_obj_utc.timestamp() * 1000)
-                                else:
-                                    # 尝试直接解析，假设也是中国时间
-                                    time_obj = pd.to_datetime(value)
-                                    time_obj_utc = time_obj - pd.Timedelta(hours=8)
-                                    fields[col] = int(time_obj_utc.timestamp() * 1000)
-                            else:
-                                # 假设是中国时间，转换为UTC
-                                time_obj = pd.to_datetime(value)
-                                time_obj_utc = time_obj - pd.Timedelta(hours=8)
-                                fields[col] = int(time_obj_utc.timestamp() * 1000)
-                        except Exception as e:
-                            print(f"⚠️ 时间字段 '{col}' 值 '{value}' 转换失败，使用原始字符串: {e}")
-                            fields[col] = str(value)
-                    else:
-                        fields[col] = ''
-                # 处理文本字段
-                elif col in ['笔记标题', '体裁']:
-                    fields[col] = str(value)[:1000] if pd.notna(value) else ''  # 限制长度避免过长
-                # 处理数字字段（其他所有字段）
-                else:
-                    try:
-                        fields[col] = int(float(value)) if pd.notna(value) and value != '' else 0
-                    except:
-                        fields[col] = 0
-            
-            records.append({"fields": fields})
-        
-        try:
-            response = requests.post(url, json={"records": records}, headers=headers)
-            result = response.json()
-            
-            if result.get('code') == 0:
-                success_count += len(batch_data)
-                print(f"✅ 第 {batch_num} 批数据写入成功！")
-            else:
-                print(f"❌ 第 {batch_num} 批数据写入失败: {result.get('msg')}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 第 {batch_num} 批数据写入异常: {e}")
-            return False
-        
-        # 添加延迟避免触发频率限制（10次/秒）
-        if batch_num < total_batches:
-            time.sleep(0.2)  # 200ms延迟
+    # 分批（每批最多500条）并发写入
+    success, results = upload_records('create', access_token, table_id, records, "写入")
+    if not success:
+        return False
     
+    success_count = sum(len(result.records) for result in results)
     print(f"🎉 所有数据写入完成！总共成功写入 {success_count} 条记录")
     return True
 
 def read_excel_data(file_path):
-    """读取Excel文件数据（从第二行开始，第二行作为表头）"""
+    """
+    读取Excel文件数据（从第二行开始，第二行作为表头）
+    同一个导出文件的解析结果按内容哈希缓存，见 redbook_ingest；各列按 note_schema 转换类型
+    :return: (DataFrame, 列名列表)，读取失败时为空 DataFrame
+    """
     try:
         print(f"📖 正在读取Excel文件: {file_path}")
         
-        # 读取Excel文件，跳过第一行，第二行作为表头
-        df = pd.read_excel(file_path, header=1)  # header=1表示第二行作为表头
-        
-        # 删除所有列都为空的行
-        df = df.dropna(how='all')
+        df, _ = load_export(file_path, EXCEL_CACHE_DIR)
+        df = apply_note_schema(df)
         
         print(f"📊 读取到 {len(df)} 行数据，{len(df.columns)} 列")
         print(f"📋 列名: {list(df.columns)}")
         
-        # 转换为字典列表
-        data_list = df.to_dict('records')
-        
-        return data_list, list(df.columns)
+        return df, list(df.columns)
         
     except Exception as e:
         print(f"❌ 读取Excel文件失败: {e}")
-        return [], []
+        return pd.DataFrame(), []
+
+# 按文本比较的列，其余列按数字比较
+NOTE_TEXT_COLUMNS = ['笔记标题', '体裁', '首次发布时间']
+
+def _blank_missing(values):
+    """缺失值（NaN/None/NA）替换为空字符串"""
+    values = values.astype(object)
+    return values.where(values.notna(), '')
+
+def _numeric_for_compare(values):
+    """
+    列转换为用于比较的数字：空值为 0
+    :return: (数字, 是否转换成功)，转换失败的位置按文本比较
+    """
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        # 按 note_schema 转换后的计数列
+        return values.astype('float64').fillna(0), pd.Series(True, index=values.index)
+    values = _blank_missing(values)
+    blank = values.astype(object) == ''
+    numbers = pd.to_numeric(values.mask(blank), errors='coerce')
+    converted = blank | numbers.notna()
+    return numbers.fillna(0).astype(float), converted
+
+def _column_changed(new_values, old_values, text):
+    """逐行比较两列（已按主键对齐），返回有变化的掩码"""
+    if text:
+        return _blank_missing(new_values).astype(str) != _blank_missing(old_values).astype(str)
+    new_numbers, new_converted = _numeric_for_compare(new_values)
+    old_numbers, old_converted = _numeric_for_compare(old_values)
+    both_numeric = new_converted & old_converted
+    changed = new_numbers != old_numbers
+    if not both_numeric.all():
+        text_changed = _blank_missing(new_values).astype(str) != _blank_missing(old_values).astype(str)
+        changed = changed.where(both_numeric, text_changed)
+    return changed
+
+def find_changed_notes(excel_df, existing_df, unique_key='首次发布时间'):
+    """
+    按主键比较 Excel 数据与现有数据
+    数字列按数值比较（空值视为 0，无法转换为数字时按文本比较），文本列按字符串比较；
+    现有数据中主键重复时以最后一条为准
+    :return: (新增主键数, Excel 各行是否有内容变化的布尔 Series)
+    """
+    excel_keys = note_keys(excel_df[unique_key])
+    existing = existing_df.set_axis(note_keys(existing_df[unique_key]), axis=0)
+    existing = existing[~existing.index.duplicated(keep='last')]
+    
+    positions = existing.index.get_indexer(excel_keys)
+    matched = positions >= 0
+    new_records = excel_keys[~matched].nunique(dropna=False)
+    changed = np.zeros(len(excel_df), dtype=bool)
+    if not matched.any():
+        return new_records, pd.Series(changed, index=excel_df.index)
+    
+    new_rows = excel_df[matched]
+    old_rows = existing.iloc[positions[matched]].set_axis(new_rows.index, axis=0)
+    row_changed = pd.Series(False, index=new_rows.index)
+    for col in excel_df.columns:
+        if col == unique_key:
+            continue  # 跳过主键字段
+        old_values = old_rows[col] if col in old_rows.columns else pd.Series('', index=new_rows.index)
+        row_changed |= _column_changed(new_rows[col], old_values, col in NOTE_TEXT_COLUMNS)
+    changed[matched] = row_changed.to_numpy()
+    return new_records, pd.Series(changed, index=excel_df.index)
 
 def merge_data_with_history(excel_data, existing_csv_path, unique_key='首次发布时间'):
-    """将Excel数据与现有CSV数据合并，使用发布时间作为唯一标识符"""
+    """
+    将Excel数据（DataFrame 或字典列表）与现有CSV数据合并，使用发布时间作为唯一标识符
+    :return: 合并后的 DataFrame（列类型见 note_schema）
+    """
     # 读取现有CSV数据
     if os.path.exists(existing_csv_path):
         try:
-            existing_df = pd.read_csv(existing_csv_path)
+            existing_df = read_notes_csv(existing_csv_path)
             print(f"📖 读取到现有CSV数据: {len(existing_df)} 条记录")
         except Exception as e:
             print(f"⚠️ 读取现有CSV文件失败: {e}，将创建新文件")
@@ -195,8 +248,7 @@ def merge_data_with_history(excel_data, existing_csv_path, unique_key='首次发
         existing_df = pd.DataFrame()
         print("📄 未找到现有CSV文件，将创建新文件")
     
-    # 将Excel数据转换为DataFrame
-    excel_df = pd.DataFrame(excel_data)
+    excel_df = apply_note_schema(excel_data if isinstance(excel_data, pd.DataFrame) else pd.DataFrame(excel_data))
     
     if existing_df.empty:
         # 如果没有历史数据，直接使用Excel数据
@@ -216,74 +268,16 @@ def merge_data_with_history(excel_data, existing_csv_path, unique_key='首次发
             new_records = len(excel_df)
             updated_records = 0
         else:
-            # 真正比较数据内容的变化
-            excel_keys = set(excel_df[unique_key].astype(str))
-            existing_keys = set(existing_df[unique_key].astype(str))
-            
-            # 新增的记录
-            new_keys = excel_keys - existing_keys
-            new_records = len(new_keys)
-            
-            # 检查真正有内容变化的记录
-            updated_records = 0
-            actually_updated_keys = set()
-            
-            # 为现有数据建立索引，方便查找
-            existing_dict = {}
-            for _, row in existing_df.iterrows():
-                key = str(row[unique_key])
-                existing_dict[key] = row.to_dict()
-            
-            # 逐条比较Excel数据与现有数据
-            for _, excel_row in excel_df.iterrows():
-                excel_key = str(excel_row[unique_key])
-                
-                if excel_key in existing_dict:
-                    # 记录存在，比较内容是否有变化
-                    existing_row = existing_dict[excel_key]
-                    has_changes = False
-                    
-                    # 比较每个字段（除了时间字段）
-                    for col in excel_df.columns:
-                        if col == unique_key:
-                            continue  # 跳过主键字段
-                        
-                        excel_value = excel_row[col]
-                        existing_value = existing_row.get(col, '')
-                        
-                        # 处理NaN值
-                        if pd.isna(excel_value):
-                            excel_value = ''
-                        if pd.isna(existing_value):
-                            existing_value = ''
-                        
-                        # 对于数字字段，转换为数字比较
-                        if col not in ['笔记标题', '体裁', '首次发布时间']:
-                            try:
-                                excel_num = float(excel_value) if excel_value != '' else 0
-                                existing_num = float(existing_value) if existing_value != '' else 0
-                                if excel_num != existing_num:
-                                    has_changes = True
-                                    break
-                            except:
-                                # 如果转换失败，按字符串比较
-                                if str(excel_value) != str(existing_value):
-                                    has_changes = True
-                                    break
-                        else:
-                            # 文本字段直接比较
-                            if str(excel_value) != str(existing_value):
-                                has_changes = True
-                                break
-                    
-                    if has_changes:
-                        updated_records += 1
-                        actually_updated_keys.add(excel_key)
+            # 真正比较数据内容的变化（按主键对齐后逐列向量化比较）
+            new_records, changed_mask = find_changed_notes(excel_df, existing_df, unique_key)
+            updated_records = int(changed_mask.sum())
+            actually_updated_keys = set(format_publish_times(excel_df.loc[changed_mask, unique_key]).astype(str))
             
             # 合并数据：Excel数据优先（更新现有记录）
-            merged_df = pd.concat([existing_df, excel_df]).drop_duplicates(
-                subset=[unique_key], keep='last'
-            ).reset_index(drop=True)
+            keys = pd.concat([note_keys(existing_df[unique_key]), note_keys(excel_df[unique_key])],
+                             ignore_index=True)
+            merged_df = pd.concat([existing_df, excel_df], ignore_index=True)
+            merged_df = merged_df[~keys.duplicated(keep='last')].reset_index(drop=True)
             
             # 输出详细的变化信息
             if updated_records > 0:
@@ -291,29 +285,24 @@ def merge_data_with_history(excel_data, existing_csv_path, unique_key='首次发
                 for key in actually_updated_keys:
                     print(f"  - {key}")
     
+    # 两边的列类型可能不同（如计数超出 int32、分类取值不同），合并后重新统一
+    merged_df = apply_note_schema(merged_df)
     print(f"📊 合并后数据: {len(merged_df)} 条记录")
     print(f"📈 新增记录: {new_records} 条")
     print(f"🔄 真正更新记录: {updated_records} 条")
     
-    return merged_df.to_dict('records')
+    return merged_df
 
 def get_feishu_tables(access_token):
     """获取飞书多维表格中的所有数据表"""
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    
     try:
         print("📋 正在获取现有表格列表...")
-        response = requests.get(url, headers=headers)
-        result = response.json()
-        
-        if result.get('code') == 0:
-            tables = result.get('data', {}).get('items', [])
-            print(f"📊 找到 {len(tables)} 个现有表格")
-            return tables
-        else:
-            print(f"❌ 获取表格列表失败: {result.get('msg')}")
-            return []
+        tables = get_client().list_tables(access_token)
+        print(f"📊 找到 {len(tables)} 个现有表格")
+        return tables
+    except FeishuAPIError as e:
+        print(f"❌ 获取表格列表失败: {e}")
+        return []
     except Exception as e:
         print(f"❌ 获取表格列表异常: {e}")
         return []
@@ -332,8 +321,8 @@ def find_target_table(access_token, target_name="小红书"):
     return None
 
 def save_data_to_csv(data_list, csv_path):
-    """保存数据到CSV文件"""
-    if not data_list:
+    """保存数据（DataFrame 或字典列表）到CSV文件"""
+    if data_list is None or len(data_list) == 0:
         print("❌ 没有数据可保存到CSV")
         return None
     
@@ -341,8 +330,9 @@ def save_data_to_csv(data_list, csv_path):
         # 确保目录存在
         os.makedirs(os.path.dirname(csv_path), exist_ok=True)
         
-        df = pd.DataFrame(data_list)
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        df = data_list if isinstance(data_list, pd.DataFrame) else pd.DataFrame(data_list)
+        # 发布时间写回中文格式，CSV文件格式不变
+        to_csv_frame(df).to_csv(csv_path, index=False, encoding='utf-8-sig')
         print(f"💾 数据已保存到本地CSV文件: {csv_path}")
         return csv_path
     except Exception as e:
@@ -350,39 +340,26 @@ def save_data_to_csv(data_list, csv_path):
         return None
 
 def find_latest_excel_file(excel_dir, max_age_hours=24):
-    """查找最新的Excel文件，并检查文件时间"""
+    """查找最新的有效Excel文件，并检查文件时间（读取导出目录的索引，见 export_catalog）"""
     if not os.path.exists(excel_dir):
         logging.error(f"❌ Excel目录不存在: {excel_dir}")
         return None
     
-    excel_files = []
-    current_time = time.time()
-    
-    for f in os.listdir(excel_dir):
-        if f.endswith('.xlsx') or f.endswith('.xls'):
-            file_path = os.path.join(excel_dir, f)
-            file_mtime = os.path.getmtime(file_path)
-            
-            # 检查文件是否在指定时间内创建
-            age_hours = (current_time - file_mtime) / 3600
-            
-            if age_hours <= max_age_hours:
-                excel_files.append((file_path, file_mtime, age_hours))
-                logging.info(f"✅ 找到有效文件: {f} (创建于 {age_hours:.1f} 小时前)")
-            else:
-                logging.warning(f"⚠️ 文件过旧，跳过: {f} (创建于 {age_hours:.1f} 小时前)")
-    
-    if not excel_files:
-        logging.error(f"❌ 在 {excel_dir} 目录中未找到{max_age_hours}小时内的Excel文件")
+    latest = ExportCatalog(excel_dir, EXPORT_INDEX_PATH, EXCEL_CACHE_DIR).latest(max_age_hours)
+    if not latest:
+        logging.error(f"❌ 在 {excel_dir} 目录中未找到{max_age_hours}小时内的有效Excel文件")
         return None
     
-    # 按修改时间排序，返回最新的文件
-    excel_files.sort(key=lambda x: x[1], reverse=True)
-    latest_file = excel_files[0][0]
-    latest_age = excel_files[0][2]
-    
-    logging.info(f"📁 选择最新Excel文件: {os.path.basename(latest_file)} (创建于 {latest_age:.1f} 小时前)")
-    return latest_file
+    latest_age = (time.time() - latest['mtime']) / 3600
+    logging.info(f"📁 选择最新Excel文件: {latest['name']} (创建于 {latest_age:.1f} 小时前，{latest['rows']} 行数据)")
+    return latest['path']
+
+def find_recent_export(excel_dir, max_age_minutes):
+    """查找 max_age_minutes 分钟内导出的有效Excel文件，没有时返回 None"""
+    if not max_age_minutes or not os.path.exists(excel_dir):
+        return None
+    latest = ExportCatalog(excel_dir, EXPORT_INDEX_PATH, EXCEL_CACHE_DIR).latest(max_age_minutes / 60)
+    return latest['path'] if latest else None
 
 async def run_redbook_data_export():
     """运行redbook_data.py导出最新数据"""
@@ -440,29 +417,40 @@ def main():
     logging.info("🔍 开始处理小红书数据...")
     logging.info(f"📝 日志文件: {log_path}")
     
+    # 阶段缓存：导出文件、合并结果、已同步的数据没有变化时跳过对应阶段
+    force = '--force' in sys.argv[1:]
+    stages = StageCache(STAGE_CACHE_PATH) if STAGE_CACHE_PATH else None
+    if stages and force:
+        logging.info("⏩ 使用 --force，忽略阶段缓存完整运行")
+        stages.stages = {}
+    
     try:
         # 首先运行数据导出脚本
         logging.info("\n📥 ===== 第一步：导出最新数据 =====")
         export_success = False
         export_error = None
         
-        try:
-            # 运行异步函数
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            export_success = loop.run_until_complete(run_redbook_data_export())
-            loop.close()
-            
-            if not export_success:
-                logging.warning("⚠️ 数据导出失败，但继续处理现有数据...")
-                export_error = "数据导出返回失败状态"
-            else:
-                logging.info("✅ 数据导出完成！")
-                time.sleep(2)
-        except Exception as e:
-            logging.error(f"❌ 数据导出过程出错: {e}")
-            logging.warning("⚠️ 继续处理现有数据...")
-            export_error = str(e)
+        recent_export = None if force else find_recent_export(EXCEL_DIR, EXPORT_REUSE_MINUTES)
+        if recent_export:
+            logging.info(f"⏩ {EXPORT_REUSE_MINUTES} 分钟内已有导出文件，跳过导出: {os.path.basename(recent_export)}")
+        else:
+            try:
+                # 运行异步函数
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                export_success = loop.run_until_complete(run_redbook_data_export())
+                loop.close()
+                
+                if not export_success:
+                    logging.warning("⚠️ 数据导出失败，但继续处理现有数据...")
+                    export_error = "数据导出返回失败状态"
+                else:
+                    logging.info("✅ 数据导出完成！")
+                    time.sleep(2)
+            except Exception as e:
+                logging.error(f"❌ 数据导出过程出错: {e}")
+                logging.warning("⚠️ 继续处理现有数据...")
+                export_error = str(e)
         
         logging.info("\n📊 ===== 第二步：处理和上传数据 =====")
         
@@ -477,41 +465,96 @@ def main():
                 print("STATUS:NO_RECENT_EXCEL_FILE")
                 sys.exit(10)  # 无最近的Excel文件
         
-        # 读取Excel数据
-        excel_data, columns = read_excel_data(excel_file)
-        
-        if not excel_data:
-            logging.error("❌ 未读取到任何数据")
-            if export_error:
-                print(f"STATUS:DATA_EXPORT_FAILED_AND_NO_DATA:{export_error}")
-                sys.exit(8)  # 数据导出失败且无数据
+        export_hash = file_sha256(excel_file)
+        csv_hash = file_sha256(DATA_CSV_PATH) if os.path.exists(DATA_CSV_PATH) else None
+        csv_unchanged = bool(stages) and stages.matches('csv', csv_hash)
+        
+        if stages and csv_unchanged and stages.matches('export', export_hash):
+            # 导出文件与上次相同，本地CSV也没有被修改：上次合并的结果就是本次的结果
+            logging.info("⏩ 导出文件与上次相同，跳过读取和合并，使用本地CSV数据")
+            merged_data = read_notes_csv(DATA_CSV_PATH)
+            columns = stages.get('export').get('columns') or list(merged_data.columns)
+            merged_entry = stages.get('merged')
+            merged_hash = merged_entry['hash'] if merged_entry else None
+            csv_path = DATA_CSV_PATH
+        else:
+            # 读取Excel数据
+            excel_data, columns = read_excel_data(excel_file)
+            
+            if excel_data.empty:
+                logging.error("❌ 未读取到任何数据")
+                if export_error:
+                    print(f"STATUS:DATA_EXPORT_FAILED_AND_NO_DATA:{export_error}")
+                    sys.exit(8)  # 数据导出失败且无数据
+                else:
+                    print("STATUS:NO_DATA")
+                    sys.exit(4)
+            
+            # 与历史数据合并
+            logging.info("\n🔄 开始合并历史数据...")
+            merged_data = merge_data_with_history(excel_data, DATA_CSV_PATH)
+            merged_hash = frame_fingerprint(merged_data)
+            
+            # 记录本次导出各笔记的计数快照（只追加有变化的笔记）；失败时不记录导出阶段，下次运行重试
+            snapshot_saved = True
+            if NOTE_SNAPSHOT_DIR:
+                try:
+                    export_date = datetime.fromtimestamp(os.path.getmtime(excel_file))
+                    snapshots = NoteSnapshotStore(NOTE_SNAPSHOT_DIR).record(excel_data, export_date)
+                    logging.info(f"📸 已记录 {snapshots} 条笔记计数快照")
+                except Exception as e:
+                    snapshot_saved = False
+                    logging.warning(f"⚠️ 记录笔记计数快照失败: {e}")
+            
+            if stages and csv_unchanged and stages.matches('merged', merged_hash):
+                # 合并结果与上次相同（导出文件只是重新生成），不必重写CSV和归档
+                logging.info("⏩ 合并后的数据没有变化，跳过保存CSV和归档")
+                csv_path = DATA_CSV_PATH
             else:
-                print("STATUS:NO_DATA")
-                sys.exit(4)
-        
-        # 与历史数据合并
-        logging.info("\n🔄 开始合并历史数据...")
-        merged_data = merge_data_with_history(excel_data, DATA_CSV_PATH)
-        
-        # 保存合并后的数据到CSV文件
-        csv_path = save_data_to_csv(merged_data, DATA_CSV_PATH)
-        if not csv_path:
-            logging.error("❌ 保存CSV文件失败")
-            print("STATUS:CSV_SAVE_FAILED")
-            sys.exit(5)
-        
-        logging.info(f"\n🚀 开始增量更新飞书多维表格...")
-        
-        # 获取飞书访问令牌
-        access_token = get_feishu_access_token()
-        if not access_token:
-            logging.error("❌ 无法获取飞书访问令牌，跳过飞书更新")
-            print("STATUS:FEISHU_TOKEN_FAILED")
-            sys.exit(6)
+                # 保存合并后的数据到CSV文件
+                csv_path = save_data_to_csv(merged_data, DATA_CSV_PATH)
+                if not csv_path:
+                    logging.error("❌ 保存CSV文件失败")
+                    print("STATUS:CSV_SAVE_FAILED")
+                    sys.exit(5)
+                
+                # 同步写入 Parquet 归档（可选，失败不影响后续流程）
+                if PARQUET_ARCHIVE_DIR and PARQUET_AVAILABLE:
+                    try:
+                        archived = archive_redbook_notes(merged_data, PARQUET_ARCHIVE_DIR)
+                        logging.info(f"🗃️ 已归档 {archived} 条笔记数据到 {PARQUET_ARCHIVE_DIR}")
+                    except Exception as e:
+                        logging.warning(f"⚠️ Parquet 归档失败: {e}")
+                
+                if stages:
+                    stages.record('merged', merged_hash)
+                    stages.record('csv', file_sha256(csv_path))
+            
+            if stages and snapshot_saved:
+                stages.record('export', export_hash, columns=columns)
         
-        # 使用固定的表格ID进行增量更新
-        logging.info(f"📋 使用固定表格ID: {FEISHU_TABLE_ID}")
-        success = incremental_update_feishu_table(merged_data, access_token, FEISHU_TABLE_ID, columns)
+        if stages and stages.matches('synced', merged_hash, max_age_hours=FEISHU_RESYNC_HOURS):
+            # 数据与上次成功同步的完全相同，不必读取和比较飞书表格
+            logging.info("⏩ 数据与上次成功同步的相同，跳过飞书更新")
+            success = True
+        else:
+            logging.info(f"\n🚀 开始增量更新飞书多维表格...")
+            
+            # 获取飞书访问令牌
+            access_token = get_feishu_access_token()
+            if not access_token:
+                logging.error("❌ 无法获取飞书访问令牌，跳过飞书更新")
+                print("STATUS:FEISHU_TOKEN_FAILED")
+                sys.exit(6)
+            
+            # 使用固定的表格ID进行增量更新
+            logging.info(f"📋 使用固定表格ID: {FEISHU_TABLE_ID}")
+            success = incremental_update_feishu_table(merged_data, access_token, FEISHU_TABLE_ID, columns)
+            if stages:
+                if success and merged_hash:
+                    stages.record('synced', merged_hash)
+                else:
+                    stages.invalidate('synced')
         
         if success:
             logging.info(f"\n🎉 数据已成功增量更新到飞书数据表")
@@ -553,56 +596,37 @@ def main():
         print(f"STATUS:EXCEPTION:{str(e)[:200]}")
         sys.exit(2)  # 异常退出
 
-def get_existing_records(access_token, table_id):
-    """获取表格中的现有记录"""
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables/{table_id}/records"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    
-    all_records = []
-    page_token = None
-    
+def record_time_key(fields):
+    """从飞书记录字段计算主键（首次发布时间的中国时间字符串），没有发布时间时返回 None"""
+    return feishu_time_key(fields.get('首次发布时间', ''))
+
+def get_existing_records(access_token, table_id, mirror=None, revision=None):
+    """获取表格中的现有记录（全量分页读取）；传入 mirror 时同时重建本地镜像"""
     try:
-        while True:
-            params = {'page_size': 500}
-            if page_token:
-                params['page_token'] = page_token
-            
-            response = requests.get(url, headers=headers, params=params)
-            result = response.json()
-            
-            if result.get('code') != 0:
-                print(f"❌ 获取记录失败: {result.get('msg')}")
-                return {}
-            
-            records = result.get('data', {}).get('items', [])
-            all_records.extend(records)
-            
-            # 检查是否还有更多页
-            page_token = result.get('data', {}).get('page_token')
-            if not page_token:
-                break
+        try:
+            all_records = get_client().list_records(access_token, table_id, page_size=500)
+        except FeishuAPIError as e:
+            print(f"❌ 获取记录失败: {e}")
+            return {}
         
         print(f"📊 获取到 {len(all_records)} 条现有记录")
         
+        if mirror is not None:
+            changed = mirror.replace_all(all_records, revision)
+            mirror.save()
+            print(f"🪞 已重建本地表格镜像（与上次镜像相比 {changed} 条记录有变化）")
+            # 镜像中的记录带内容哈希，比较时哈希相同的行跳过逐列比较
+            return mirror.as_existing_records()
+        
         # 构建以发布时间为key的字典，方便查找
+        # 发布时间（UTC 毫秒时间戳）整列转换为主键
+        time_keys = feishu_time_keys([record.get('fields', {}).get('首次发布时间', '') for record in all_records])
         records_dict = {}
-        for record in all_records:
-            fields = record.get('fields', {})
-            publish_time = fields.get('首次发布时间', '')
-            if publish_time:
-                # 将时间戳转换为字符串用于匹配
-                if isinstance(publish_time, (int, float)):
-                    # 飞书存储的是UTC时间戳（毫秒），转换为中国时间字符串
-                    import datetime
-                    utc_time = datetime.datetime.fromtimestamp(publish_time / 1000, tz=datetime.timezone.utc)
-                    china_time = utc_time + datetime.timedelta(hours=8)
-                    time_str = china_time.strftime('%Y年%m月%d日%H时%M分%S秒')
-                else:
-                    time_str = str(publish_time)
-                
+        for record, time_str in zip(all_records, time_keys):
+            if time_str:
                 records_dict[time_str] = {
                     'record_id': record['record_id'],
-                    'fields': fields
+                    'fields': record.get('fields', {})
                 }
         
         return records_dict
@@ -611,113 +635,36 @@ def get_existing_records(access_token, table_id):
         print(f"❌ 获取现有记录异常: {e}")
         return {}
 
+def get_table_revision(access_token, table_id):
+    """查询数据表当前的 revision（表格被修改后会变化），失败时返回 None"""
+    try:
+        for table in get_client().list_tables(access_token):
+            if table.get('table_id') == table_id:
+                return table.get('revision')
+    except Exception as e:
+        print(f"⚠️ 查询数据表版本失败: {e}")
+    return None
+
+def load_existing_records(access_token, table_id, mirror):
+    """优先使用本地镜像获取现有记录；数据表被修改过或到了全量校准时间时全量读取"""
+    revision = get_table_revision(access_token, table_id)
+    if mirror.is_usable(revision, FEISHU_MIRROR_MAX_AGE_HOURS):
+        print(f"🪞 数据表未变化 (revision {revision})，使用本地镜像中的 {len(mirror.records)} 条记录")
+        return mirror.as_existing_records()
+    
+    print("📥 本地镜像不可用或已过期，全量读取数据表...")
+    return get_existing_records(access_token, table_id, mirror=mirror, revision=revision)
+
+def feishu_content_hash(fields, columns):
+    """按飞书写入规则计算一行数据的内容哈希（不含隐藏的哈希列本身）"""
+    exclude = [FEISHU_CONTENT_HASH_FIELD] if FEISHU_CONTENT_HASH_FIELD else []
+    return note_content_hash(fields, columns, exclude=exclude)
+
 def compare_and_prepare_updates(new_data, existing_records, columns):
-    """比较新旧数据，准备更新、新增和删除的记录"""
-    updates = []  # 需要更新的记录
-    creates = []  # 需要新增的记录
-    
+    """比较新旧数据，准备更新和新增的记录（按列向量化比较，见 note_diff）"""
     print("🔍 开始比较数据变化...")
     
-    for item in new_data:
-        publish_time = item.get('首次发布时间', '')
-        if not publish_time:
-            continue
-        
-        # 标准化时间格式用于匹配
-        if isinstance(publish_time, str) and ('年' in publish_time):
-            time_key = publish_time
-        else:
-            # 如果是其他格式，尝试转换
-            try:
-                if isinstance(publish_time, str):
-                    time_obj = pd.to_datetime(publish_time)
-                else:
-                    time_obj = pd.to_datetime(publish_time)
-                time_key = time_obj.strftime('%Y年%m月%d日%H时%M分%S秒')
-            except:
-                time_key = str(publish_time)
-        
-        if time_key in existing_records:
-            # 记录存在，检查是否需要更新
-            existing_record = existing_records[time_key]
-            existing_fields = existing_record['fields']
-            record_id = existing_record['record_id']
-            
-            # 比较各字段是否有变化
-            has_changes = False
-            updated_fields = {}
-            
-            for col in columns:
-                new_value = item.get(col, '')
-                
-                # 处理不同类型的字段
-                if col == '首次发布时间':
-                    # 时间字段不需要更新（作为主键）
-                    continue
-                elif col in ['笔记标题', '体裁']:
-                    # 文本字段
-                    new_str = str(new_value)[:1000] if pd.notna(new_value) else ''
-                    existing_str = str(existing_fields.get(col, ''))
-                    if new_str != existing_str:
-                        updated_fields[col] = new_str
-                        has_changes = True
-                else:
-                    # 数字字段
-                    try:
-                        new_num = int(float(new_value)) if pd.notna(new_value) and new_value != '' else 0
-                    except:
-                        new_num = 0
-                    
-                    existing_num = existing_fields.get(col, 0)
-                    if isinstance(existing_num, str):
-                        try:
-                            existing_num = int(float(existing_num))
-                        except:
-                            existing_num = 0
-                    
-                    if new_num != existing_num:
-                        updated_fields[col] = new_num
-                        has_changes = True
-            
-            if has_changes:
-                updates.append({
-                    'record_id': record_id,
-                    'fields': updated_fields
-                })
-        else:
-            # 新记录，需要创建
-            fields = {}
-            for col in columns:
-                value = item.get(col, '')
-                
-                # 处理时间字段
-                if col == '首次发布时间':
-                    if pd.notna(value) and value != '':
-                        try:
-                            if isinstance(value, str) and '年' in value:
-                                time_str = value.replace('年', '-').replace('月', '-').replace('日', ' ')
-                                time_str = time_str.replace('时', ':').replace('分', ':').replace('秒', '')
-                                time_obj = pd.to_datetime(time_str)
-                                time_obj_utc = time_obj - pd.Timedelta(hours=8)
-                                fields[col] = int(time_obj_utc.timestamp() * 1000)
-                            else:
-                                time_obj = pd.to_datetime(value)
-                                time_obj_utc = time_obj - pd.Timedelta(hours=8)
-                                fields[col] = int(time_obj_utc.timestamp() * 1000)
-                        except Exception as e:
-                            print(f"⚠️ 时间字段转换失败: {e}")
-                            fields[col] = str(value)
-                    else:
-                        fields[col] = ''
-                elif col in ['笔记标题', '体裁']:
-                    fields[col] = str(value)[:1000] if pd.notna(value) else ''
-                else:
-                    try:
-                        fields[col] = int(float(value)) if pd.notna(value) and value != '' else 0
-                    except:
-                        fields[col] = 0
-            
-            creates.append({'fields': fields})
+    updates, creates = diff_notes(new_data, existing_records, columns, hash_field=FEISHU_CONTENT_HASH_FIELD)
     
     print(f"📊 数据比较完成:")
     print(f"🔄 需要更新: {len(updates)} 条记录")
@@ -725,112 +672,81 @@ def compare_and_prepare_updates(new_data, existing_records, columns):
     
     return updates, creates
 
-def batch_update_records(access_token, table_id, updates):
-    """批量更新记录"""
+def batch_update_records(access_token, table_id, updates, mirror=None):
+    """批量更新记录（传入 mirror 时用成功的批次更新本地镜像）"""
     if not updates:
         print("📄 没有需要更新的记录")
         return True
     
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables/{table_id}/records/batch_update"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    
-    # 分批处理
-    batch_size = 500
-    success_count = 0
-    
-    for i in range(0, len(updates), batch_size):
-        batch_updates = updates[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (len(updates) + batch_size - 1) // batch_size
-        
-        print(f"🔄 正在更新第 {batch_num}/{total_batches} 批数据 ({len(batch_updates)} 条记录)...")
-        
-        try:
-            response = requests.post(url, json={"records": batch_updates}, headers=headers)
-            result = response.json()
-            
-            if result.get('code') == 0:
-                success_count += len(batch_updates)
-                print(f"✅ 第 {batch_num} 批更新成功！")
-            else:
-                print(f"❌ 第 {batch_num} 批更新失败: {result.get('msg')}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 第 {batch_num} 批更新异常: {e}")
-            return False
-        
-        # 添加延迟避免频率限制
-        if batch_num < total_batches:
-            time.sleep(0.2)
+    # 分批（每批最多500条）并发发送
+    success, results = upload_records('update', access_token, table_id, updates, "更新")
+    if mirror is not None:
+        for result in results:
+            if result.ok:
+                mirror.apply_updated(result.records)
+    if not success:
+        return False
     
+    success_count = sum(len(result.records) for result in results)
     print(f"✅ 批量更新完成，成功更新 {success_count} 条记录")
     return True
 
-def batch_create_records(access_token, table_id, creates):
-    """批量创建记录"""
+def batch_create_records(access_token, table_id, creates, mirror=None):
+    """批量创建记录（传入 mirror 时把新建的记录加入本地镜像）"""
     if not creates:
         print("📄 没有需要新增的记录")
         return True
     
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{FEISHU_APP_TOKEN}/tables/{table_id}/records/batch_create"
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    
-    # 分批处理
-    batch_size = 500
-    success_count = 0
-    
-    for i in range(0, len(creates), batch_size):
-        batch_creates = creates[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (len(creates) + batch_size - 1) // batch_size
-        
-        print(f"📝 正在新增第 {batch_num}/{total_batches} 批数据 ({len(batch_creates)} 条记录)...")
-        
-        try:
-            response = requests.post(url, json={"records": batch_creates}, headers=headers)
-            result = response.json()
-            
-            if result.get('code') == 0:
-                success_count += len(batch_creates)
-                print(f"✅ 第 {batch_num} 批新增成功！")
-            else:
-                print(f"❌ 第 {batch_num} 批新增失败: {result.get('msg')}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ 第 {batch_num} 批新增异常: {e}")
-            return False
-        
-        # 添加延迟避免频率限制
-        if batch_num < total_batches:
-            time.sleep(0.2)
+    # 分批（每批最多500条）并发发送
+    success, results = upload_records('create', access_token, table_id, creates, "新增")
+    if mirror is not None:
+        for result in results:
+            if result.ok:
+                mirror.apply_created(result.response_records)
+    if not success:
+        return False
     
+    success_count = sum(len(result.records) for result in results)
     print(f"✅ 批量新增完成，成功新增 {success_count} 条记录")
     return True
 
 def incremental_update_feishu_table(data_list, access_token, table_id, columns):
-    """增量更新飞书数据表（只更新变化的数据）"""
-    if not data_list or not access_token or not table_id:
+    """增量更新飞书数据表（只更新变化的数据），data_list 为 DataFrame 或字典列表"""
+    if data_list is None or len(data_list) == 0 or not access_token or not table_id:
         print("❌ 数据为空或参数无效，跳过飞书更新")
         return False
     
     print(f"🔄 开始增量更新飞书表格 (ID: {table_id})...")
     
-    # 第一步：获取现有记录
-    existing_records = get_existing_records(access_token, table_id)
+    # 第一步：获取现有记录（优先使用本地镜像）
+    mirror = None
+    if FEISHU_MIRROR_PATH:
+        # 镜像中保存按飞书写入规则计算的内容哈希，比较时一行只需比较一次哈希
+        mirror = TableMirror(table_id, record_time_key, FEISHU_MIRROR_PATH,
+                             hash_func=lambda fields: feishu_content_hash(fields, columns))
+    if mirror is not None:
+        existing_records = load_existing_records(access_token, table_id, mirror)
+    else:
+        existing_records = get_existing_records(access_token, table_id)
     
     # 第二步：比较数据，准备更新和新增列表
     updates, creates = compare_and_prepare_updates(data_list, existing_records, columns)
     
     # 第三步：执行更新
-    update_success = batch_update_records(access_token, table_id, updates)
-    if not update_success:
-        return False
+    update_success = batch_update_records(access_token, table_id, updates, mirror)
     
     # 第四步：执行新增
-    create_success = batch_create_records(access_token, table_id, creates)
-    if not create_success:
+    create_success = update_success and batch_create_records(access_token, table_id, creates, mirror)
+    
+    if mirror is not None:
+        # 写入接口不返回数据表的 revision，写入后再查询会把期间其他人的修改也当作已知版本，
+        # 因此本次有写入（或写入失败）时清除 revision，下次同步全量读取校准；
+        # 没有写入时保留读取前查询到的 revision，下次数据表未变化即可直接使用镜像
+        if updates or creates or not (update_success and create_success):
+            mirror.revision = None
+        mirror.save()
+    
+    if not update_success or not create_success:
         return False
     
     print(f"🎉 增量更新完成！更新了 {len(updates)} 条记录，新增了 {len(creates)} 条记录")
@@ -13,6 +13,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
+from export_catalog import ExportCatalog
+
 try:
     from playwright.async_api import async_playwright, BrowserContext, Page
 except ImportError:
@@ -442,6 +444,13 @@ class RedbookDataExporter:
             download_file.rename(new_file_path)
             print(f"✅ 文件已保存到: {new_file_path}")
             
+            # 记录到导出索引，并删除数据相同的旧导出和过期导出（失败不影响本次导出）
+            try:
+                entry = ExportCatalog(str(self.download_dir)).add(str(new_file_path))
+                print(f"📇 已记录到导出索引: {entry['rows']} 行数据")
+            except Exception as e:
+                print(f"⚠️ 更新导出索引失败: {e}")
+            
             return True
             
         except Exception as e:
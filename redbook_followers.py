@@ -1,10 +1,10 @@
-import time
 import os
 import json
 import csv
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from xhs import XhsClient
+from rate_limiter import get_rate_limiter
 
 class RedBookClient:
     def __init__(self, cookies_file='redbook_cookie.json'):
@@ -142,10 +142,11 @@ class RedBookClient:
             return None
 
 # 导出函数：获取小红书数据
-def get_redbook_data(user_ids):
+def get_redbook_data(user_ids, on_result=None):
     """
     获取小红书用户数据
     :param user_ids: 用户ID列表
+    :param on_result: 可选回调 on_result(用户ID, 数据或None)，每个用户处理完立即调用
     :return: 数据列表
     """
     print("📖 开始获取小红书数据...")
@@ -156,23 +157,28 @@ def get_redbook_data(user_ids):
     
     data_list = []
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    limiter = get_rate_limiter('redbook')
     
     for user_id in user_ids:
+        limiter.acquire_sync()  # 按平台限速，避免请求过快
         print(f"  处理用户ID: {user_id}")
         user_data = client.get_user_info_by_id(user_id)
         
+        record = None
         if user_data:
-            data_list.append({
+            record = {
                 '日期': current_date,
                 '账号名': user_data['name'],
                 '平台': '小红书',
                 '粉丝数': user_data['followers']
-            })
+            }
+            data_list.append(record)
             print(f"  ✅ {user_data['name']}: {user_data['followers']:,} 粉丝")
         else:
             print(f"  ❌ 获取用户 {user_id} 失败")
         
-        time.sleep(5)  # 避免请求过快
+        if on_result:
+            on_result(user_id, record)
     
     return data_list
 
@@ -0,0 +1,102 @@
+"""
+小红书导出 Excel 的读取与缓存
+
+pd.read_excel 经 openpyxl 解析较慢。每个导出文件按内容哈希（sha256）缓存解析后的 DataFrame，
+同一个下载文件不会解析两次：安装了 pyarrow 时保存为 Parquet（带列类型的列式文件），
+否则（或数据无法按列类型保存时）保存为 pickle。
+
+缓存目录: data/cache/excel/<sha256>.parquet 或 <sha256>.pkl，只保留最近使用的 MAX_CACHED_EXPORTS 个
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from parquet_archive import PARQUET_AVAILABLE
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'cache', 'excel')
+MAX_CACHED_EXPORTS = 30
+CACHE_EXTENSIONS = ('.parquet', '.pkl')
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_export(path: str) -> pd.DataFrame:
+    """解析导出的 Excel（第一行是说明，第二行是表头），删除所有列都为空的行"""
+    df = pd.read_excel(path, header=1)
+    return df.dropna(how='all').reset_index(drop=True)
+
+
+def _read_cached(cache_dir: str, digest: str) -> Optional[pd.DataFrame]:
+    for ext in CACHE_EXTENSIONS:
+        path = os.path.join(cache_dir, digest + ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            df = pd.read_parquet(path) if ext == '.parquet' else pd.read_pickle(path)
+        except Exception as e:
+            print(f"⚠️ 读取Excel解析缓存失败，将重新解析: {e}")
+            return None
+        os.utime(path)  # 记录最近使用时间，清理时保留常用的缓存
+        return df
+    return None
+
+
+def _write_cached(df: pd.DataFrame, cache_dir: str, digest: str):
+    os.makedirs(cache_dir, exist_ok=True)
+    if PARQUET_AVAILABLE:
+        path = os.path.join(cache_dir, digest + '.parquet')
+        try:
+            df.to_parquet(path + '.tmp', index=False)
+            os.replace(path + '.tmp', path)
+            return
+        except Exception:
+            # 同一列混有数字和文本等情况无法按列类型保存，改用 pickle
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+    path = os.path.join(cache_dir, digest + '.pkl')
+    df.to_pickle(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def _prune_cache(cache_dir: str, keep: int = MAX_CACHED_EXPORTS):
+    """只保留最近使用的 keep 个缓存文件"""
+    files = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(CACHE_EXTENSIONS)]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def load_export(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Tuple[pd.DataFrame, str]:
+    """
+    读取导出的 Excel，优先使用解析缓存
+    :param cache_dir: 缓存目录，None 表示不使用缓存
+    :return: (DataFrame, 文件内容的 sha256)
+    """
+    digest = file_sha256(path)
+    if cache_dir:
+        df = _read_cached(cache_dir, digest)
+        if df is not None:
+            print(f"⚡ 使用Excel解析缓存 ({digest[:12]})")
+            return df, digest
+
+    df = parse_export(path)
+    if cache_dir:
+        try:
+            _write_cached(df, cache_dir, digest)
+            _prune_cache(cache_dir)
+        except Exception as e:
+            print(f"⚠️ 保存Excel解析缓存失败: {e}")
+    return df, digest
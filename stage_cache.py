@@ -0,0 +1,71 @@
+"""
+流水线各阶段的指纹缓存
+
+记录上次运行时各阶段的输入/输出指纹，输入没有变化的阶段直接跳过：
+- export: 导出 Excel 文件的内容哈希（以及表头列名）
+- merged: 与历史数据合并后的数据哈希
+- csv: 写出的本地 CSV 文件哈希（检测 CSV 是否在两次运行之间被修改）
+- synced: 最近一次成功同步到飞书的数据哈希
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+
+DEFAULT_STATE_PATH = os.path.join('data', 'redbook_stages.json')
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """DataFrame 内容的指纹（列名 + 每行内容的哈希，与索引无关）"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns], ensure_ascii=False).encode('utf-8'))
+    if len(df):
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """各阶段的指纹，保存在本地 JSON 文件中"""
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self.stages: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stages = json.load(f)
+            except (ValueError, OSError) as e:
+                print(f"⚠️ 读取阶段缓存失败，将完整运行: {e}")
+                self.stages = {}
+
+    def get(self, stage: str) -> Optional[Dict]:
+        """阶段记录 {'hash', 'at', ...}，没有记录时返回 None"""
+        return self.stages.get(stage)
+
+    def matches(self, stage: str, fingerprint: Optional[str], max_age_hours: Optional[float] = None) -> bool:
+        """阶段上次的指纹与 fingerprint 相同（且记录未超过 max_age_hours）"""
+        entry = self.stages.get(stage)
+        if not entry or not fingerprint or entry.get('hash') != fingerprint:
+            return False
+        if max_age_hours is not None and time.time() - entry.get('at', 0) > max_age_hours * 3600:
+            return False
+        return True
+
+    def record(self, stage: str, fingerprint: str, **extra):
+        """记录阶段完成时的指纹并立即保存"""
+        self.stages[stage] = {'hash': fingerprint, 'at': time.time(), **extra}
+        self.save()
+
+    def invalidate(self, stage: str):
+        if self.stages.pop(stage, None) is not None:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.stages, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
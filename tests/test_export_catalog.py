@@ -0,0 +1,88 @@
+"""export_catalog 的保留策略：删除旧导出时始终保留最新的 KEEP_LATEST 个"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from export_catalog import KEEP_LATEST, ExportCatalog
+
+DAY = 86400
+
+
+def _make_exports(export_dir, ages_in_days):
+    """按给定的天数生成导出文件（内容不是有效的 Excel，保留策略只看修改时间）"""
+    os.makedirs(export_dir, exist_ok=True)
+    now = time.time()
+    names = []
+    for i, age in enumerate(ages_in_days):
+        name = f'export_{i:02d}.xlsx'
+        path = os.path.join(export_dir, name)
+        with open(path, 'wb') as f:
+            f.write(f'export {i}'.encode())
+        os.utime(path, (now - age * DAY, now - age * DAY))
+        names.append(name)
+    return names
+
+
+def _catalog(tmp_path):
+    return ExportCatalog(str(tmp_path / 'exports'), str(tmp_path / 'exports.json'), cache_dir=None)
+
+
+def test_retention_keeps_latest_even_when_all_expired(tmp_path):
+    names = _make_exports(tmp_path / 'exports', [40 + i for i in range(8)])
+    catalog = _catalog(tmp_path)
+    catalog.refresh()
+
+    removed = catalog.apply_retention(keep_days=30, keep_latest=KEEP_LATEST)
+
+    assert sorted(removed) == names[KEEP_LATEST:]
+    assert sorted(os.listdir(tmp_path / 'exports')) == names[:KEEP_LATEST]
+    assert sorted(catalog.entries) == names[:KEEP_LATEST]
+
+
+def test_retention_only_removes_expired_beyond_latest(tmp_path):
+    names = _make_exports(tmp_path / 'exports', [1, 2, 3, 40, 41, 42, 43])
+    catalog = _catalog(tmp_path)
+    catalog.refresh()
+
+    removed = catalog.apply_retention(keep_days=30, keep_latest=KEEP_LATEST)
+
+    assert sorted(removed) == names[KEEP_LATEST:]
+    assert len(os.listdir(tmp_path / 'exports')) == KEEP_LATEST
+    # 保存后的索引重新打开时不会把已删除的文件当作目录外的变化
+    assert not _catalog(tmp_path).is_stale()
+
+
+def test_retention_disabled_and_fewer_than_latest(tmp_path):
+    _make_exports(tmp_path / 'exports', [100, 200, 300])
+    catalog = _catalog(tmp_path)
+    catalog.refresh()
+    assert catalog.apply_retention(keep_days=None) == []
+    assert catalog.apply_retention(keep_days=30, keep_latest=KEEP_LATEST) == []
+    assert len(os.listdir(tmp_path / 'exports')) == 3
+
+
+def test_add_removes_older_duplicate_and_keeps_latest(tmp_path):
+    pytest.importorskip('openpyxl')
+    export_dir = tmp_path / 'exports'
+    _make_exports(export_dir, [50 + i for i in range(6)])
+    data = pd.DataFrame({'笔记标题': ['a'], '首次发布时间': ['2025年07月20日00时00分00秒'], '观看量': [1]})
+
+    def write_export(name, age):
+        path = os.path.join(export_dir, name)
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame([['说明']]).to_excel(writer, index=False, header=False)
+            data.to_excel(writer, index=False, startrow=1)
+        os.utime(path, (time.time() - age * DAY,) * 2)
+        return path
+
+    catalog = _catalog(tmp_path)
+    catalog.add(write_export('old.xlsx', 2))
+    catalog.add(write_export('new.xlsx', 0))
+
+    remaining = sorted(os.listdir(export_dir))
+    assert 'new.xlsx' in remaining and 'old.xlsx' not in remaining   # 数据相同的旧导出被删除
+    assert len(remaining) == KEEP_LATEST
+    assert catalog.latest()['name'] == 'new.xlsx'
@@ -0,0 +1,49 @@
+"""follower_store 的日/周/月汇总：迟到样本改写已经结束的区间"""
+
+from follower_store import FollowerStore
+
+
+def _row(date, followers, account='枝因', platform='B站'):
+    return {'日期': date, '账号名': account, '平台': platform, '粉丝数': followers}
+
+
+def _rollups(store):
+    return {period: {row['区间']: row for row in store.rollups(period)} for period in ('day', 'week', 'month')}
+
+
+def test_late_sample_rewrites_closed_day_week_and_month(tmp_path):
+    with FollowerStore(str(tmp_path / 'followers.db')) as store:
+        store.insert_rows([_row('2025-06-28 10:00:00', 100),    # 周六，2025-W26
+                           _row('2025-07-01 10:00:00', 200),
+                           _row('2025-07-02 10:00:00', 210)])
+        before = _rollups(store)
+        assert before['month']['2025-07']['净变化'] == 110
+        assert before['month']['2025-06']['最新值'] == 100
+
+        # 迟到的样本：6 月最后一天（周一，属于 2025-W27），此时 6 月、6 月 30 日都已结束
+        assert store.insert_rows([_row('2025-06-30 22:00:00', 150)]) == 1
+        after = _rollups(store)
+
+        assert after['day']['2025-06-30']['净变化'] == 50
+        assert after['day']['2025-07-01']['净变化'] == 50          # 开盘值修正为迟到样本
+        assert after['month']['2025-06']['最新值'] == 150
+        assert after['month']['2025-06']['净变化'] == 50
+        assert after['month']['2025-07']['净变化'] == 60
+        assert after['week']['2025-W27']['净变化'] == 110         # 周内最早的样本变为迟到样本，开盘值仍是上周的 100
+        assert after['week']['2025-W27']['样本数'] == 3
+        assert after['week']['2025-W26']['净变化'] == 0
+
+        # 增量维护的结果与从原始样本重建的结果一致
+        store.rebuild_rollups()
+        assert _rollups(store) == after
+
+
+def test_late_sample_before_first_sample_sets_open_value(tmp_path):
+    with FollowerStore(str(tmp_path / 'followers.db')) as store:
+        store.insert_rows([_row('2025-08-01 09:00:00', 500)])
+        store.insert_rows([_row('2025-07-31 09:00:00', 480)])
+        rollups = _rollups(store)
+        assert rollups['month']['2025-08']['净变化'] == 20
+        assert rollups['month']['2025-07']['净变化'] == 0
+        store.rebuild_rollups()
+        assert _rollups(store) == rollups
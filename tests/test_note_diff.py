@@ -0,0 +1,101 @@
+"""note_diff.diff_notes：按列比较生成的更新/新增记录"""
+
+import pandas as pd
+
+from note_diff import diff_notes
+from note_hash import note_content_hash
+
+COLUMNS = ['首次发布时间', '笔记标题', '体裁', '观看量', '点赞']
+T1, T2, T3 = '2025年07月20日17时37分34秒', '2025年07月21日08时00分00秒', '2025年07月22日23时59分59秒'
+MS1 = 1753004254000
+
+
+def existing(**records):
+    """主键 -> 飞书记录（字段中省略的列视为飞书不返回的空字段）"""
+    return {key: {'record_id': record_id, 'fields': fields} for key, (record_id, fields) in records.items()}
+
+
+def with_hashes(records):
+    """模拟本地镜像：为每条记录加上按写入规则计算的内容哈希"""
+    return {key: {**record, 'hash': note_content_hash(record['fields'], COLUMNS)}
+            for key, record in records.items()}
+
+
+def new_rows():
+    return pd.DataFrame({
+        '首次发布时间': [T1, T2, T3, None],
+        '笔记标题': ['标题一', '标题二', '标题三', '没有发布时间'],
+        '体裁': ['图文', '视频', '图文', '图文'],
+        '观看量': [120.7, 300, 5, 1],
+        '点赞': [3, 10, None, 1],
+    })
+
+
+def current_records():
+    return existing(**{
+        T1: ('rec1', {'首次发布时间': MS1, '笔记标题': '标题一', '体裁': '图文', '观看量': 120, '点赞': 3}),
+        T2: ('rec2', {'首次发布时间': MS1, '笔记标题': '标题二', '体裁': '视频', '观看量': 250, '点赞': '10'}),
+    })
+
+
+def test_updates_only_changed_fields_and_creates_missing_rows():
+    updates, creates = diff_notes(new_rows(), current_records(), COLUMNS)
+
+    # 120.7 取整后与 120 相同，'10' 与 10 相同，只有观看量 250 -> 300 变化
+    assert updates == [{'record_id': 'rec2', 'fields': {'观看量': 300}}]
+    # 没有发布时间的行既不更新也不新增
+    assert len(creates) == 1
+    fields = creates[0]['fields']
+    assert fields['笔记标题'] == '标题三' and fields['观看量'] == 5 and fields['点赞'] == 0
+    assert isinstance(fields['首次发布时间'], int)
+
+
+def test_omitted_existing_fields_equal_blank_new_values():
+    records = existing(**{T1: ('rec1', {'首次发布时间': MS1, '笔记标题': '标题一'})})
+    new = [{'首次发布时间': T1, '笔记标题': '标题一', '体裁': '', '观看量': 0, '点赞': None}]
+    assert diff_notes(new, records, COLUMNS) == ([], [])
+
+
+def test_unconvertible_existing_number_is_updated():
+    records = existing(**{T1: ('rec1', {'笔记标题': '标题一', '体裁': '图文', '观看量': None, '点赞': 3})})
+    new = [{'首次发布时间': T1, '笔记标题': '标题一', '体裁': '图文', '观看量': 0, '点赞': 3}]
+    updates, _ = diff_notes(new, records, COLUMNS)
+    assert updates == [{'record_id': 'rec1', 'fields': {'观看量': 0}}]
+
+
+def test_multiple_changed_columns_merge_into_one_update_in_new_data_order():
+    records = existing(**{
+        T1: ('rec1', {'笔记标题': '旧标题', '体裁': '图文', '观看量': 1, '点赞': 3}),
+        T2: ('rec2', {'笔记标题': '标题二', '体裁': '图文', '观看量': 300, '点赞': 10}),
+    })
+    updates, _ = diff_notes(new_rows(), records, COLUMNS)
+    assert updates == [
+        {'record_id': 'rec1', 'fields': {'笔记标题': '标题一', '观看量': 120}},
+        {'record_id': 'rec2', 'fields': {'体裁': '视频'}},
+    ]
+
+
+def test_hash_check_matches_column_diff():
+    records = current_records()
+    assert diff_notes(new_rows(), with_hashes(records), COLUMNS) == diff_notes(new_rows(), records, COLUMNS)
+
+
+def test_matching_hash_skips_column_comparison():
+    records = with_hashes(current_records())
+    # 哈希与新数据一致的行不再逐列比较（这里故意让镜像字段与哈希不一致来验证跳过）
+    new_hash = note_content_hash({'笔记标题': '标题二', '体裁': '视频', '观看量': 300, '点赞': 10}, COLUMNS)
+    records[T2]['hash'] = new_hash
+    updates, _ = diff_notes(new_rows(), records, COLUMNS)
+    assert updates == []
+
+
+def test_hash_field_is_written_but_not_compared():
+    records = existing(**{T2: ('rec2', {'笔记标题': '标题二', '体裁': '视频', '观看量': 250, '点赞': 10,
+                                        '内容哈希': 'stale'})})
+    new = new_rows().iloc[[1]]
+    updates, creates = diff_notes(new, records, COLUMNS, hash_field='内容哈希')
+    assert len(updates) == 1 and not creates
+    fields = updates[0]['fields']
+    assert fields['观看量'] == 300
+    expected = note_content_hash({'笔记标题': '标题二', '体裁': '视频', '观看量': 300, '点赞': 10}, COLUMNS)
+    assert fields['内容哈希'] == expected
@@ -0,0 +1,52 @@
+"""note_hash 的字段规范化和内容哈希：同一行来自 Excel 或飞书记录时哈希相同"""
+
+import math
+
+import numpy as np
+import pytest
+
+from note_hash import KEY_COLUMN, normalize_note_value, note_content_hash
+
+COLUMNS = [KEY_COLUMN, '笔记标题', '体裁', '观看量', '点赞']
+
+
+@pytest.mark.parametrize('value, expected', [
+    (12, 12), (12.0, 12), (12.9, 12), ('12', 12), ('12.0', 12), (np.int64(7), 7),
+    (None, 0), (float('nan'), 0), ('', 0), ('1分20秒', 0), (math.inf, 0), ([1], 0),
+])
+def test_normalize_count(value, expected):
+    assert normalize_note_value('观看量', value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('标题', '标题'), (None, ''), (float('nan'), ''), (123, '123'), ('长' * 1200, '长' * 1000),
+])
+def test_normalize_text(value, expected):
+    assert normalize_note_value('笔记标题', value) == expected
+
+
+def test_excel_and_feishu_rows_hash_equal():
+    excel_row = {KEY_COLUMN: '2025年07月20日17时37分34秒', '笔记标题': '标题', '体裁': '图文',
+                 '观看量': 120.0, '点赞': '3'}
+    feishu_fields = {KEY_COLUMN: 1753004254000, '笔记标题': '标题', '体裁': '图文', '观看量': 120, '点赞': 3}
+    assert note_content_hash(excel_row, COLUMNS) == note_content_hash(feishu_fields, COLUMNS)
+
+
+def test_omitted_fields_equal_blank_values():
+    # 飞书不返回空字段：缺少的字段与空文本/0 等价
+    omitted = {'笔记标题': '标题'}
+    blank = {'笔记标题': '标题', '体裁': '', '观看量': 0, '点赞': None}
+    assert note_content_hash(omitted, COLUMNS) == note_content_hash(blank, COLUMNS)
+
+
+def test_hash_changes_with_content_only():
+    row = {'笔记标题': '标题', '体裁': '图文', '观看量': 120, '点赞': 3}
+    base = note_content_hash(row, COLUMNS)
+    assert note_content_hash({**row, '观看量': 121}, COLUMNS) != base
+    assert note_content_hash({**row, '笔记标题': '新标题'}, COLUMNS) != base
+    # 列顺序、主键列和排除的列不影响哈希
+    assert note_content_hash(row, list(reversed(COLUMNS))) == base
+    assert note_content_hash({**row, KEY_COLUMN: 'x'}, COLUMNS) == base
+    assert note_content_hash({**row, '哈希': 'abc'}, COLUMNS + ['哈希'], exclude=['哈希']) == base
+    # 不在比较列中的字段不影响哈希
+    assert note_content_hash({**row, '备注': '无关'}, COLUMNS) == base
@@ -0,0 +1,70 @@
+"""note_snapshots：由增量还原的计数与每次导出的原始计数一致"""
+
+import numpy as np
+import pandas as pd
+
+from note_snapshots import NoteSnapshotStore
+
+KEYS = [f'2025年07月{day:02d}日12时00分00秒' for day in range(1, 7)]
+METRICS = ['观看量', '点赞', '收藏']
+
+
+def _exports(days=20, seed=0):
+    """每天一次导出：部分笔记计数增长，偶尔下降（取消点赞），其余不变"""
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((len(KEYS), len(METRICS)), dtype=np.int64)
+    exports = []
+    for day in pd.date_range('2025-08-01', periods=days):
+        counts = counts + rng.integers(-2, 50, counts.shape) * (rng.random((len(KEYS), 1)) < 0.5)
+        counts = np.maximum(counts, 0)
+        frame = pd.DataFrame(counts, columns=METRICS)
+        frame.insert(0, '首次发布时间', KEYS)
+        frame.insert(1, '笔记标题', [f'笔记{i}' for i in range(len(KEYS))])
+        exports.append((day, frame))
+    return exports
+
+
+def test_snapshots_rebuilt_from_deltas_equal_raw_counts(tmp_path):
+    exports = _exports()
+    store = NoteSnapshotStore(str(tmp_path / 'snapshots'))
+    for day, frame in exports:
+        store.record(frame, day)
+    # 计数没有变化的笔记不写入快照
+    assert store.rows < len(exports) * len(KEYS)
+
+    snapshots = NoteSnapshotStore(str(tmp_path / 'snapshots')).snapshots()
+    for day, frame in exports:
+        # 每篇笔记截至当天的最后一条快照就是当天导出的计数
+        upto = snapshots[snapshots['日期'] <= day].groupby('note_id')[METRICS].last()
+        assert upto.to_numpy().tolist() == frame[METRICS].to_numpy().tolist()
+
+
+def test_growth_curve_and_top_growth_match_raw_counts(tmp_path):
+    exports = _exports(days=10, seed=1)
+    store = NoteSnapshotStore(str(tmp_path / 'snapshots'))
+    for day, frame in exports:
+        store.record(frame, day)
+
+    raw = pd.DataFrame({day: frame['观看量'].to_numpy() for day, frame in exports}).T
+    curve = store.growth_curve(KEYS[0], '观看量')
+    expected = raw[0][raw[0].diff().fillna(1) != 0]
+    assert curve['观看量'].tolist() == expected.tolist()
+    assert curve['增量'].sum() == raw[0].iloc[-1]
+
+    end_day, start_day = exports[-1][0], exports[-1][0] - pd.Timedelta(days=3)
+    top = store.top_growth('观看量', days=3, end=end_day, limit=None)
+    change = raw.loc[end_day] - raw.loc[start_day]
+    by_key = dict(zip(top['首次发布时间'], top['change']))
+    for i, key in enumerate(KEYS):
+        if key in by_key:
+            assert by_key[key] == change[i]
+        else:
+            assert change[i] == 0
+
+
+def test_unchanged_and_older_exports_are_not_written(tmp_path):
+    (day, frame), (next_day, next_frame) = _exports(days=2)
+    store = NoteSnapshotStore(str(tmp_path / 'snapshots'))
+    assert store.record(next_frame, next_day) == len(KEYS)
+    assert store.record(next_frame, next_day) == 0
+    assert store.record(frame, day) == 0
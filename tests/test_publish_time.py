@@ -0,0 +1,41 @@
+"""publish_time 的中国时间 <-> 飞书 UTC 毫秒时间戳转换"""
+
+import pandas as pd
+
+from publish_time import (feishu_time_keys, from_epoch_ms, parse_publish_times, to_epoch_ms,
+                          to_time_keys)
+
+MIDNIGHT = '2025年07月20日00时00分00秒'
+MIDNIGHT_MS = 1752940800000          # 2025-07-19T16:00:00Z
+
+
+def test_midnight_round_trip_crosses_utc_date():
+    assert to_epoch_ms([MIDNIGHT, '2025年07月19日23时59分59秒']).tolist() == [MIDNIGHT_MS, MIDNIGHT_MS - 1000]
+    assert from_epoch_ms([MIDNIGHT_MS]).tolist() == [MIDNIGHT]
+    assert to_time_keys([MIDNIGHT]).tolist() == [MIDNIGHT]
+
+
+def test_other_formats_and_datetime_column_match_chinese_format():
+    keys = to_time_keys(['2025-07-19T16:00:00Z', '2025-07-20 00:00:00', pd.Timestamp('2025-07-20')])
+    assert keys.tolist() == [MIDNIGHT] * 3
+    column = pd.Series(pd.to_datetime(['2025-07-20 00:00:00', None]))
+    assert to_epoch_ms(column).tolist() == [MIDNIGHT_MS, pd.NA]
+
+
+def test_dst_transitions_of_1988():
+    # 1988-04-17 02:00 跳到 03:00（UTC+9），1988-09-11 02:00 回到 01:00（UTC+8）
+    gap, ambiguous, after_gap = '1988年04月17日02时30分00秒', '1988年09月11日01时30分00秒', '1988年04月17日03时00分00秒'
+    millis = to_epoch_ms([gap, ambiguous, after_gap])
+    assert millis.isna().tolist() == [True, True, False]
+    assert millis[2] == int(pd.Timestamp('1988-04-16 18:00:00', tz='UTC').value // 10**6)
+    # 无法换算为时间戳的时间用原始字符串作主键
+    assert to_time_keys([gap, ambiguous, after_gap]).tolist() == [gap, ambiguous, after_gap]
+
+
+def test_missing_and_unparsable_values():
+    values = [None, '', 'garbage', pd.NaT, float('nan')]
+    assert to_epoch_ms(values).isna().all()
+    assert to_time_keys(values).tolist() == [None, None, 'garbage', None, None]
+    assert parse_publish_times(values).isna().all()
+    assert from_epoch_ms([None, 'x', MIDNIGHT_MS]).tolist() == [None, None, MIDNIGHT]
+    assert feishu_time_keys([None, '', MIDNIGHT_MS, '文本']).tolist() == [None, None, MIDNIGHT, '文本']
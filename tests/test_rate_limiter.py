@@ -0,0 +1,156 @@
+"""rate_limiter 的令牌桶（突发、排队等待、补充上限和退避）和 AIMD 自适应限流"""
+
+import asyncio
+
+import pytest
+
+import rate_limiter
+from rate_limiter import AdaptiveThrottle, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', fake)
+    return fake
+
+
+def test_burst_then_requests_queue_at_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 令牌用完后，后来的请求依次排在 0.5 秒、1 秒之后
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_partial_refill(clock):
+    bucket = TokenBucket(rate=0.5, burst=1)
+    assert bucket.reserve() == 0.0
+    clock.now += 1.0   # 补充了半个令牌
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_unlimited_never_waits(clock):
+    for rate in (None, 0, -1):
+        bucket = TokenBucket(rate=rate)
+        assert bucket.unlimited
+        assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_configure_applies_in_place(clock):
+    bucket = TokenBucket(rate=1.0, burst=5)
+    bucket.configure(rate=4.0, burst=2)
+    assert bucket.tokens == 2.0
+    bucket.reserve()
+    bucket.reserve()
+    assert bucket.reserve() == pytest.approx(0.25)
+
+
+def test_drain_forces_a_full_refill_period(clock):
+    bucket = TokenBucket(rate=0.25, burst=4)
+    bucket.drain()
+    assert bucket.reserve() == pytest.approx(4.0)
+    # 已经欠下的令牌不会因为再次 drain 被抹掉
+    bucket.drain()
+    assert bucket.reserve() == pytest.approx(8.0)
+
+
+def test_success_increases_rate_additively_up_to_cap(clock):
+    bucket = TokenBucket(rate=1.0)
+    throttle = AdaptiveThrottle('test', bucket, increase_ratio=0.1, max_ratio=1.5)
+    throttle.record_success()
+    assert bucket.rate == pytest.approx(1.1)
+    for _ in range(20):
+        throttle.record_success()
+    assert bucket.rate == pytest.approx(1.5)
+
+
+def test_throttled_decreases_rate_multiplicatively_down_to_floor(clock):
+    bucket = TokenBucket(rate=1.0, burst=3)
+    throttle = AdaptiveThrottle('test', bucket, decrease_factor=0.5, min_ratio=0.125)
+    throttle.record_throttled('HTTP 412')
+    assert bucket.rate == pytest.approx(0.5)
+    # 降速后立即退避：令牌桶被清空
+    assert bucket.reserve() == pytest.approx(2.0)
+    for _ in range(10):
+        throttle.record_throttled()
+    assert bucket.rate == pytest.approx(0.125)
+    assert throttle.throttled_count == 11
+
+
+def test_concurrency_window_grows_and_halves(clock):
+    throttle = AdaptiveThrottle('test', TokenBucket(rate=None), max_concurrency=4)
+    assert throttle.concurrency_limit == 1
+    for _ in range(10):
+        throttle.record_success()
+    assert throttle.concurrency_limit == 4
+    throttle.record_throttled()
+    assert throttle.concurrency_limit == 2
+    for _ in range(5):
+        throttle.record_throttled()
+    assert throttle.concurrency_limit == 1
+
+
+def test_unlimited_bucket_stays_unlimited(clock):
+    bucket = TokenBucket(rate=None)
+    throttle = AdaptiveThrottle('test', bucket)
+    throttle.record_success()
+    throttle.record_throttled()
+    assert bucket.rate is None
+
+
+def test_record_response_maps_status_codes(clock):
+    bucket = TokenBucket(rate=1.0)
+    throttle = AdaptiveThrottle('test', bucket)
+    throttle.record_response(404)
+    assert bucket.rate == 1.0 and throttle.throttled_count == 0
+    throttle.record_response(429)
+    assert bucket.rate == pytest.approx(0.5)
+    throttle.record_response(200)
+    assert bucket.rate == pytest.approx(0.6)
+
+
+def test_reset_restores_base_rate_and_window(clock):
+    bucket = TokenBucket(rate=1.0)
+    throttle = AdaptiveThrottle('test', bucket)
+    throttle.record_success()
+    throttle.reset(2.0)
+    assert throttle.base_rate == 2.0 and throttle.concurrency_limit == 1
+    throttle.record_success()
+    assert bucket.rate == pytest.approx(1.1 + 0.2)
+
+
+def test_slot_limits_in_flight_requests():
+    throttle = AdaptiveThrottle('test', TokenBucket(rate=None), max_concurrency=2)
+    throttle.concurrency = 2.0
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with throttle.slot():
+            peak = max(peak, throttle.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    assert throttle.in_flight == 0
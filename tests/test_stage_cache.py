@@ -0,0 +1,64 @@
+"""stage_cache：阶段指纹的比较、过期和持久化，决定 redbook.py 哪些阶段可以跳过"""
+
+import json
+import time
+
+import pandas as pd
+
+from stage_cache import StageCache, frame_fingerprint
+
+
+def notes():
+    return pd.DataFrame({'首次发布时间': ['2025年07月20日17时37分34秒', '2025年07月21日08时00分00秒'],
+                         '观看量': [120, 300]})
+
+
+def test_frame_fingerprint_ignores_index_only():
+    df = notes()
+    base = frame_fingerprint(df)
+    assert frame_fingerprint(df.set_axis([10, 11])) == base
+    assert frame_fingerprint(df.assign(观看量=[120, 301])) != base
+    assert frame_fingerprint(df.rename(columns={'观看量': '阅读量'})) != base
+    assert frame_fingerprint(df.iloc[::-1]) != base
+    assert frame_fingerprint(df.iloc[:0]) == frame_fingerprint(notes().iloc[:0])
+
+
+def test_matches_requires_same_fingerprint(tmp_path):
+    stages = StageCache(str(tmp_path / 'stages.json'))
+    assert not stages.matches('export', 'abc')     # 没有记录
+    stages.record('export', 'abc', columns=['观看量'])
+    assert stages.matches('export', 'abc')
+    assert not stages.matches('export', 'def')     # 导出文件变化
+    assert not stages.matches('export', None)      # 文件不存在时没有指纹
+    assert not stages.matches('csv', 'abc')        # 其他阶段互不影响
+
+
+def test_matches_expires_after_max_age(tmp_path):
+    stages = StageCache(str(tmp_path / 'stages.json'))
+    stages.record('synced', 'abc')
+    assert stages.matches('synced', 'abc', max_age_hours=24)
+    stages.stages['synced']['at'] = time.time() - 25 * 3600
+    assert not stages.matches('synced', 'abc', max_age_hours=24)
+    assert stages.matches('synced', 'abc')         # 不限时的阶段不过期
+
+
+def test_record_and_invalidate_persist(tmp_path):
+    path = str(tmp_path / 'data' / 'stages.json')
+    stages = StageCache(path)
+    stages.record('export', 'abc', columns=['首次发布时间', '观看量'])
+    stages.record('synced', 'xyz')
+    stages.invalidate('synced')
+
+    reloaded = StageCache(path)
+    assert reloaded.matches('export', 'abc')
+    assert reloaded.get('export')['columns'] == ['首次发布时间', '观看量']
+    assert reloaded.get('synced') is None
+
+
+def test_corrupt_state_runs_everything(tmp_path):
+    path = tmp_path / 'stages.json'
+    path.write_text('{not json', encoding='utf-8')
+    stages = StageCache(str(path))
+    assert stages.stages == {}
+    stages.record('csv', 'abc')
+    assert json.loads(path.read_text(encoding='utf-8'))['csv']['hash'] == 'abc'
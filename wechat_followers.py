@@ -24,12 +24,17 @@ class WeChatMPCrawler:
     def __init__(self):
         self.browser_context: Optional[BrowserContext] = None
         self.context_page: Optional[Page] = None
+        self.playwright = None
+        self._owns_playwright = False
         self.user_data_dir = Path.cwd() / "browser_data" / "wechat"
         
-    async def init_browser(self, headless: bool = False):
-        """初始化浏览器"""
+    async def init_browser(self, headless: bool = False, playwright=None):
+        """初始化浏览器，可复用调用方传入的 Playwright 实例"""
         print("🔧 开始初始化浏览器...")
-        playwright = await async_playwright().start()
+        if playwright is None:
+            playwright = await async_playwright().start()
+            self._owns_playwright = True
+        self.playwright = playwright
         
         # 确保用户数据目录存在
         self.user_data_dir.mkdir(parents=True, exist_ok=True)
@@ -391,12 +396,17 @@ class WeChatMPCrawler:
         if self.browser_context:
             await self.browser_context.close()
             print("✅ 浏览器已关闭")
+        # 只停止自己启动的 Playwright 实例，共享实例由调用方关闭
+        if self.playwright and self._owns_playwright:
+            await self.playwright.stop()
 
 # 导出函数：获取微信公众号数据
-async def get_wechat_data(account_names: List[str] = None):
+async def get_wechat_data(account_names: List[str] = None, playwright=None, on_result=None):
     """
     获取微信公众号数据
     :param account_names: 账号名称列表（可选，微信公众号会自动获取当前登录账号）
+    :param playwright: 可选的共享 Playwright 实例
+    :param on_result: 可选回调 on_result('wechat', 数据或None)，获取完成后立即调用
     :return: (成功数据列表, 失败账号列表)
     """
     print("📱 开始获取微信公众号数据...")
@@ -407,7 +417,7 @@ async def get_wechat_data(account_names: List[str] = None):
     
     try:
         # 初始化浏览器
-        await crawler.init_browser(headless=False)
+        await crawler.init_browser(headless=False, playwright=playwright)
         
         # 登录
         if not await crawler.login():
@@ -417,17 +427,22 @@ async def get_wechat_data(account_names: List[str] = None):
         # 获取账号数据
         account_data = await crawler.get_account_followers()
         
+        record = None
         if account_data and account_data.get("followers", 0) >= 0:  # 允许0粉丝
-            data_list.append({
+            record = {
                 '日期': account_data["date"],
                 '账号名': account_data["username"],
                 '平台': account_data["platform"],
                 '粉丝数': account_data["followers"]
-            })
+            }
+            data_list.append(record)
             print(f"✅ {account_data['username']}: {account_data['followers']:,} 粉丝")
         else:
             print(f"❌ 获取失败")
             failed_accounts.append("获取失败")
+        
+        if on_result:
+            on_result('wechat', record)
             
     except Exception as e:
         print(f"❌ 程序执行出错: {e}")
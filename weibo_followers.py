@@ -1,10 +1,10 @@
 import requests
 import pandas as pd
-import time
 import os
 from datetime import datetime
 import json
 import re
+from rate_limiter import get_throttle
 
 class WeiboFollowersSimple:
     def __init__(self, cookie=""):
@@ -16,6 +16,7 @@ class WeiboFollowersSimple:
             'Referer': 'https://weibo.com/',
             'Cookie': cookie
         })
+        self.throttle = get_throttle('weibo')
     
     def get_user_info(self, uid):
         """获取微博用户信息"""
@@ -31,14 +32,22 @@ class WeiboFollowersSimple:
             
             for url in urls:
                 try:
+                    self.throttle.acquire_sync()  # 按平台限速
                     response = self.session.get(url, timeout=10)
+                    is_api = '/ajax/' in url or '/api/' in url
                     
                     if response.status_code == 200:
                         if 'application/json' in response.headers.get('content-type', ''):
+                            self.throttle.record_success()
                             data = response.json()
                             return self.parse_json_response(data, uid)
                         else:
+                            # 接口返回HTML（跳转登录/访客验证页）视为风控信号
+                            if is_api:
+                                self.throttle.record_throttled("接口返回HTML")
                             return self.parse_html_response(response.text, uid)
+                    else:
+                        self.throttle.record_response(response.status_code)
                             
                 except Exception as e:
                     print(f"⚠️ 尝试URL {url} 失败: {str(e)}")
@@ -104,27 +113,31 @@ class WeiboFollowersSimple:
             print(f"⚠️ 解析HTML响应失败: {str(e)}")
             return None
     
-    def collect_followers_data(self, uid_list):
-        """批量收集粉丝数据"""
+    def collect_followers_data(self, uid_list, on_result=None):
+        """
+        批量收集粉丝数据
+        :param on_result: 可选回调 on_result(uid, 数据)，每个用户处理完立即调用
+        """
         all_data = []
         
         for uid in uid_list:
             user_data = self.get_user_info(uid)
             
             if user_data:
-                all_data.append(user_data)
                 print(f"✅ 成功获取 {user_data['账号名']} 的数据")
                 print(f"   粉丝数: {user_data['粉丝数']:,}")
             else:
                 print(f"❌ 获取用户 {uid} 的数据失败")
-                all_data.append({
+                user_data = {
                     '日期': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                     '账号名': f"获取失败_{uid}",
                     '平台': '微博',
                     '粉丝数': 0
-                })
+                }
             
-            time.sleep(3)  # 延迟3秒
+            all_data.append(user_data)
+            if on_result:
+                on_result(uid, user_data)
         
         return all_data
     
@@ -191,8 +204,8 @@ def load_cookie_from_json(cookie_file='weibo_cookie.json'):
         print(f"❌ 读取cookie文件失败: {str(e)}")
         return ""
 
-def get_weibo_data(uid_list, cookie_file='weibo_cookie.json'):
-    """获取微博数据的统一接口函数"""
+def get_weibo_data(uid_list, cookie_file='weibo_cookie.json', on_result=None):
+    """获取微博数据的统一接口函数（on_result 为可选的逐账号回调）"""
     if not uid_list:
         print("⚠️ 微博用户ID列表为空")
         return []
@@ -210,7 +223,7 @@ def get_weibo_data(uid_list, cookie_file='weibo_cookie.json'):
         collector = WeiboFollowersSimple(cookie=cookie)
         
         print(f"📋 待处理用户ID: {', '.join(uid_list)}")
-        followers_data = collector.collect_followers_data(uid_list)
+        followers_data = collector.collect_followers_data(uid_list, on_result=on_result)
         
         print(f"✅ 微博数据获取完成，共 {len(followers_data)} 条记录")
         return followers_data
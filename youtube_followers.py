@@ -1,10 +1,11 @@
 import yt_dlp
-import time
 from datetime import datetime
+from rate_limiter import get_rate_limiter
 
-def get_youtube_channel_info(url_list):
+def get_youtube_channel_info(url_list, on_item=None):
     """
     使用 yt-dlp 获取频道元数据
+    :param on_item: 可选回调 on_item(url, 频道信息或None)，每个频道处理完立即调用
     """
     ydl_opts = {
         'quiet': True,
@@ -16,10 +17,14 @@ def get_youtube_channel_info(url_list):
     }
     
     results = []
+    limiter = get_rate_limiter('youtube')
     
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        for url in url_list:
+        for channel_url in url_list:
+            limiter.acquire_sync()  # 按平台限速
+            item = None
             try:
+                url = channel_url
                 print(f"  处理频道: {url}")
                 
                 if '@' in url and not url.endswith('/about'):
@@ -30,42 +35,50 @@ def get_youtube_channel_info(url_list):
                 follower_count = info.get('channel_follower_count')
                 
                 if channel_name and follower_count is not None:
-                    results.append({
+                    item = {
                         'name': channel_name,
                         'followers': follower_count
-                    })
+                    }
+                    results.append(item)
                     print(f"  ✅ {channel_name}: {follower_count:,} 粉丝")
                 else:
                     print(f"  ❌ 数据不完整")
                     
             except Exception as e:
                 print(f"  ❌ 错误: {e}")
+            
+            if on_item:
+                on_item(channel_url, item)
                 
     return results
 
 # 导出函数：获取YouTube数据
-def get_youtube_data(channel_urls):
+def get_youtube_data(channel_urls, on_result=None):
     """
     获取YouTube频道数据
     :param channel_urls: 频道URL列表
+    :param on_result: 可选回调 on_result(频道URL, 数据或None)，每个频道处理完立即调用
     :return: 数据列表
     """
     print("📺 开始获取YouTube数据...")
     
-    channel_data = get_youtube_channel_info(channel_urls)
-    
-    data_list = []
     current_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    for item in channel_data:
-        data_list.append({
+    def to_record(item):
+        return {
             '日期': current_date,
             '账号名': item['name'],
             '平台': 'YouTube',
             '粉丝数': item['followers']
-        })
+        }
+    
+    def handle_item(url, item):
+        if on_result:
+            on_result(url, to_record(item) if item else None)
+    
+    channel_data = get_youtube_channel_info(channel_urls, on_item=handle_item)
     
-    return data_list
+    return [to_record(item) for item in channel_data]
 
 # 如果直接运行此脚本，使用默认配置
 if __name__ == "__main__":
@@ -12,6 +12,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from rate_limiter import get_rate_limiter
+
 try:
     from playwright.async_api import async_playwright, BrowserContext, Page
 except ImportError:
@@ -23,11 +25,16 @@ class ZhihuOptimizedCrawler:
     def __init__(self):
         self.browser_context: Optional[BrowserContext] = None
         self.context_page: Optional[Page] = None
+        self.playwright = None
+        self._owns_playwright = False
         self.user_data_dir = Path.cwd() / "browser_data" / "zhihu"
         
-    async def init_browser(self, headless: bool = False):
-        """初始化浏览器"""
-        playwright = await async_playwright().start()
+    async def init_browser(self, headless: bool = False, playwright=None):
+        """初始化浏览器，可复用调用方传入的 Playwright 实例"""
+        if playwright is None:
+            playwright = await async_playwright().start()
+            self._owns_playwright = True
+        self.playwright = playwright
         
         # 确保用户数据目录存在
         self.user_data_dir.mkdir(parents=True, exist_ok=True)
@@ -290,14 +297,19 @@ class ZhihuOptimizedCrawler:
         if self.browser_context:
             await self.browser_context.close()
             print("✅ 浏览器已关闭")
+        # 只停止自己启动的 Playwright 实例，共享实例由调用方关闭
+        if self.playwright and self._owns_playwright:
+            await self.playwright.stop()
 
 # 在文件末尾的 main() 函数之前添加这个导出函数
 
 # 导出函数：获取知乎数据
-async def get_zhihu_data(user_slugs):
+async def get_zhihu_data(user_slugs, playwright=None, on_result=None):
     """
     获取知乎用户数据
     :param user_slugs: 用户slug列表
+    :param playwright: 可选的共享 Playwright 实例
+    :param on_result: 可选回调 on_result(slug, 数据或None)，每个用户处理完立即调用
     :return: (成功数据列表, 失败账号列表)
     """
     print("🔍 开始获取知乎数据...")
@@ -308,7 +320,7 @@ async def get_zhihu_data(user_slugs):
     
     try:
         # 初始化浏览器
-        await crawler.init_browser(headless=False)
+        await crawler.init_browser(headless=False, playwright=playwright)
         
         # 登录
         if not await crawler.login():
@@ -316,23 +328,28 @@ async def get_zhihu_data(user_slugs):
             return [], user_slugs
             
         # 获取用户数据
+        limiter = get_rate_limiter('zhihu')
         for user_slug in user_slugs:
+            await limiter.acquire()  # 按平台限速，避免请求过快
             print(f"🎯 处理知乎用户: {user_slug}")
             user_data = await crawler.get_user_followers(user_slug)
             
+            record = None
             if user_data and user_data.get("followers", 0) > 0:
-                data_list.append({
+                record = {
                     '日期': user_data["date"],
                     '账号名': user_data["username"],
                     '平台': user_data["platform"],
                     '粉丝数': user_data["followers"]
-                })
+                }
+                data_list.append(record)
                 print(f"✅ {user_data['username']}: {user_data['followers']:,} 粉丝")
             else:
                 print(f"❌ 获取失败: {user_slug}")
                 failed_accounts.append(user_slug)
-                
-            await asyncio.sleep(2)  # 避免请求过快
+            
+            if on_result:
+                on_result(user_slug, record)
             
     except Exception as e:
         print(f"❌ 知乎数据获取出错: {e}")
@@ -367,7 +384,9 @@ async def main():
             
         # 获取用户数据
         success_count = 0
+        limiter = get_rate_limiter('zhihu')
         for user_slug in USER_SLUGS:
+            await limiter.acquire()  # 按平台限速，避免请求过快
             print(f"\n🎯 处理用户: {user_slug}")
             user_data = await crawler.get_user_followers(user_slug)
             
@@ -378,8 +397,6 @@ async def main():
                 success_count += 1
             else:
                 print(f"❌ 获取失败: {user_slug}")
-                
-            await asyncio.sleep(2)  # 避免请求过快
             
         print(f"\n🎉 完成！成功获取 {success_count}/{len(USER_SLUGS)} 个用户的数据")
         print(f"📄 数据已保存到: {CSV_FILENAME}")